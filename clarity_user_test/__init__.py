@@ -0,0 +1,15 @@
+"""
+Clarity LIMS user and role test automation.
+
+Run from the command line with `python -m clarity_user_test`, or from
+Python with a ClarityContext and run_user_test:
+
+    from clarity_user_test.context import ClarityContext
+    from clarity_user_test.runner import run_user_test
+
+    with ClarityContext("dev") as context:
+        for role in ("Editor", "Collaborator"):
+            run_user_test(context, role, mode="api")
+
+Submodules are not imported here, so importing the package is cheap.
+"""
@@ -0,0 +1,175 @@
+"""
+API-side verification of a test user, cross-checked against the UI on a schedule.
+
+Scraping the User Management grid is the slowest part of a run. For routine
+monitoring the researcher and their roles can be checked through the s4 API
+in a couple of seconds; the browser check only needs to run on a sampled or
+scheduled basis, and when it does, any disagreement between the API state
+and what the UI shows is reported.
+
+Verification modes:
+    ui      Always run the browser check (original behaviour)
+    api     API only, never start a browser
+    hybrid  API every run, browser check when UiCheckSchedule says it is due
+"""
+import json
+import os
+import random
+import threading
+import time
+
+VERIFY_MODES = ("ui", "api", "hybrid")
+
+# Runs against several servers share the schedule file
+SCHEDULE_LOCK = threading.Lock()
+DEFAULT_SCHEDULE_PATH = os.path.join(os.path.expanduser("~"), ".clarity_user_test", "ui_check_schedule.json")
+
+
+def verify_via_api(cache, form_fields, role_name):
+    """
+    Check through the API that the test user exists and has the role.
+
+    Args:
+        cache: LookupCache (or anything with query_researchers)
+        form_fields: Dict with firstName and lastName of the test user
+        role_name: Role whose state is compared
+        expect_role: Whether the user should have the role (False after a remove)
+
+    Returns:
+        dict: found, has_role, username, email, roles, seconds and details
+    """
+    start = time.monotonic()
+    result = {"found": False, "has_role": False, "username": "", "email": "", "roles": [], "details": ""}
+    try:
+        matches = cache.query_researchers(**{
+            'firstname': [form_fields.get('firstName', '')],
+            'lastname': form_fields.get('lastName', '')
+        })
+        if matches:
+            researcher = matches[0]
+            result["found"] = True
+            result["username"] = researcher.username or ""
+            result["email"] = researcher.email or ""
+            result["roles"] = sorted(r.name for r in researcher.roles)
+            result["has_role"] = role_name in result["roles"]
+            result["details"] = (
+                f"API: researcher '{researcher.first_name} {researcher.last_name}' ({result['username']}) "
+                f"has roles {', '.join(result['roles']) or 'none'}"
+            )
+        else:
+            result["details"] = "API: no researcher matches the test user"
+    except Exception as e:
+        result["details"] = f"API check failed: {str(e)[:100]}"
+    result["seconds"] = round(time.monotonic() - start, 2)
+    return result
+
+
+class UiCheckSchedule:
+    """
+    Decide when the (slow) browser check is due in hybrid mode.
+
+    The check is due if any configured rule fires: every Nth run, when the
+    last UI check is older than max_age_hours, or at random with sample_rate.
+
+    Args:
+        key: Schedule key, e.g. the server base URL
+        every_n_runs: Run the UI check on every Nth run (None disables)
+        max_age_hours: Run the UI check if the last one is older than this (None disables)
+        sample_rate: Probability (0-1) of running the UI check on any run
+        path: JSON file holding run counters per key
+    """
+
+    def __init__(self, key, every_n_runs=10, max_age_hours=24, sample_rate=0.0, path=DEFAULT_SCHEDULE_PATH):
+        self.key = key
+        self.every_n_runs = every_n_runs
+        self.max_age_hours = max_age_hours
+        self.sample_rate = sample_rate
+        self.path = path
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def state(self):
+        return self.load().get(self.key, {"runs_since_ui": 0, "last_ui_check": 0})
+
+    def due(self):
+        """Return (due, reason)."""
+        state = self.state()
+        if not state["last_ui_check"]:
+            return True, "no UI check recorded yet"
+        if self.every_n_runs and state["runs_since_ui"] + 1 >= self.every_n_runs:
+            return True, f"every {self.every_n_runs} runs"
+        if self.max_age_hours and time.time() - state["last_ui_check"] > self.max_age_hours * 3600:
+            return True, f"last UI check older than {self.max_age_hours}h"
+        if self.sample_rate and random.random() < self.sample_rate:
+            return True, f"sampled ({self.sample_rate:.0%})"
+        return False, f"{state['runs_since_ui'] + 1} API-only runs since the last UI check"
+
+    def record_run(self, ui_checked):
+        """Update the counters after a run."""
+        with SCHEDULE_LOCK:
+            data = self.load()
+            state = data.get(self.key, {"runs_since_ui": 0, "last_ui_check": 0})
+            if ui_checked:
+                state = {"runs_since_ui": 0, "last_ui_check": time.time()}
+            else:
+                state["runs_since_ui"] += 1
+            data[self.key] = state
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, "w") as f:
+                json.dump(data, f, indent=2)
+
+
+def should_run_ui_check(mode, schedule):
+    """
+    Decide whether this run needs the browser.
+
+    Returns:
+        tuple: (run_ui_check, reason)
+    """
+    if mode not in VERIFY_MODES:
+        raise ValueError(f"verify mode must be one of {VERIFY_MODES}, got '{mode}'")
+    if mode == "ui":
+        return True, "UI verification mode"
+    if mode == "api":
+        return False, "API-only verification mode"
+    return schedule.due()
+
+
+def compare_api_ui(api_result, ui_found, grid_row=None, role_name=None, expect_role=True):
+    """
+    List disagreements between the API state and what the UI showed.
+
+    Args:
+        api_result: Result of verify_via_api
+        ui_found: Whether the UI search found the user (None if its scan was inconclusive)
+        grid_row: Grid row for the user from GridIndex.row_for, if any
+        role_name: Role whose state is compared
+        expect_role: Whether the user should have the role (False after a remove)
+
+    Returns:
+        list: Human-readable mismatch descriptions (empty if consistent)
+    """
+    mismatches = []
+    if api_result["found"] and ui_found is False:
+        mismatches.append("User exists in the API but was not found in the UI user list")
+    if not api_result["found"] and ui_found:
+        mismatches.append("User was found in the UI but the API returned no matching researcher")
+
+    if grid_row:
+        if api_result["username"] and grid_row["username"] and grid_row["username"] != api_result["username"]:
+            mismatches.append(f"Username differs: API '{api_result['username']}', UI '{grid_row['username']}'")
+        if api_result["email"] and grid_row["email"] and grid_row["email"].lower() != api_result["email"].lower():
+            mismatches.append(f"Email differs: API '{api_result['email']}', UI '{grid_row['email']}'")
+        if role_name and grid_row["role"]:
+            ui_has_role = role_name.lower() in [r.strip().lower() for r in grid_row["role"].split(",")]
+            if ui_has_role != api_result["has_role"] or ui_has_role != expect_role:
+                mismatches.append(
+                    f"Role '{role_name}' should be {'assigned' if expect_role else 'removed'}: API says "
+                    f"{'assigned' if api_result['has_role'] else 'not assigned'}, UI shows '{grid_row['role']}'"
+                )
+    return mismatches
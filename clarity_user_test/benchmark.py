@@ -0,0 +1,259 @@
+"""
+Offline end-to-end benchmark of the user test against the local Clarity stand-in.
+
+Starts the local stand-in (standin.py) with a grid of each requested size,
+runs the full flow (API connect, role lookup, role commit, login,
+navigation, grid load, search) in headless Chrome, and records per-step
+timings, WebDriver calls per step and stand-in request counts. Results
+are written as JSON so two versions of the code can be compared.
+
+Usage:
+    python -m clarity_user_test.benchmark                    # 10, 1k and 10k users
+    python -m clarity_user_test.benchmark --sizes 10,1000 --repeat 3 --output bench.json
+    python -m clarity_user_test.benchmark --output after.json --compare before.json
+    python -m clarity_user_test.benchmark --sizes 10000 --grid-mode virtual   # production-like grid
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+from collections import Counter
+
+import s4.clarity
+import selenium
+from selenium.webdriver.support.ui import WebDriverWait
+
+from .standin import GRID_MODES, start_standin
+from .driver_pool import create_headless_driver
+from .lookup_cache import LookupCache
+from .role_matrix import assign_role
+from .timing import StepTimer
+from .ui_steps import login, open_user_management, wait_for_user_list, search_user
+from .ui_waits import WAIT_REPORT
+
+DEFAULT_SIZES = [10, 1000, 10000]
+DEFAULT_OUTPUT = "benchmark_results.json"
+STANDIN_USERNAME = "benchmark"
+STANDIN_PASSWORD = "benchmark"
+
+
+def count_webdriver_calls(driver):
+    """
+    Count every WebDriver command the driver sends.
+
+    Returns:
+        Counter: Command name -> number of calls, updated as the driver is used
+    """
+    calls = Counter()
+    execute = driver.execute
+
+    def counted_execute(driver_command, params=None):
+        calls[driver_command] += 1
+        return execute(driver_command, params)
+
+    driver.execute = counted_execute
+    return calls
+
+
+def run_flow(server, role_name, cache_path):
+    """
+    Run the user test flow once against a running stand-in.
+
+    Args:
+        server: StandInServer from start_standin
+        role_name: Role to assign to the test user
+        cache_path: SQLite file for the lookup cache
+
+    Returns:
+        dict: users, found, timings, webdriver_calls per step and api_requests
+    """
+    # Start every run from the same state so the role commit is always measured
+    with server.data.lock:
+        for researcher in server.data.researchers.values():
+            researcher["roles"] = []
+    with server.stats_lock:
+        server.request_counts.clear()
+        server.sessions.clear()
+    WAIT_REPORT.clear()
+
+    timer = StepTimer()
+    calls = Counter()
+    webdriver_calls = {}
+    result = {"users": len(server.data.researchers), "found": False, "error": ""}
+
+    def step(name, func, *args):
+        before = sum(calls.values())
+        try:
+            with timer.span(name):
+                return func(*args)
+        finally:
+            webdriver_calls[name] = sum(calls.values()) - before
+
+    driver = None
+    try:
+        with timer.span("driver_start"):
+            driver = create_headless_driver()
+        calls = count_webdriver_calls(driver)
+
+        def connect():
+            lims = s4.clarity.LIMS(server.api_url, STANDIN_USERNAME, STANDIN_PASSWORD)
+            lims.versions
+            return lims
+
+        lims = step("api_connect", connect)
+        cache = LookupCache(lims, server.api_url, path=cache_path)
+        scenario = {"role": role_name, "user": {"firstName": "Emil", "lastName": "Test"}}
+
+        def lookup():
+            cache.query_researchers(**{'firstname': ['Emil'], 'lastname': "Test"})
+            cache.get_role(role_name)
+
+        step("role_lookup", lookup)
+        researcher, _ = step("role_commit", assign_role, cache, scenario)
+
+        form_fields = {"firstName": "Emil", "lastName": "Test", "username": researcher.username}
+        wait = WebDriverWait(driver, 60)
+        step("login", login, driver, server.base_url, STANDIN_USERNAME, STANDIN_PASSWORD)
+        step("navigation", open_user_management, driver, wait, server.base_url)
+        step("grid_load", wait_for_user_list, driver)
+        result["found"], _ = step("search", search_user, driver, form_fields)
+    except Exception as e:
+        result["error"] = str(e)[:200]
+    finally:
+        if driver:
+            driver.quit()
+
+    result["timings"] = timer.as_list()
+    result["webdriver_calls"] = webdriver_calls
+    result["webdriver_commands"] = dict(calls)
+    result["api_requests"] = dict(server.request_counts)
+    return result
+
+
+def summarize(runs):
+    """Median seconds and WebDriver calls per step, per grid size."""
+    summary = {}
+    for users in sorted({r["users"] for r in runs}):
+        size_runs = [r for r in runs if r["users"] == users]
+        steps = {}
+        for name in dict.fromkeys(t["step"] for r in size_runs for t in r["timings"]):
+            seconds = [t["seconds"] for r in size_runs for t in r["timings"] if t["step"] == name]
+            calls = [r["webdriver_calls"][name] for r in size_runs if name in r["webdriver_calls"]]
+            steps[name] = {
+                "median_seconds": round(statistics.median(seconds), 3),
+                "max_seconds": round(max(seconds), 3),
+                "median_webdriver_calls": statistics.median(calls) if calls else None,
+            }
+        summary[str(users)] = {
+            "runs": len(size_runs),
+            "passed": sum(1 for r in size_runs if r["found"]),
+            "steps": steps,
+        }
+    return summary
+
+
+def run_benchmark(sizes, repeat=1, latency=0.02, ui_latency=0.1, max_concurrent=8, role_name="Editor",
+                  grid_mode="full"):
+    """
+    Benchmark the flow at each grid size.
+
+    Args:
+        sizes: Numbers of users in the stand-in grid
+        repeat: Runs per size
+        latency: Stand-in delay per API request
+        ui_latency: Stand-in delay per web UI request
+        max_concurrent: Requests the stand-in serves at once
+        role_name: Role assigned during the flow
+        grid_mode: Stand-in grid rendering: 'full', 'virtual' or 'filter'
+
+    Returns:
+        dict: Machine-readable benchmark document (environment, config, runs, summary)
+    """
+    runs = []
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for size in sizes:
+            server = start_standin(size, latency, max_concurrent, ui_latency=ui_latency, grid_mode=grid_mode)
+            try:
+                for i in range(repeat):
+                    print(f"\n=== {size} users, run {i + 1}/{repeat} ===")
+                    result = run_flow(server, role_name, os.path.join(cache_dir, "lookup_cache.sqlite"))
+                    result["run"] = i + 1
+                    if result["error"]:
+                        print(f"  ✗ Run failed: {result['error']}")
+                    runs.append(result)
+            finally:
+                server.shutdown()
+                server.server_close()
+
+    return {
+        "generated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "selenium": selenium.__version__,
+        },
+        "config": {
+            "sizes": sizes,
+            "repeat": repeat,
+            "latency": latency,
+            "ui_latency": ui_latency,
+            "max_concurrent": max_concurrent,
+            "role": role_name,
+            "grid_mode": grid_mode,
+        },
+        "runs": runs,
+        "summary": summarize(runs),
+    }
+
+
+def print_summary(summary, baseline=None):
+    """Print median step timings per size, with the change against a baseline summary if given."""
+    print("\n" + "="*78)
+    print("BENCHMARK SUMMARY (median per step)")
+    print("="*78)
+    for users, size in summary.items():
+        print(f"\n  {users} users: {size['passed']}/{size['runs']} runs found the user")
+        print(f"    {'Step':<16} {'Seconds':>9} {'WD calls':>9}   {'Baseline':>9} {'Change':>8}")
+        base_steps = (baseline or {}).get(users, {}).get("steps", {})
+        for name, step in size["steps"].items():
+            line = f"    {name:<16} {step['median_seconds']:>9.3f} {str(step['median_webdriver_calls']):>9}"
+            base = base_steps.get(name)
+            if base:
+                change = step["median_seconds"] - base["median_seconds"]
+                percent = f"{change / base['median_seconds']:+.0%}" if base["median_seconds"] else ""
+                line += f"   {base['median_seconds']:>9.3f} {percent:>8}"
+            print(line)
+    print("="*78)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the user test flow against a local Clarity stand-in")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES), help="Comma separated grid sizes")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per size")
+    parser.add_argument("--latency", type=float, default=0.02, help="Stand-in seconds of delay per API request")
+    parser.add_argument("--ui-latency", type=float, default=0.1, help="Stand-in seconds of delay per web UI request")
+    parser.add_argument("--max-concurrent", type=int, default=8)
+    parser.add_argument("--grid-mode", default="full", choices=GRID_MODES,
+                        help="Stand-in grid: every row in the DOM, virtualized, or virtualized with a filter box")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="JSON file for the results")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    results = run_benchmark(sizes, args.repeat, args.latency, args.ui_latency, args.max_concurrent,
+                            grid_mode=args.grid_mode)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["summary"]
+    print_summary(results["summary"], baseline)
+    print(f"Results written to {args.output}")
+
+    exit(0 if all(r["found"] for r in results["runs"]) else 1)
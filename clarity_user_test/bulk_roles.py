@@ -0,0 +1,333 @@
+"""
+Bulk role assignment for Clarity researchers.
+
+Reads a list of (researcher, role, add/remove) operations from a CSV or
+JSON file and applies them concurrently:
+
+    - each role is resolved once up front
+    - operations are grouped per researcher so each researcher gets one commit
+    - commits run through a bounded thread pool with rate limiting and retry
+
+CSV columns (header required):
+    username, firstname, lastname, role, action
+
+JSON: a list of objects with the same keys.
+
+A researcher is matched by username when given, otherwise by first and
+last name. action is "add" or "remove".
+
+Usage:
+    python -m clarity_user_test.bulk_roles operations.csv --server dev --workers 8 --rate 10
+    python -m clarity_user_test.bulk_roles --standin --users 200 --workers 1,2,4,8,16
+"""
+import argparse
+import csv
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+VALID_ACTIONS = ("add", "remove")
+
+
+class RateLimiter:
+    """Token bucket limiting how many API calls start per second."""
+
+    def __init__(self, rate_per_second, burst=1):
+        self.rate = rate_per_second
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a call is allowed."""
+        if not self.rate:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+                self.last = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+
+
+def load_operations(path):
+    """
+    Load role operations from a CSV or JSON file.
+
+    Args:
+        path: Path to a .csv or .json file
+
+    Returns:
+        list: Operation dicts with username, firstname, lastname, role, action
+
+    Raises:
+        ValueError: If an operation is missing a role, a researcher or has a bad action
+    """
+    if path.lower().endswith(".json"):
+        with open(path) as f:
+            rows = json.load(f)
+    else:
+        with open(path, newline="") as f:
+            rows = list(csv.DictReader(f))
+
+    operations = []
+    for line, row in enumerate(rows, start=1):
+        op = {
+            key: str(row.get(key) or "").strip()
+            for key in ("username", "firstname", "lastname", "role", "action")
+        }
+        op["action"] = op["action"].lower() or "add"
+        if op["action"] not in VALID_ACTIONS:
+            raise ValueError(f"Operation {line}: action must be one of {VALID_ACTIONS}, got '{op['action']}'")
+        if not op["role"]:
+            raise ValueError(f"Operation {line}: missing role")
+        if not op["username"] and not (op["firstname"] and op["lastname"]):
+            raise ValueError(f"Operation {line}: need a username or firstname and lastname")
+        operations.append(op)
+    return operations
+
+
+def researcher_key(op):
+    """Key identifying the researcher an operation applies to."""
+    if op["username"]:
+        return op["username"]
+    return f"{op['firstname']} {op['lastname']}"
+
+
+def resolve_roles(lims, operations, cache=None):
+    """
+    Look up every distinct role named in the operations, once each.
+
+    Uses the LookupCache when one is given.
+
+    Returns:
+        dict: role name -> role object (None if the role does not exist)
+    """
+    roles = {}
+    for role_name in sorted({op["role"] for op in operations}):
+        try:
+            if cache:
+                roles[role_name] = cache.get_role(role_name)
+            else:
+                roles[role_name] = lims.roles.get_by_name(role_name)
+        except Exception as e:
+            print(f"  ✗ Could not resolve role '{role_name}': {str(e)[:50]}...")
+            roles[role_name] = None
+    return roles
+
+
+def find_researcher(lims, op, cache=None):
+    """Query the researcher an operation refers to."""
+    query = cache.query_researchers if cache else lims.researchers.query
+    if op["username"]:
+        matches = query(username=op["username"])
+    else:
+        matches = query(**{
+            'firstname': [op["firstname"]],
+            'lastname': op["lastname"]
+        })
+    if not matches:
+        raise LookupError(f"No researcher matches '{researcher_key(op)}'")
+    if len(matches) > 1:
+        raise LookupError(f"{len(matches)} researchers match '{researcher_key(op)}'")
+    return matches[0]
+
+
+def with_retry(func, limiter, retries, backoff):
+    """
+    Call func under the rate limiter, retrying failures with exponential backoff.
+
+    Returns:
+        tuple: (result, attempts)
+    """
+    attempt = 0
+    while True:
+        attempt += 1
+        limiter.acquire()
+        try:
+            return func(), attempt
+        except LookupError:
+            raise
+        except Exception:
+            if attempt > retries:
+                raise
+            time.sleep(backoff * (2 ** (attempt - 1)))
+
+
+def apply_researcher_operations(lims, key, ops, roles, limiter, retries=3, backoff=0.5, cache=None):
+    """
+    Apply all operations for one researcher and commit once.
+
+    Returns:
+        dict: Result row for the report table
+    """
+    start = time.monotonic()
+    result = {
+        "researcher": key,
+        "changes": ", ".join(f"{'+' if op['action'] == 'add' else '-'}{op['role']}" for op in ops),
+        "status": "ok",
+        "attempts": 0,
+        "seconds": 0.0,
+        "error": "",
+    }
+    try:
+        missing = [op["role"] for op in ops if roles.get(op["role"]) is None]
+        if missing:
+            raise LookupError(f"Unknown role(s): {', '.join(missing)}")
+
+        user, lookups = with_retry(lambda: find_researcher(lims, ops[0], cache), limiter, retries, backoff)
+
+        before = {r.uri for r in user.roles}
+        for op in ops:
+            if op["action"] == "add":
+                user.add_role(roles[op["role"]])
+            else:
+                user.remove_role(roles[op["role"]])
+
+        # Skip the PUT when the researcher already had the requested roles
+        commits = 0
+        if {r.uri for r in user.roles} != before:
+            _, commits = with_retry(user.commit, limiter, retries, backoff)
+            if cache:
+                cache.invalidate_researcher(user)
+        else:
+            result["changes"] += " (no change)"
+        result["attempts"] = lookups + commits
+    except Exception as e:
+        result["status"] = "failed"
+        result["error"] = str(e)[:80]
+    result["seconds"] = round(time.monotonic() - start, 2)
+    return result
+
+
+def run_bulk(lims, operations, max_workers=8, rate_limit=10.0, retries=3, backoff=0.5, cache=None):
+    """
+    Apply role operations concurrently.
+
+    Args:
+        lims: s4.clarity.LIMS instance
+        operations: List of operation dicts (see load_operations)
+        max_workers: Size of the thread pool
+        rate_limit: Maximum API calls started per second (0 disables the limit)
+        retries: Retries per lookup/commit after the first attempt
+        backoff: Initial retry delay in seconds, doubled on every retry
+        cache: Optional LookupCache for role and researcher lookups
+
+    Returns:
+        list: One result dict per researcher, in input order
+    """
+    grouped = {}
+    for op in operations:
+        grouped.setdefault(researcher_key(op), []).append(op)
+
+    roles = resolve_roles(lims, operations, cache)
+    limiter = RateLimiter(rate_limit, burst=max_workers)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [
+            pool.submit(apply_researcher_operations, lims, key, ops, roles, limiter, retries, backoff, cache)
+            for key, ops in grouped.items()
+        ]
+        return [future.result() for future in futures]
+
+
+def print_results_table(results):
+    """Print a per-researcher result table and a summary line."""
+    headers = ("Researcher", "Changes", "Status", "Attempts", "Seconds", "Error")
+    rows = [
+        (r["researcher"], r["changes"], r["status"], str(r["attempts"]), f"{r['seconds']:.2f}", r["error"])
+        for r in results
+    ]
+    widths = [max(len(h), *(len(row[i]) for row in rows)) if rows else len(h) for i, h in enumerate(headers)]
+
+    print("  ".join(h.ljust(w) for h, w in zip(headers, widths)).rstrip())
+    print("  ".join("-" * w for w in widths))
+    for row in rows:
+        print("  ".join(value.ljust(w) for value, w in zip(row, widths)).rstrip())
+
+    failed = sum(1 for r in results if r["status"] != "ok")
+    print(f"\n{len(results) - failed} succeeded, {failed} failed")
+
+
+def benchmark_standin(worker_counts, user_count=200, latency=0.05, max_concurrent=8, rate_limit=0):
+    """
+    Measure bulk throughput against the local stand-in API for several pool sizes.
+
+    Returns:
+        list: (workers, seconds, researchers per second) tuples
+    """
+    import s4.clarity
+    from .standin import start_standin
+
+    server = start_standin(user_count=user_count, latency=latency, max_concurrent=max_concurrent)
+    try:
+        operations = [
+            {"username": f"tuser{i:05d}", "firstname": "", "lastname": "", "role": "Editor", "action": "add"}
+            for i in range(1, user_count)
+        ]
+
+        timings = []
+        for workers in worker_counts:
+            # Every pool size starts from researchers without roles, so each one times the same commits
+            with server.data.lock:
+                for researcher in server.data.researchers.values():
+                    researcher["roles"] = []
+            with server.stats_lock:
+                server.request_counts.clear()
+            lims = s4.clarity.LIMS(server.api_url, "standin", "standin")
+
+            start = time.monotonic()
+            results = run_bulk(lims, operations, max_workers=workers, rate_limit=rate_limit)
+            elapsed = time.monotonic() - start
+            failed = sum(1 for r in results if r["status"] != "ok")
+            commits = server.request_counts.get("PUT", 0)
+            if commits != len(results) - failed:
+                raise RuntimeError(f"{workers} workers made {commits} commits, expected {len(results) - failed}")
+            timings.append((workers, elapsed, len(results) / elapsed))
+            print(f"  {workers:>3} workers: {elapsed:6.2f}s  {len(results) / elapsed:7.1f} researchers/s  ({failed} failed)")
+        return timings
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply Clarity role changes in bulk")
+    parser.add_argument("operations", nargs="?", help="CSV or JSON file of role operations")
+    parser.add_argument("--server", default="dev", help="Clarity server: prod, staging or dev")
+    parser.add_argument("--workers", default="8", help="Thread pool size (comma separated list with --standin)")
+    parser.add_argument("--rate", type=float, help="Maximum API calls per second (0 = unlimited; "
+                                                    "default 10, or unlimited with --standin)")
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--standin", action="store_true", help="Benchmark pool sizes against a local stand-in API")
+    parser.add_argument("--users", type=int, default=200, help="Researchers seeded in the stand-in")
+    parser.add_argument("--latency", type=float, default=0.05, help="Stand-in latency per request")
+    parser.add_argument("--server-limit", type=int, default=8, help="Stand-in concurrent request limit")
+    args = parser.parse_args()
+
+    if args.standin:
+        worker_counts = [int(w) for w in args.workers.split(",")]
+        print(f"Benchmarking bulk role changes for {args.users - 1} researchers "
+              f"(latency {args.latency}s, server limit {args.server_limit})")
+        benchmark_standin(worker_counts, args.users, args.latency, args.server_limit, args.rate or 0)
+    else:
+        if not args.operations:
+            parser.error("an operations file is required unless --standin is given")
+
+        import s4.clarity
+        from .config import CLARITY_SERVERS, get_credentials
+
+        username, password = get_credentials()
+        lims = s4.clarity.LIMS(CLARITY_SERVERS[args.server], username, password)
+
+        operations = load_operations(args.operations)
+        print(f"Applying {len(operations)} role operations on {args.server} with {args.workers} workers...")
+        rate = 10.0 if args.rate is None else args.rate
+        results = run_bulk(lims, operations, int(args.workers), rate, args.retries)
+        print_results_table(results)
+        exit(0 if all(r["status"] == "ok" for r in results) else 1)
@@ -0,0 +1,134 @@
+"""
+Command line entry point for the Clarity user tests.
+
+Usage:
+    python -m clarity_user_test --server dev --role Editor
+    python -m clarity_user_test --server staging --role Editor,Collaborator --mode api
+    python -m clarity_user_test --server dev --role Editor --action remove --mode role
+    python -m clarity_user_test --server dev --bulk operations.csv
+    python -m clarity_user_test --server dev --scenarios clarity_user_test/scenarios/configuration.yaml
+    python -m clarity_user_test --server dev --role Editor --profile --profile-out run.prof
+    python -m clarity_user_test --server prod --role Editor --non-interactive   # cron / job runners
+    python -m clarity_user_test --server prod --role Editor --block-resources --block-types image,font
+
+The exit code is 0 only if every run found the user with the expected role.
+
+Only the standard library is imported up front; s4, selenium, keyring and fpdf are
+loaded when a run first needs them.
+"""
+import argparse
+import signal
+import sys
+
+MODE_HELP = (
+    "ui: always check in the browser; api: API only; "
+    "hybrid: API, plus the browser every --ui-every runs; role: role change only"
+)
+
+
+def build_parser():
+    from .config import CLARITY_SERVERS
+
+    parser = argparse.ArgumentParser(prog="clarity_user_test", description="Change a test user's role and verify it")
+    parser.add_argument("--server", default="dev", choices=sorted(CLARITY_SERVERS))
+    parser.add_argument("--role", default="Editor", help="Role name, or comma separated role names run one after another")
+    parser.add_argument("--user", default="Emil Test", help="Test user as 'First Last'")
+    parser.add_argument("--mode", default="ui", choices=["ui", "api", "hybrid", "role"], help=MODE_HELP)
+    parser.add_argument("--action", default="add", choices=["add", "remove", "none"], help="Role change before verifying")
+    parser.add_argument("--bulk", help="CSV/JSON file of role operations to apply in bulk instead (see bulk_roles)")
+    parser.add_argument("--scenarios", help="YAML/JSON scenario file to run instead (see scenario_runner)")
+    parser.add_argument("--cache-ttl", type=int, default=24 * 3600,
+                        help="Seconds role/researcher lookups are cached on disk (0 disables the cache)")
+    parser.add_argument("--reuse-session", action="store_true", help="Reuse the saved browser session instead of logging in")
+    parser.add_argument("--headless", action="store_true", help="Run the browser headless")
+    parser.add_argument("--keep-open", action="store_true", help="Wait for Enter before closing the browser")
+    parser.add_argument("--non-interactive", action="store_true",
+                        help="Headless, never prompt, quit the browser on exit or SIGTERM (for cron and job runners)")
+    parser.add_argument("--ui-every", type=int, default=10, help="Hybrid mode: run the browser check every N runs")
+    parser.add_argument("--ui-max-age", type=float, default=24, help="Hybrid mode: run the browser check if the last is older (hours)")
+    parser.add_argument("--timeout-percentile", type=float, default=95,
+                        help="UI waits time out at this percentile of past durations (times a margin)")
+    parser.add_argument("--trace-webdriver", action="store_true",
+                        help="Count and time every WebDriver command per step and print a summary")
+    parser.add_argument("--profile", action="store_true", help="Also profile the Python side with cProfile")
+    parser.add_argument("--profile-out", help="Write the raw cProfile stats to this file (implies --profile)")
+    parser.add_argument("--block-resources", nargs="?", const="block", choices=["block", "measure"],
+                        help="Block images, fonts, media and analytics while pages load "
+                             "('measure': only report what blocking would save)")
+    parser.add_argument("--block-types", default="image,font,media,analytics",
+                        help="Comma separated resource types to block (image, font, media, analytics)")
+    parser.add_argument("--block-pattern", action="append", default=[],
+                        help="Extra URL pattern to block, '*' as wildcard (repeatable)")
+    return parser
+
+
+def run_bulk_file(context, path):
+    """Apply a bulk operations file; returns True if every operation succeeded."""
+    from .bulk_roles import load_operations, run_bulk, print_results_table
+
+    operations = load_operations(path)
+    print(f"Applying {len(operations)} role operations from {path}...")
+    results = run_bulk(context.lims, operations, cache=context.lookup_cache)
+    print_results_table(results)
+    print(context.lookup_cache.summary())
+    return all(r["status"] == "ok" for r in results)
+
+
+def main(argv=None):
+    """
+    Run the user test from the command line.
+
+    Returns:
+        int: Exit code, 0 if every run found the user with the expected role
+    """
+    args = build_parser().parse_args(argv)
+    if args.non_interactive:
+        args.headless = True
+        args.keep_open = False
+        # Turn a job runner's SIGTERM into a normal exit so the finally below quits the browser
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+
+    from .context import ClarityContext
+    from .runner import parse_user, run_user_test
+
+    block_patterns = None
+    if args.block_resources:
+        from .resource_blocking import blocked_patterns
+        try:
+            block_patterns = blocked_patterns([t.strip() for t in args.block_types.split(",") if t.strip()],
+                                              args.block_pattern)
+        except ValueError as e:
+            print(e)
+            return 1
+
+    context = ClarityContext(args.server, args.cache_ttl, args.headless, args.reuse_session,
+                             timeout_percentile=args.timeout_percentile, trace=args.trace_webdriver,
+                             profile=args.profile or bool(args.profile_out),
+                             block_resources=args.block_resources, block_patterns=block_patterns)
+    try:
+        if args.bulk:
+            return 0 if run_bulk_file(context, args.bulk) else 1
+        if args.scenarios:
+            from .scenario_runner import run_scenario_file
+            return 0 if all(r["found"] for r in run_scenario_file(context, args.scenarios)) else 1
+
+        passed = True
+        for role_name in [r.strip() for r in args.role.split(",") if r.strip()]:
+            try:
+                results = run_user_test(
+                    context, role_name, parse_user(args.user), args.mode,
+                    None if args.action == "none" else args.action,
+                    args.ui_every, args.ui_max_age, args.keep_open
+                )
+                passed = passed and results["found"]
+            except Exception as e:
+                print(f"\n ✗ Run for role {role_name} failed: {e}")
+                passed = False
+        return 0 if passed else 1
+    except (RuntimeError, ValueError) as e:
+        print(e)
+        return 1
+    finally:
+        if args.profile_out:
+            context.webdriver_trace.dump_profile(args.profile_out)
+        context.close()
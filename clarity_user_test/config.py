@@ -0,0 +1,39 @@
+"""
+Shared Clarity server and credential configuration.
+"""
+CLARITY_SERVERS = {
+    "prod": "https://billiontoone-prod.claritylims.com/api/v2",
+    "staging": "https://clarity-staging.btolims.com/api/v2",
+    "dev": "https://clarity-dev.btolims.com/api/v2"
+}
+
+# Web UI base URLs; the prod UI is not served from its API host
+CLARITY_UI_URLS = {
+    "prod": "https://clarity-prod.btolims.com",
+    "staging": "https://clarity-staging.btolims.com",
+    "dev": "https://clarity-dev.btolims.com"
+}
+
+# Define the same SERVICE_NAME used in store_creds.py
+SERVICE_NAME = "user_tester_app"
+
+
+def get_credentials():
+    """
+    Retrieve the stored Clarity credentials from keyring.
+
+    Returns:
+        tuple: (username, password), either may be None if not stored
+    """
+    import keyring
+
+    username = keyring.get_password(SERVICE_NAME, "USERNAME_KEY")
+    password = keyring.get_password(SERVICE_NAME, username) if username else None  # use the username as the key
+    return username, password
+
+
+def base_url_for(server):
+    """Clarity web UI base URL for a server key; derived from its API URL when none is configured."""
+    if server in CLARITY_UI_URLS:
+        return CLARITY_UI_URLS[server]
+    return CLARITY_SERVERS[server].rsplit("/api/", 1)[0]
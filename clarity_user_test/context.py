@@ -0,0 +1,175 @@
+"""
+Lazily created clients for one Clarity server.
+
+A ClarityContext holds everything a test run needs for a server:
+credentials, the s4 LIMS client, the lookup cache, the browser, the
+strategy stats, the timeout policy, the report worker, the results store and,
+when asked for, a WebDriver command trace and a resource blocker. Each is created
+on first use and then reused, so importing the package is cheap, an
+API-only run never starts a browser, and one long-lived process can run
+many tests against the same clients.
+"""
+from functools import cached_property
+
+from .config import CLARITY_SERVERS, base_url_for, get_credentials
+from .timeout_policy import DEFAULT_PERCENTILE
+
+DEFAULT_LOOKUP_CACHE_TTL = 24 * 3600
+
+
+class ClarityContext:
+    """
+    Lazily created credentials, clients and browser for one server.
+
+    Args:
+        server: Server name from CLARITY_SERVERS ('dev', 'staging' or 'prod')
+        lookup_cache_ttl: Seconds role/researcher lookups are cached on disk (0 disables the cache)
+        headless: Start the browser headless
+        reuse_session: Reuse the saved browser session (in keyring) instead of logging in every run
+        credentials: Optional (username, password); read from keyring when omitted
+        api_url: Optional API URL for a server not in CLARITY_SERVERS (e.g. the local stand-in)
+        timeout_percentile: Percentile of past step durations the UI wait timeouts are based on
+        trace: Count and time every WebDriver command per step (summary printed on close)
+        profile: Also run cProfile and print the Python hot spots on close (implies trace)
+        block_resources: None, 'block' to block non-essential resources in the browser, or
+                         'measure' to only report what blocking would save (see resource_blocking)
+        block_patterns: URL patterns to block (default: images, fonts, media and analytics)
+    """
+
+    def __init__(self, server="dev", lookup_cache_ttl=DEFAULT_LOOKUP_CACHE_TTL, headless=False,
+                 reuse_session=False, credentials=None, api_url=None, timeout_percentile=DEFAULT_PERCENTILE,
+                 trace=False, profile=False, block_resources=None, block_patterns=None):
+        if not api_url and server not in CLARITY_SERVERS:
+            raise ValueError(f"Unknown server '{server}', expected one of {sorted(CLARITY_SERVERS)}")
+        self.server = server
+        self.api_url = api_url or CLARITY_SERVERS[server]
+        self.base_url = base_url_for(server) if not api_url else api_url.rsplit("/api/", 1)[0]
+        self.lookup_cache_ttl = lookup_cache_ttl
+        self.headless = headless
+        self.reuse_session = reuse_session
+        self.timeout_percentile = timeout_percentile
+        self.trace = trace or profile
+        self.profile = profile
+        self.block_resources = block_resources
+        self.block_patterns = block_patterns
+        if credentials:
+            self.credentials = credentials
+        if profile:
+            self.webdriver_trace.start_profile()
+
+    @cached_property
+    def credentials(self):
+        username, password = get_credentials()
+        if not username or not password:
+            raise RuntimeError("Credentials not found. Please run store_creds.py first.")
+        return username, password
+
+    @property
+    def username(self):
+        return self.credentials[0]
+
+    @cached_property
+    def lims(self):
+        import s4.clarity
+
+        username, password = self.credentials
+        lims = s4.clarity.LIMS(self.api_url, username, password)
+        print(f'Connected to {self.server} - API version: {lims.versions[0]["major"]}')
+        print(f"The username is {username}")
+        return lims
+
+    @cached_property
+    def lookup_cache(self):
+        from .lookup_cache import LookupCache
+
+        return LookupCache(self.lims, self.api_url, role_ttl=self.lookup_cache_ttl,
+                           researcher_ttl=self.lookup_cache_ttl)
+
+    @cached_property
+    def driver(self):
+        from .driver_pool import create_driver
+
+        driver = create_driver(self.headless, performance_log=bool(self.block_resources))
+        if self.trace:
+            self.webdriver_trace.attach(driver)
+        if self.block_resources:
+            self.resource_blocker.enable(driver)
+        return driver
+
+    @cached_property
+    def webdriver_trace(self):
+        from .webdriver_trace import WebDriverTrace
+
+        return WebDriverTrace(profile=self.profile)
+
+    @cached_property
+    def resource_blocker(self):
+        from .resource_blocking import ResourceBlocker, blocked_patterns
+
+        return ResourceBlocker(self.base_url, self.block_patterns or blocked_patterns(),
+                               measure_only=self.block_resources == "measure")
+
+    @cached_property
+    def strategy_stats(self):
+        from .strategy_stats import StrategyStats
+
+        return StrategyStats(self.base_url)
+
+    @cached_property
+    def wait_report(self):
+        from .ui_waits import WaitReport
+
+        return WaitReport()
+
+    @cached_property
+    def timeout_policy(self):
+        from .timeout_policy import TimeoutPolicy
+
+        return TimeoutPolicy(self.base_url, percentile=self.timeout_percentile)
+
+    @cached_property
+    def report_worker(self):
+        from .report_worker import ReportWorker
+
+        return ReportWorker()
+
+    @cached_property
+    def results_store(self):
+        from .results_store import ResultsStore
+
+        return ResultsStore()
+
+    def started(self, name):
+        """True if the lazily created attribute `name` has been created."""
+        return name in self.__dict__
+
+    def close_driver(self):
+        """Quit the browser (if one was started); the next run starts a new one."""
+        if self.started("driver"):
+            try:
+                self.driver.quit()
+            except Exception:
+                pass
+            del self.__dict__["driver"]
+
+    def close(self):
+        """Quit the browser, save stats and timeouts, flush queued reports and close the results store."""
+        self.close_driver()
+        if self.started("webdriver_trace"):
+            self.webdriver_trace.print_summary()
+        if self.started("resource_blocker"):
+            self.resource_blocker.save()
+        if self.started("strategy_stats"):
+            self.strategy_stats.save()
+        if self.started("timeout_policy"):
+            self.timeout_policy.save()
+        if self.started("report_worker"):
+            self.report_worker.close()
+        if self.started("results_store"):
+            self.results_store.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
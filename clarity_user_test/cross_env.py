@@ -0,0 +1,213 @@
+"""
+Run the same user test against several Clarity servers at once.
+
+Each server gets its own ClarityContext, so its LIMS client (and the HTTP
+session behind it), lookup cache and browser are created once and reused
+for every round. The servers run in parallel and the results are printed
+side by side, with any disagreement between environments flagged.
+
+Usage:
+    python -m clarity_user_test.cross_env --servers dev,staging --role Editor --mode api
+    python -m clarity_user_test.cross_env --servers dev,staging,prod --role Editor --rounds 3 --json compare.json
+"""
+import argparse
+import io
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .config import CLARITY_SERVERS, get_credentials
+from .context import ClarityContext
+from .runner import RUN_MODES, parse_user, run_user_test
+
+
+class ThreadOutput:
+    """
+    Stand-in for sys.stdout that keeps each worker thread's output separate.
+
+    The runs print step by step; with several servers in parallel that
+    output would interleave, so worker threads write to their own buffer
+    and the main thread still writes straight through.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.buffers = {}   # key -> StringIO
+        self.threads = {}   # thread id -> StringIO
+        self.lock = threading.Lock()
+
+    def capture(self, key):
+        """Send the calling thread's output to the buffer for key."""
+        with self.lock:
+            self.threads[threading.get_ident()] = self.buffers.setdefault(key, io.StringIO())
+
+    def output(self, key):
+        buffer = self.buffers.get(key)
+        return buffer.getvalue() if buffer else ""
+
+    def release(self, key):
+        """Stop capturing the calling thread and drop the buffer for key; returns its output."""
+        with self.lock:
+            self.threads.pop(threading.get_ident(), None)
+            buffer = self.buffers.pop(key, None)
+        return buffer.getvalue() if buffer else ""
+
+    def write(self, text):
+        return self.threads.get(threading.get_ident(), self.stream).write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+def run_on_server(context, output, role_name, form_fields, mode, action):
+    """Run one test on one server, with its output captured per server."""
+    output.capture(context.server)
+    start = time.monotonic()
+    try:
+        results = run_user_test(context, role_name, form_fields, mode, action)
+    except Exception as e:
+        print(f"\n ✗ Run failed: {e}")
+        results = {"found": False, "details": f"Run failed: {str(e)[:100]}", "mismatches": [], "timings": []}
+    results["server"] = context.server
+    results["wall_seconds"] = round(time.monotonic() - start, 2)
+    return results
+
+
+def run_across_servers(contexts, role_name, form_fields=None, mode="api", action="add", rounds=1):
+    """
+    Run the same scenario on every server in parallel, for a number of rounds.
+
+    Args:
+        contexts: ClarityContext per server (reused across rounds)
+        role_name: Role to add or remove
+        form_fields: Test user form fields (see runner.parse_user)
+        mode: Run mode (see runner.run_user_test)
+        action: 'add', 'remove' or None
+        rounds: How many times to run the scenario on each server
+
+    Returns:
+        tuple: (results per round as {server: test_results}, captured output per server)
+    """
+    output = ThreadOutput(sys.stdout)
+    rounds_results = []
+    sys.stdout = output
+    try:
+        with ThreadPoolExecutor(max_workers=len(contexts)) as executor:
+            for _ in range(rounds):
+                futures = {
+                    context.server: executor.submit(run_on_server, context, output, role_name, form_fields, mode, action)
+                    for context in contexts
+                }
+                rounds_results.append({server: future.result() for server, future in futures.items()})
+    finally:
+        sys.stdout = output.stream
+    return rounds_results, {context.server: output.output(context.server) for context in contexts}
+
+
+def step_seconds(results):
+    return {t["step"]: t["seconds"] for t in results.get("timings", [])}
+
+
+def compare_results(rounds_results):
+    """
+    Build the side-by-side comparison rows.
+
+    Returns:
+        list: (label, {server: value}, differs) rows; step timings are the median over rounds
+    """
+    servers = list(rounds_results[0])
+    last = rounds_results[-1]
+    rows = []
+
+    found = {s: last[s]["found"] for s in servers}
+    rows.append(("Found", found, len(set(found.values())) > 1))
+    mismatches = {s: len(last[s].get("mismatches") or []) for s in servers}
+    rows.append(("API/UI mismatches", mismatches, any(mismatches.values())))
+    modes = {s: last[s].get("verify_mode", "") for s in servers}
+    rows.append(("Verified by", modes, False))
+
+    steps = list(dict.fromkeys(step for r in last.values() for step in step_seconds(r)))
+    for step in steps:
+        values = {}
+        for s in servers:
+            samples = sorted(step_seconds(r[s]).get(step) for r in rounds_results if step in step_seconds(r[s]))
+            values[s] = samples[len(samples) // 2] if samples else None
+        rows.append((f"{step} (s)", values, False))
+    wall = {s: sorted(r[s]["wall_seconds"] for r in rounds_results)[len(rounds_results) // 2] for s in servers}
+    rows.append(("Total (s)", wall, False))
+    return rows
+
+
+def print_comparison(rows, rounds_results, wall_clock):
+    """Print the environments side by side."""
+    servers = list(rounds_results[0])
+    width = 14
+    print("\n" + "="*70)
+    print(f"CROSS-ENVIRONMENT COMPARISON ({len(rounds_results)} round{'s' if len(rounds_results) != 1 else ''})")
+    print("="*70)
+    print(f"  {'':<24}" + "".join(f"{s:>{width}}" for s in servers))
+    for label, values, differs in rows:
+        cells = []
+        for s in servers:
+            value = values[s]
+            if isinstance(value, bool):
+                value = "✓ yes" if value else "✗ no"
+            elif isinstance(value, float):
+                value = f"{value:.2f}"
+            cells.append(f"{'' if value is None else value:>{width}}")
+        print(f"  {label[:24]:<24}" + "".join(cells) + ("   ⚠ differs" if differs else ""))
+    print("-"*70)
+    for s in servers:
+        print(f"  {s}: {rounds_results[-1][s].get('details', '')[:60]}")
+    print(f"  Wall clock: {wall_clock:.1f}s")
+    print("="*70)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the same user test on several servers at once")
+    parser.add_argument("--servers", default="dev,staging", help="Comma separated servers from CLARITY_SERVERS")
+    parser.add_argument("--role", default="Editor")
+    parser.add_argument("--user", default="Emil Test", help="Test user as 'First Last'")
+    parser.add_argument("--mode", default="api", choices=RUN_MODES)
+    parser.add_argument("--action", default="add", choices=["add", "remove", "none"])
+    parser.add_argument("--rounds", type=int, default=1, help="Runs per server (clients are reused between rounds)")
+    parser.add_argument("--json", help="Also write all results to this JSON file")
+    parser.add_argument("--verbose", action="store_true", help="Print each server's full run output")
+    args = parser.parse_args()
+
+    servers = [s.strip() for s in args.servers.split(",") if s.strip()]
+    unknown = [s for s in servers if s not in CLARITY_SERVERS]
+    if unknown:
+        parser.error(f"unknown servers {unknown}, expected {sorted(CLARITY_SERVERS)}")
+
+    credentials = get_credentials()
+    if not all(credentials):
+        print("Credentials not found. Please run store_creds.py first.")
+        exit(1)
+
+    # Browsers run headless: several servers share one screen
+    contexts = [ClarityContext(s, headless=True, credentials=credentials) for s in servers]
+    print(f"Running '{args.role}' ({args.mode}) on {', '.join(servers)} in parallel...")
+    start = time.monotonic()
+    try:
+        rounds_results, outputs = run_across_servers(
+            contexts, args.role, parse_user(args.user), args.mode,
+            None if args.action == "none" else args.action, args.rounds
+        )
+    finally:
+        for context in contexts:
+            context.close()
+
+    if args.verbose:
+        for server, text in outputs.items():
+            print(f"\n----- {server} -----\n{text}")
+    print_comparison(compare_results(rounds_results), rounds_results, time.monotonic() - start)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rounds_results, f, indent=2, default=str)
+        print(f"Results written to {args.json}")
+
+    exit(0 if all(r["found"] for rnd in rounds_results for r in rnd.values()) else 1)
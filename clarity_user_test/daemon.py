@@ -0,0 +1,454 @@
+"""
+Warm worker process that runs user tests sent over a local socket.
+
+A cold run pays for Python start-up, the LIMS connection, launching
+Chrome and logging in before about a second of real checking. The daemon
+keeps a small pool of warm slots per server, each a ClarityContext with a
+connected LIMS client, lookup cache and (for UI jobs) a logged-in
+headless browser, and runs jobs on them:
+
+    - jobs are JSON lines on a local TCP socket (127.0.0.1 by default);
+      each gets one JSON line back with the test results and run output
+    - every request must carry the daemon's token, a random secret written
+      at start-up to a file only the current user can read (TOKEN_PATH),
+      so other local users and processes cannot run role changes or stop it
+    - a slot is checked before each job and every HEALTH_INTERVAL seconds
+      while idle (browser responds, session still valid); a slot that
+      fails, errors during a job, has run MAX_JOBS_PER_SLOT jobs or is
+      older than MAX_SLOT_AGE gets a fresh browser and login
+
+Requests (the submit/status/stop commands below add the token):
+    {"token": "...", "server": "dev", "role": "Editor", "user": "Emil Test", "mode": "ui", "action": "add"}
+    {"token": "...", "command": "status"}
+    {"token": "...", "command": "stop"}
+
+Usage:
+    python -m clarity_user_test.daemon serve --servers dev,staging --pool 2
+    python -m clarity_user_test.daemon submit --server dev --role Editor --user "Emil Test"
+    python -m clarity_user_test.daemon status
+    python -m clarity_user_test.daemon stop
+"""
+import argparse
+import hmac
+import itertools
+import json
+import os
+import queue
+import secrets
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+from .cross_env import ThreadOutput
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_POOL_SIZE = 2       # Warm slots per server
+HEALTH_INTERVAL = 60        # Seconds between checks of idle slots
+MAX_JOBS_PER_SLOT = 50      # Jobs before a slot's browser is replaced
+MAX_SLOT_AGE = 3600         # Seconds before a slot's browser is replaced
+JOB_WAIT_TIMEOUT = 300      # Seconds a job waits for a free slot
+JOB_FIELDS = ("server", "role", "user", "mode", "action")
+TOKEN_PATH = os.path.join(os.path.expanduser("~"), ".clarity_user_test", "daemon_token")
+
+
+def create_token(path=TOKEN_PATH):
+    """Write a new random token readable only by the current user and return it."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    token = secrets.token_urlsafe(32)
+    if os.path.exists(path):
+        os.remove(path)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "w") as f:
+        f.write(token)
+    return token
+
+
+def read_token(path=TOKEN_PATH):
+    with open(path) as f:
+        return f.read().strip()
+
+
+class WarmSlot:
+    """One warm ClarityContext and its usage counters."""
+
+    def __init__(self, context):
+        self.context = context
+        self.started = time.monotonic()
+        self.jobs = 0
+        self.healthy = True
+        self.last_check = time.monotonic()
+
+    def age(self):
+        return time.monotonic() - self.started
+
+
+class BrowserDaemon:
+    """
+    Pools of warm slots per server and the jobs run on them.
+
+    Args:
+        servers: Server names from CLARITY_SERVERS to keep warm
+        pool_size: Warm slots per server (each with its own browser)
+        warm_browser: Start and log in the browsers up front (off for API-only use)
+        credentials: Optional (username, password); read from keyring when omitted
+        api_urls: Optional server name -> API URL for servers not in CLARITY_SERVERS
+    """
+
+    def __init__(self, servers, pool_size=DEFAULT_POOL_SIZE, warm_browser=True, credentials=None, api_urls=None):
+        from .config import get_credentials
+
+        if not credentials:
+            credentials = get_credentials()
+            if not credentials[0] or not credentials[1]:
+                raise RuntimeError("Credentials not found. Please run store_creds.py first.")
+        self.servers = list(servers)
+        self.pool_size = pool_size
+        self.warm_browser = warm_browser
+        self.credentials = credentials
+        self.api_urls = api_urls or {}
+        self.idle = {server: queue.Queue() for server in self.servers}
+        self.slots = []
+        self.lock = threading.Lock()
+        self.job_ids = itertools.count(1)
+        self.completed = 0
+        self.recycled = 0
+        self.stopping = threading.Event()
+        self.output = ThreadOutput(sys.stdout)
+
+    def new_slot(self, server):
+        from .context import ClarityContext
+
+        context = ClarityContext(server, headless=True, reuse_session=True, credentials=self.credentials,
+                                 api_url=self.api_urls.get(server))
+        return WarmSlot(context)
+
+    def warm(self, slot):
+        """Connect the slot's LIMS client and, if enabled, start its browser and log in."""
+        from .timeout_policy import use_timeout_policy
+        from .ui_steps import login
+
+        context = slot.context
+        context.lims.versions
+        if self.warm_browser:
+            username, password = context.credentials
+            with use_timeout_policy(context.timeout_policy):
+                login(context.driver, context.base_url, username, password, reuse_session=True)
+        slot.started = time.monotonic()
+        slot.healthy = True
+        slot.last_check = time.monotonic()
+
+    def start(self):
+        """Create and warm every slot (slots of all servers in parallel)."""
+        from concurrent.futures import ThreadPoolExecutor
+
+        slots = [self.new_slot(server) for server in self.servers for _ in range(self.pool_size)]
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=len(slots)) as executor:
+            for slot, error in zip(slots, executor.map(self.try_warm, slots)):
+                with self.lock:
+                    self.slots.append(slot)
+                if error:
+                    print(f"  ⚠ {slot.context.server}: warm-up failed ({error}); retried before its first job")
+                    slot.healthy = False
+                self.idle[slot.context.server].put(slot)
+        print(f"  ✓ {len(slots)} slots warm for {', '.join(self.servers)} in {time.monotonic() - start:.1f}s")
+        threading.Thread(target=self.health_loop, daemon=True).start()
+
+    def try_warm(self, slot):
+        try:
+            self.warm(slot)
+            return ""
+        except Exception as e:
+            return str(e)[:80]
+
+    def check(self, slot):
+        """True if the slot's browser (when started) responds and its Clarity session is still valid."""
+        context = slot.context
+        slot.last_check = time.monotonic()
+        try:
+            if context.started("driver"):
+                from .session_cache import session_is_valid
+
+                driver = context.driver
+                driver.execute_script("return document.readyState")
+                if driver.current_url.startswith(context.base_url) and not session_is_valid(driver, context.base_url):
+                    return False
+            return True
+        except Exception:
+            return False
+
+    def needs_recycling(self, slot):
+        if not slot.healthy:
+            return "unhealthy"
+        if slot.jobs >= MAX_JOBS_PER_SLOT:
+            return f"{slot.jobs} jobs"
+        if slot.context.started("driver") and slot.age() > MAX_SLOT_AGE:
+            return f"{slot.age() / 60:.0f} min old"
+        return ""
+
+    def recycle(self, slot, reason):
+        """Replace the slot's browser (and LIMS client) and warm it again."""
+        print(f"  → Recycling a {slot.context.server} slot ({reason})")
+        context = slot.context
+        context.close_driver()
+        context.__dict__.pop("lims", None)
+        context.__dict__.pop("lookup_cache", None)
+        slot.jobs = 0
+        with self.lock:
+            self.recycled += 1
+        error = self.try_warm(slot)
+        if error:
+            print(f"  ✗ {context.server}: warm-up failed ({error})")
+            slot.healthy = False
+        return error
+
+    def acquire(self, server, timeout=JOB_WAIT_TIMEOUT):
+        """
+        Take an idle slot for server, made healthy first.
+
+        A slot that cannot be warmed again goes back to the queue and the
+        next one is tried; after every slot has failed the job fails with
+        the last warm-up error.
+
+        Raises:
+            ValueError: If the server is not served
+            TimeoutError: If no slot became free in time
+            RuntimeError: If no slot could be warmed
+        """
+        if server not in self.idle:
+            raise ValueError(f"Server '{server}' is not served, expected one of {self.servers}")
+        deadline = time.monotonic() + timeout
+        error = ""
+        for _ in range(self.pool_size):
+            try:
+                slot = self.idle[server].get(timeout=max(0, deadline - time.monotonic()))
+            except queue.Empty:
+                raise TimeoutError(f"No free {server} slot within {timeout}s")
+            reason = self.needs_recycling(slot) or ("" if self.check(slot) else "failed health check")
+            error = self.recycle(slot, reason) if reason else ""
+            if not error:
+                return slot
+            self.release(slot)
+        raise RuntimeError(f"No {server} slot could be warmed: {error}")
+
+    def release(self, slot):
+        self.idle[slot.context.server].put(slot)
+
+    def health_loop(self):
+        """Check idle slots every HEALTH_INTERVAL seconds and recycle the stale ones."""
+        while not self.stopping.wait(HEALTH_INTERVAL):
+            for server in self.servers:
+                for _ in range(self.idle[server].qsize()):
+                    try:
+                        slot = self.idle[server].get_nowait()
+                    except queue.Empty:
+                        break
+                    try:
+                        if time.monotonic() - slot.last_check >= HEALTH_INTERVAL:
+                            reason = self.needs_recycling(slot) or ("" if self.check(slot) else "failed health check")
+                            if reason:
+                                self.recycle(slot, reason)
+                    finally:
+                        self.release(slot)
+
+    def run_job(self, job):
+        """
+        Run one user test on a warm slot.
+
+        Args:
+            job: Dict with server, role, user ('First Last'), mode and action
+
+        Returns:
+            dict: test_results plus job_id, server, wait_seconds, wall_seconds and output
+        """
+        from .runner import parse_user, run_user_test
+
+        job_id = next(self.job_ids)
+        key = f"job-{job_id}"
+        server = job.get("server") or self.servers[0]
+        action = job.get("action", "add")
+        start = time.monotonic()
+        self.output.capture(key)
+        slot = None
+        waited = 0.0
+        try:
+            slot = self.acquire(server)
+            waited = time.monotonic() - start
+            slot.jobs += 1
+            results = run_user_test(
+                slot.context, job.get("role", "Editor"), parse_user(job.get("user", "Emil Test")),
+                job.get("mode", "ui"), None if action in (None, "none") else action,
+            )
+            if str(results.get("details", "")).startswith("Error during automation"):
+                slot.healthy = False
+        except Exception as e:
+            print(f"\n ✗ Job failed: {e}")
+            results = {"found": False, "details": f"Job failed: {str(e)[:100]}", "mismatches": [], "timings": []}
+            if slot:
+                slot.healthy = False
+        finally:
+            if slot:
+                self.release(slot)
+            output = self.output.release(key)
+        with self.lock:
+            self.completed += 1
+        return dict(results, job_id=job_id, server=server, wait_seconds=round(waited, 2),
+                    wall_seconds=round(time.monotonic() - start, 2), output=output)
+
+    def status(self):
+        """Slots per server with their age, job count and health."""
+        with self.lock:
+            slots = list(self.slots)
+        return {
+            "servers": {
+                server: {
+                    "idle": self.idle[server].qsize(),
+                    "slots": [{"age_seconds": round(s.age()), "jobs": s.jobs, "healthy": s.healthy,
+                               "browser": s.context.started("driver")}
+                              for s in slots if s.context.server == server],
+                }
+                for server in self.servers
+            },
+            "completed": self.completed,
+            "recycled": self.recycled,
+        }
+
+    def handle(self, request):
+        """Answer one request dict (a job, status or stop)."""
+        command = request.get("command", "run")
+        if command == "status":
+            return self.status()
+        if command == "stop":
+            self.stopping.set()
+            return {"stopping": True}
+        if command == "run":
+            return self.run_job({field: request[field] for field in JOB_FIELDS if field in request})
+        return {"error": f"Unknown command '{command}'"}
+
+    def close(self):
+        self.stopping.set()
+        with self.lock:
+            slots, self.slots = self.slots, []
+        for slot in slots:
+            slot.context.close()
+
+
+class JobHandler(socketserver.StreamRequestHandler):
+    """One JSON request per line in, one JSON response per line out."""
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError("expected a JSON object")
+            except ValueError as e:
+                self.reply({"error": f"Bad request: {e}"})
+                continue
+            if not hmac.compare_digest(str(request.pop("token", "")).encode(), self.server.token.encode()):
+                # Wrong or missing token: answer once and drop the connection
+                self.reply({"error": "Unauthorized: missing or wrong token"})
+                return
+            self.reply(self.server.browser_daemon.handle(request))
+            if self.server.browser_daemon.stopping.is_set():
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+                return
+
+    def reply(self, response):
+        self.wfile.write((json.dumps(response, default=str) + "\n").encode())
+        self.wfile.flush()
+
+
+class JobServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, daemon, token, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        super().__init__((host, port), JobHandler)
+        self.browser_daemon = daemon
+        self.token = token
+
+
+def serve(daemon, host=DEFAULT_HOST, port=DEFAULT_PORT, token_path=TOKEN_PATH):
+    """Warm the slots and answer requests until a stop request or Ctrl+C."""
+    sys.stdout = daemon.output
+    try:
+        daemon.start()
+        with JobServer(daemon, create_token(token_path), host, port) as server:
+            print(f"  ✓ Listening on {host}:{port} (token in {token_path})")
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+    finally:
+        print("Shutting down...")
+        daemon.close()
+        sys.stdout = daemon.output.stream
+
+
+def send_request(request, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=JOB_WAIT_TIMEOUT + 300, token=None):
+    """Send one request to a running daemon and return its JSON response (token read from TOKEN_PATH)."""
+    request = dict(request, token=token or read_token())
+    with socket.create_connection((host, port), timeout=timeout) as conn:
+        conn.sendall((json.dumps(request) + "\n").encode())
+        with conn.makefile("rb") as reply:
+            line = reply.readline()
+    if not line:
+        raise ConnectionError("The daemon closed the connection without answering")
+    return json.loads(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Warm worker for Clarity user tests")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="Start the daemon")
+    serve_parser.add_argument("--servers", default="dev", help="Comma separated servers to keep warm")
+    serve_parser.add_argument("--pool", type=int, default=DEFAULT_POOL_SIZE, help="Warm slots per server")
+    serve_parser.add_argument("--api-only", action="store_true", help="Do not start browsers up front")
+
+    submit_parser = commands.add_parser("submit", help="Run one test on the daemon")
+    submit_parser.add_argument("--server", default="dev")
+    submit_parser.add_argument("--role", default="Editor")
+    submit_parser.add_argument("--user", default="Emil Test", help="Test user as 'First Last'")
+    submit_parser.add_argument("--mode", default="ui", choices=["ui", "api", "hybrid", "role"])
+    submit_parser.add_argument("--action", default="add", choices=["add", "remove", "none"])
+    submit_parser.add_argument("--verbose", action="store_true", help="Print the run output too")
+
+    commands.add_parser("status", help="Show the daemon's slots")
+    commands.add_parser("stop", help="Stop the daemon")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        from .config import CLARITY_SERVERS
+
+        servers = [s.strip() for s in args.servers.split(",") if s.strip()]
+        unknown = [s for s in servers if s not in CLARITY_SERVERS]
+        if unknown:
+            parser.error(f"unknown server(s) {unknown}, expected some of {sorted(CLARITY_SERVERS)}")
+        serve(BrowserDaemon(servers, args.pool, warm_browser=not args.api_only), args.host, args.port)
+        exit(0)
+
+    request = {"command": args.command}
+    if args.command == "submit":
+        request = {"command": "run", **{field: getattr(args, field) for field in JOB_FIELDS}}
+    try:
+        response = send_request(request, args.host, args.port)
+    except OSError as e:
+        print(f"✗ Could not reach the daemon on {args.host}:{args.port}: {e}")
+        exit(2)
+
+    if args.command == "submit":
+        output = response.pop("output", "")
+        if args.verbose:
+            print(output)
+        print(json.dumps(response, indent=2, default=str))
+        exit(0 if response.get("found") else 1)
+    print(json.dumps(response, indent=2))
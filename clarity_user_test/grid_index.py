@@ -0,0 +1,252 @@
+"""
+Single-round-trip extraction and in-memory index of the User Management grid.
+
+Reading element.text on every .g-col-value is one WebDriver HTTP round trip
+per element. extract_grid() instead pulls the whole grid out with one
+execute_script call, and GridIndex answers all six user-search strategies
+from normalized exact, case-insensitive and token indexes built over that
+snapshot, without further browser calls.
+"""
+import re
+
+# Collects every grid value, its row and column header, the .g-col-col
+# containers and the diagnostic counts search_user prints, in one call.
+EXTRACT_GRID_SCRIPT = """
+const rowSelector = "[role='row'], tr, .g-col-grid-bar-lg";
+const headerSelector = "[role='columnheader'], th, .g-col-header";
+const text = el => (el.innerText || el.textContent || "").trim();
+const ownText = el => Array.from(el.childNodes)
+    .filter(n => n.nodeType === Node.TEXT_NODE)
+    .map(n => n.textContent).join("");
+
+const rowIds = new Map();
+const values = Array.from(document.querySelectorAll(".g-col-value")).map(el => {
+    const row = el.closest(rowSelector) || el.parentElement;
+    if (!rowIds.has(row)) rowIds.set(row, rowIds.size);
+    return {
+        text: text(el),
+        own: ownText(el),
+        exact_class: el.tagName === "SPAN" && el.getAttribute("class") === "g-col-value",
+        row: rowIds.get(row)
+    };
+});
+
+return {
+    values: values,
+    containers: Array.from(document.querySelectorAll(".g-col-col")).map(text),
+    headers: Array.from(document.querySelectorAll(headerSelector)).map(text),
+    counts: {
+        grid_containers: document.getElementsByClassName("g-col-grid-bar-lg").length,
+        spans: document.getElementsByTagName("span").length,
+        tables: document.getElementsByTagName("table").length,
+        grid_roles: document.querySelectorAll("div[role='grid'], div[role='table']").length
+    }
+};
+"""
+
+TOKEN_RE = re.compile(r"[\w@.\-]+")
+
+# Header text fragments identifying the row columns
+COLUMN_HEADERS = {
+    "email": ("email", "e-mail"),
+    "username": ("username", "user name", "login"),
+    "role": ("role",),
+    "name": ("name",),
+}
+
+
+def extract_grid(driver):
+    """
+    Pull the User Management grid out of the page in one execute_script call.
+
+    Returns:
+        dict: values, containers, headers and diagnostic counts
+    """
+    return driver.execute_script(EXTRACT_GRID_SCRIPT)
+
+
+def normalize(text):
+    """Collapse whitespace so index keys match the rendered text."""
+    return " ".join(text.split())
+
+
+def tokenize(text):
+    return set(TOKEN_RE.findall(text.lower()))
+
+
+def classify_columns(headers, cell_count):
+    """Map column positions to name/username/email/role using the header labels."""
+    columns = {}
+    if len(headers) < cell_count:
+        return columns
+    for position, header in enumerate(headers[:cell_count]):
+        label = header.lower()
+        for column, fragments in COLUMN_HEADERS.items():
+            if column not in columns.values() and any(f in label for f in fragments):
+                columns[position] = column
+                break
+    return columns
+
+
+def build_rows(values, headers):
+    """
+    Group grid values into rows with name, username, email and role columns.
+
+    Columns come from the header labels when they line up with the cells,
+    otherwise from the cell contents (email contains '@', name is the first cell).
+    """
+    cells_by_row = {}
+    for value in values:
+        cells_by_row.setdefault(value["row"], []).append(normalize(value["text"]))
+
+    rows = []
+    for cells in cells_by_row.values():
+        row = {"cells": cells, "name": "", "username": "", "email": "", "role": ""}
+        for position, column in classify_columns(headers, len(cells)).items():
+            row[column] = cells[position]
+        if not row["email"]:
+            row["email"] = next((c for c in cells if "@" in c), "")
+        if not row["name"] and cells:
+            row["name"] = cells[0]
+        if not row["username"]:
+            row["username"] = next((c for c in cells[1:] if c and " " not in c and "@" not in c), "")
+        rows.append(row)
+    return rows
+
+
+class TextIndex:
+    """Exact, case-insensitive and token indexes over a list of strings."""
+
+    def __init__(self, texts):
+        self.texts = [normalize(t) for t in texts]
+        self.lowered = [t.lower() for t in self.texts]
+        self.exact = {}
+        self.exact_ci = {}
+        self.tokens = {}
+        for position, (text, lowered) in enumerate(zip(self.texts, self.lowered)):
+            self.exact.setdefault(text, position)
+            self.exact_ci.setdefault(lowered, position)
+            for token in tokenize(text):
+                self.tokens.setdefault(token, []).append(position)
+
+    def candidates(self, needle):
+        """Positions whose tokens include every whole token of the needle."""
+        postings = [self.tokens.get(token, []) for token in tokenize(needle)]
+        if not postings:
+            return []
+        common = set(min(postings, key=len))
+        for posting in postings:
+            common.intersection_update(posting)
+        return sorted(common)
+
+    def find(self, needle, case_sensitive=True):
+        """
+        Position of a text containing the needle (same semantics as `needle in text`).
+
+        Whole-cell matches come from the exact indexes, whole-word matches from
+        the token index; only partial-word needles fall back to a scan of the
+        in-memory strings. The position returned is a match, not necessarily
+        the first one in grid order.
+        """
+        needle = normalize(needle)
+        if not needle:
+            return None
+        texts = self.texts if case_sensitive else self.lowered
+        key = needle if case_sensitive else needle.lower()
+
+        exact = (self.exact if case_sensitive else self.exact_ci).get(key)
+        if exact is not None:
+            return exact
+        for position in self.candidates(needle):
+            if key in texts[position]:
+                return position
+        return next((p for p, text in enumerate(texts) if key in text), None)
+
+    def find_all_tokens(self, *parts):
+        """First position containing every part, case-insensitively."""
+        parts = [normalize(p).lower() for p in parts if p]
+        if not parts:
+            return None
+        for position in self.candidates(" ".join(parts)):
+            if all(part in self.lowered[position] for part in parts):
+                return position
+        return next((p for p, text in enumerate(self.lowered) if all(part in text for part in parts)), None)
+
+
+class GridIndex:
+    """
+    In-memory index over one grid snapshot, answering the user-search strategies.
+
+    Args:
+        snapshot: Result of extract_grid()
+    """
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        values = snapshot.get("values", [])
+        self.values = TextIndex([v["text"] for v in values])
+        self.xpath_values = TextIndex([v["own"] if v["exact_class"] else "" for v in values])
+        self.containers = TextIndex(snapshot.get("containers", []))
+        self.rows = build_rows(values, snapshot.get("headers", []))
+        self.rows_by_username = {row["username"].lower(): row for row in self.rows if row["username"]}
+        self.rows_by_email = {row["email"].lower(): row for row in self.rows if row["email"]}
+
+    def __len__(self):
+        return len(self.values.texts)
+
+    def row_for(self, name="", username="", email=""):
+        """Return the grid row for a user, matched by username, email or name."""
+        row = self.rows_by_username.get(username.lower()) or self.rows_by_email.get(email.lower())
+        if row:
+            return row
+        name = normalize(name).lower()
+        return next((r for r in self.rows if name and name in r["name"].lower()), None)
+
+    def search(self, form_fields):
+        """
+        Run the six search strategies against the index.
+
+        Args:
+            form_fields: Dict with firstName, lastName and optionally username/email
+
+        Returns:
+            tuple: (user_found, found_details, strategy_number or None)
+        """
+        search_name = f"{form_fields.get('firstName', '')} {form_fields.get('lastName', '')}"
+        texts = self.values.texts
+
+        # Strategy 1: Direct text match
+        position = self.values.find(search_name)
+        if position is not None:
+            return True, f"Found exact match: '{search_name}' in g-col-value (element #{position})", 1
+
+        # Strategy 2: Case-insensitive match
+        position = self.values.find(search_name, case_sensitive=False)
+        if position is not None:
+            return True, f"Found case-insensitive match: '{texts[position]}' contains '{search_name}'", 2
+
+        # Strategy 3: XPath-equivalent match on span.g-col-value own text
+        position = self.xpath_values.find(search_name)
+        if position is not None:
+            return True, f"Found via XPath: '{texts[position]}'", 3
+
+        # Strategy 4: Username
+        username = form_fields.get('username', '')
+        if username:
+            position = self.values.find(username, case_sensitive=False)
+            if position is not None:
+                return True, f"Found username match: '{texts[position]}' contains '{username}'", 4
+
+        # Strategy 5: Email
+        email = form_fields.get('email', '')
+        if email:
+            position = self.values.find(email, case_sensitive=False)
+            if position is not None:
+                return True, f"Found email match: '{texts[position]}' contains '{email}'", 5
+
+        # Strategy 6: Name parts in the same .g-col-col container
+        position = self.containers.find_all_tokens(form_fields.get('firstName', ''), form_fields.get('lastName', ''))
+        if position is not None:
+            return True, f"Found name parts in container: {self.containers.texts[position][:100]}", 6
+
+        return False, "", None
@@ -0,0 +1,286 @@
+"""
+User search on large User Management grids.
+
+extract_grid() reads only the rows the page has rendered. On production
+the user list has thousands of entries and may be virtualized (only the
+visible rows exist in the DOM) or paginated, so one snapshot is both slow
+to build and incomplete. find_user_in_grid() instead:
+
+    1. types into the grid's own filter box when the page has one, so
+       the page narrows the list and only a handful of rows are read;
+    2. otherwise checks the rows already rendered;
+    3. then, if the list is virtual (the grid reports more rows than it
+       renders, or the rendered rows leave empty spacer height), scrolls
+       the grid one window at a time, or pages through it, and stops at
+       the first window containing the user.
+
+Each window is scrolled, settled and extracted in a single async script
+call, and every window is searched with the same GridIndex strategies as
+a full snapshot. The number of scroll windows follows from the list's
+scroll height; a scan that stops before the end of the list is reported
+as inconclusive rather than as "not found".
+"""
+import math
+import time
+
+from selenium.webdriver.common.keys import Keys
+
+from .grid_index import EXTRACT_GRID_SCRIPT, GridIndex
+from .ui_waits import SPINNER_SELECTOR
+
+# Filter / search inputs tried in order, most specific first
+FILTER_INPUT_SELECTORS = [
+    "#configuration-app-container input[type='search']",
+    "#configuration-app-container input[placeholder*='Filter' i]",
+    "#configuration-app-container input[placeholder*='Search' i]",
+    "input.g-col-filter, .g-col-filter input",
+    "input[type='search']",
+    "input[placeholder*='Filter' i]",
+    "input[placeholder*='Search' i]",
+]
+
+NEXT_PAGE_SELECTORS = [
+    "button[aria-label*='next' i]:not([disabled])",
+    ".pagination-next:not(.disabled) a, .pagination-next:not(.disabled)",
+    "li.next:not(.disabled) a",
+]
+
+MAX_PAGES = 400       # Pages read before giving up on a paginated list
+SCROLL_OVERLAP = 0.9  # Fraction of the visible height scrolled per window
+SETTLE_MS = 150       # Quiet DOM time after a scroll or filter before reading rows
+SETTLE_TIMEOUT_MS = 5000
+
+LOCATE_CONTROLS_SCRIPT = """
+const visible = el => el && el.offsetParent !== null && !el.disabled;
+const first = selectors => {
+    for (const selector of selectors) {
+        for (const el of document.querySelectorAll(selector)) {
+            if (visible(el)) return el;
+        }
+    }
+    return null;
+};
+const value = document.querySelector(".g-col-value");
+let scroller = null;
+for (let el = value && value.parentElement; el && el !== document.body; el = el.parentElement) {
+    const overflow = getComputedStyle(el).overflowY;
+    if ((overflow === "auto" || overflow === "scroll") && el.scrollHeight > el.clientHeight + 1) {
+        scroller = el;
+        break;
+    }
+}
+const page = document.scrollingElement;
+if (!scroller && page && page.scrollHeight > page.clientHeight + 1) scroller = page;
+
+// Scrolling only reveals rows when the list is virtual: the grid reports more
+// rows than it renders, or the rendered values leave spacer height behind
+let virtual = false;
+if (scroller && value) {
+    const grid = value.closest("[aria-rowcount]");
+    const rowCount = grid ? parseInt(grid.getAttribute("aria-rowcount"), 10) : NaN;
+    if (rowCount > 0) {
+        virtual = grid.querySelectorAll("[role='row']").length < rowCount;
+    } else {
+        let top = Infinity, bottom = -Infinity;
+        for (const el of document.querySelectorAll(".g-col-value")) {
+            const rect = el.getBoundingClientRect();
+            top = Math.min(top, rect.top);
+            bottom = Math.max(bottom, rect.bottom);
+        }
+        const uncovered = scroller.scrollHeight - (bottom - top);
+        virtual = uncovered > scroller.clientHeight / 2;
+    }
+}
+return {
+    filter: first(arguments[0]),
+    scroller: scroller,
+    virtual: virtual,
+    next_page: first(arguments[1])
+};
+"""
+
+# Scrolls (or clicks the next-page control), waits until the DOM has been
+# quiet for settleMs with no spinner, then returns the rendered rows.
+WINDOW_SCRIPT = """
+const [target, action, overlap, settleMs, timeoutMs, spinnerSelector] = arguments;
+const done = arguments[arguments.length - 1];
+const extractGrid = () => {
+""" + EXTRACT_GRID_SCRIPT + """
+};
+const before = target && action !== "click" ? target.scrollTop : 0;
+if (target && action === "top") target.scrollTop = 0;
+if (target && action === "scroll") target.scrollTop = before + Math.max(1, target.clientHeight * overlap);
+if (target && action === "click") target.click();
+
+const start = Date.now();
+let last = Date.now();
+const observer = new MutationObserver(() => { last = Date.now(); });
+observer.observe(document.body, {childList: true, subtree: true, characterData: true});
+const check = () => {
+    const now = Date.now();
+    const quiet = now - last >= settleMs && !document.querySelector(spinnerSelector);
+    if (quiet || now - start >= timeoutMs) {
+        observer.disconnect();
+        const scrolled = target && action !== "click";
+        done({
+            snapshot: extractGrid(),
+            moved: scrolled ? target.scrollTop !== before || action === "top" : action === "click",
+            at_end: scrolled ? target.scrollTop + target.clientHeight >= target.scrollHeight - 2 : true,
+            scroll_height: scrolled ? target.scrollHeight : 0,
+            client_height: scrolled ? target.clientHeight : 0,
+            settled: quiet
+        });
+    } else {
+        setTimeout(check, 25);
+    }
+};
+setTimeout(check, 0);
+"""
+
+
+def locate_controls(driver):
+    """
+    Find the grid's filter box, scroll container and next-page control in one call.
+
+    Returns:
+        dict: filter, scroller and next_page elements (or None), and virtual (scrolling
+              the scroller renders rows that are not in the DOM yet)
+    """
+    return driver.execute_script(LOCATE_CONTROLS_SCRIPT, FILTER_INPUT_SELECTORS, NEXT_PAGE_SELECTORS)
+
+
+def read_window(driver, target=None, action="stay", settle_ms=SETTLE_MS, timeout_ms=SETTLE_TIMEOUT_MS):
+    """
+    Scroll or click, wait for the grid to settle and read the rendered rows in one call.
+
+    Args:
+        driver: Selenium WebDriver instance
+        target: Scroll container (for 'top'/'scroll') or control (for 'click'), or None
+        action: 'stay', 'top', 'scroll' or 'click'
+        settle_ms: Quiet DOM time required before reading
+        timeout_ms: Maximum time to wait for the DOM to settle
+
+    Returns:
+        dict: snapshot (see extract_grid), moved, at_end and settled flags, and the
+              target's scroll_height and client_height
+    """
+    driver.set_script_timeout(timeout_ms / 1000 + 5)
+    return driver.execute_async_script(
+        WINDOW_SCRIPT, target, action, SCROLL_OVERLAP, settle_ms, timeout_ms, SPINNER_SELECTOR
+    )
+
+
+def scroll_window_limit(window):
+    """Scroll windows needed to cover the list's current scroll height, plus one for the last."""
+    step = max(1, window["client_height"] * SCROLL_OVERLAP)
+    return math.ceil(window["scroll_height"] / step) + 1
+
+
+def filter_terms(form_fields):
+    """Text typed into the filter box, most selective first."""
+    name = f"{form_fields.get('firstName', '')} {form_fields.get('lastName', '')}".strip()
+    terms = [name, form_fields.get('username', ''), form_fields.get('lastName', '')]
+    return [t for i, t in enumerate(terms) if t and t not in terms[:i]]
+
+
+def type_filter(filter_input, text):
+    """Replace the filter box contents with text, with real key events so the page reacts."""
+    filter_input.clear()
+    filter_input.send_keys(Keys.CONTROL, "a")
+    filter_input.send_keys(Keys.DELETE)
+    if text:
+        filter_input.send_keys(text)
+
+
+def find_user_in_grid(driver, form_fields, max_pages=MAX_PAGES, use_filter=True):
+    """
+    Find a user in the User Management grid without reading the whole list.
+
+    Args:
+        driver: Selenium WebDriver instance on the User Management page
+        form_fields: Dict with firstName, lastName and optionally username/email
+        max_pages: Pages of a paginated list to read before giving up
+        use_filter: Use the page's filter box when there is one
+
+    Returns:
+        dict: found, inconclusive (the scan stopped before the end of the list, so
+              not finding the user proves nothing; details says why), details,
+              strategy (GridIndex strategy number), method ('filter', 'rendered',
+              'scroll' or 'pages'), grid (GridIndex of the window searched last),
+              windows read, values read and seconds
+    """
+    start = time.monotonic()
+    result = {"found": False, "inconclusive": False, "details": "", "strategy": None, "method": None,
+              "grid": GridIndex({}), "windows": 0, "values": 0}
+    truncated = None
+
+    def search(window, method):
+        grid = GridIndex(window["snapshot"])
+        found, details, strategy = grid.search(form_fields)
+        result.update(grid=grid, method=method, windows=result["windows"] + 1, values=result["values"] + len(grid))
+        if found:
+            result.update(found=True, details=details, strategy=strategy)
+        return found
+
+    def finish():
+        result["seconds"] = round(time.monotonic() - start, 2)
+        return result
+
+    controls = locate_controls(driver)
+
+    # 1. The page's own filter: cost depends on the matches, not the list size
+    if use_filter and controls["filter"] is not None:
+        filter_input = controls["filter"]
+        for term in filter_terms(form_fields):
+            type_filter(filter_input, term)
+            if search(read_window(driver), "filter"):
+                print(f"  ✓ Found via the grid filter ('{term}')")
+                return finish()
+        # Clear the filter so scrolling sees the whole list again
+        type_filter(filter_input, "")
+        controls = locate_controls(driver)
+        print("  ⚠ Grid filter did not match, scanning the list")
+
+    # 2. The rows already rendered
+    if search(read_window(driver), "rendered"):
+        return finish()
+
+    # 3. Scroll through a virtualized list window by window (a fully rendered
+    #    list was covered by step 2)
+    scroller = controls["scroller"]
+    if scroller is not None and controls["virtual"]:
+        window = read_window(driver, scroller, "top")
+        scrolled = 0
+        while True:
+            scrolled += 1
+            if search(window, "scroll"):
+                print(f"  ✓ Found after scrolling {scrolled} windows")
+                return finish()
+            if window["at_end"]:
+                break
+            # The limit follows the scroll height, which grows if the list loads more rows
+            if scrolled >= scroll_window_limit(window):
+                truncated = f"Stopped after {scrolled} scroll windows before the end of the list"
+                break
+            window = read_window(driver, scroller, "scroll")
+            if not window["moved"]:
+                truncated = f"The list stopped scrolling after {scrolled} windows, before its end"
+                break
+
+    # 4. Page through a paginated list
+    next_page = controls["next_page"]
+    pages = 0
+    while next_page is not None:
+        if pages >= max_pages:
+            truncated = f"Stopped after {max_pages} pages before the last page"
+            break
+        pages += 1
+        if search(read_window(driver, next_page, "click"), "pages"):
+            print(f"  ✓ Found on page {pages + 1}")
+            return finish()
+        next_page = locate_controls(driver)["next_page"]
+
+    if truncated:
+        result.update(inconclusive=True, details=f"Inconclusive: {truncated}")
+        print(f"  ⚠ {truncated}")
+    return finish()
@@ -0,0 +1,163 @@
+"""
+Persistent on-disk cache for Clarity role and researcher lookups.
+
+lims.roles.get_by_name() and lims.researchers.query() cost a round trip to
+Clarity on every run, even though roles almost never change. LookupCache
+stores the URIs those lookups resolve to in a local SQLite file, keyed by
+server, and hands back lazily loaded s4 objects for them on later runs.
+
+What a hit saves is the search itself: a role comes back with its name and
+URI and needs no further request to be added or removed, but a researcher
+still loads its fields (username, roles, ...) with one GET on first access,
+since the callers need the live object to change and commit its roles.
+
+Entries expire after a configurable TTL. Researcher entries should be
+invalidated after our own commit() calls (add_role_to_user and
+remove_role_from_user do this when given the cache).
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".clarity_user_test", "lookup_cache.sqlite")
+DEFAULT_ROLE_TTL = 7 * 24 * 3600  # Roles almost never change
+DEFAULT_RESEARCHER_TTL = 24 * 3600
+
+
+class LookupCache:
+    """
+    Cache role and researcher lookups for one Clarity server.
+
+    Args:
+        lims: s4.clarity.LIMS instance used on a cache miss
+        server: Server key, e.g. the API URL from CLARITY_SERVERS
+        path: SQLite file to store entries in
+        role_ttl: Seconds a role lookup stays valid (0 disables caching)
+        researcher_ttl: Seconds a researcher query stays valid (0 disables caching)
+    """
+
+    def __init__(self, lims, server, path=DEFAULT_CACHE_PATH,
+                 role_ttl=DEFAULT_ROLE_TTL, researcher_ttl=DEFAULT_RESEARCHER_TTL):
+        self.lims = lims
+        self.server = server
+        self.path = path
+        self.ttl = {"role": role_ttl, "researcher": researcher_ttl}
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self.connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS lookups ("
+                " server TEXT NOT NULL, kind TEXT NOT NULL, key TEXT NOT NULL,"
+                " uris TEXT NOT NULL, stored_at REAL NOT NULL,"
+                " PRIMARY KEY (server, kind, key))"
+            )
+
+    @contextmanager
+    def connect(self):
+        """A connection for one transaction: committed (or rolled back) and closed on exit."""
+        # One connection per call keeps the cache safe to share between threads
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # ------------------------
+    # Storage
+    # ------------------------
+
+    def load(self, kind, key):
+        """Return the cached URI list for a lookup, or None if missing or expired."""
+        ttl = self.ttl[kind]
+        if ttl <= 0:
+            return None
+        with self.connect() as conn:
+            row = conn.execute(
+                "SELECT uris, stored_at FROM lookups WHERE server = ? AND kind = ? AND key = ?",
+                (self.server, kind, key),
+            ).fetchone()
+        if row is None or time.time() - row[1] > ttl:
+            return None
+        return json.loads(row[0])
+
+    def store(self, kind, key, uris):
+        if self.ttl[kind] <= 0:
+            return
+        with self.connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO lookups (server, kind, key, uris, stored_at) VALUES (?, ?, ?, ?, ?)",
+                (self.server, kind, key, json.dumps(uris), time.time()),
+            )
+
+    def count(self, hit):
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    # ------------------------
+    # Lookups
+    # ------------------------
+
+    def get_role(self, role_name):
+        """Cached equivalent of lims.roles.get_by_name(role_name)."""
+        uris = self.load("role", role_name)
+        if uris:
+            self.count(hit=True)
+            return self.lims.roles.get(uris[0], name=role_name)
+
+        self.count(hit=False)
+        role_obj = self.lims.roles.get_by_name(role_name)
+        if role_obj is not None:
+            self.store("role", role_name, [role_obj.uri])
+        return role_obj
+
+    def query_researchers(self, **query):
+        """Cached equivalent of lims.researchers.query(**query); the researchers still load on first access."""
+        key = json.dumps(query, sort_keys=True)
+        uris = self.load("researcher", key)
+        if uris is not None:
+            self.count(hit=True)
+            return [self.lims.researchers.get(uri) for uri in uris]
+
+        self.count(hit=False)
+        researchers = self.lims.researchers.query(**query)
+        self.store("researcher", key, [r.uri for r in researchers])
+        return researchers
+
+    # ------------------------
+    # Invalidation and stats
+    # ------------------------
+
+    def invalidate_researcher(self, user):
+        """Drop every cached researcher query that returned this researcher."""
+        with self.connect() as conn:
+            rows = conn.execute(
+                "SELECT key, uris FROM lookups WHERE server = ? AND kind = 'researcher'",
+                (self.server,),
+            ).fetchall()
+            stale = [(self.server, key) for key, uris in rows if user.uri in json.loads(uris)]
+            conn.executemany(
+                "DELETE FROM lookups WHERE server = ? AND kind = 'researcher' AND key = ?", stale
+            )
+
+    def invalidate(self, kind=None):
+        """Drop all cached entries for this server, optionally only one kind ('role' or 'researcher')."""
+        with self.connect() as conn:
+            if kind:
+                conn.execute("DELETE FROM lookups WHERE server = ? AND kind = ?", (self.server, kind))
+            else:
+                conn.execute("DELETE FROM lookups WHERE server = ?", (self.server,))
+
+    def summary(self):
+        total = self.hits + self.misses
+        rate = f"{100 * self.hits / total:.0f}%" if total else "n/a"
+        return f"Lookup cache: {self.hits} hits, {self.misses} misses (hit rate {rate})"
@@ -0,0 +1,251 @@
+"""
+Role-propagation latency: how long a committed role change takes to show.
+
+A measurement logs in and opens User Management first, then commits a
+role change and polls, at the same time and with backoff:
+
+    - the API: a fresh GET of the researcher until the role is (or is
+      no longer) listed
+    - the UI: a reload of the user list until the user's row shows (or
+      no longer shows) the role
+
+Each delay is measured from the moment the commit returned. Every
+measurement is stored as a run in the results history, with the steps
+role_commit, propagation_api and propagation_ui, so delays can be
+compared across runs and servers:
+
+    python -m clarity_user_test.results_store histogram --step propagation_ui --by-server
+    python -m clarity_user_test.results_store latency --step propagation_ui --server staging --by week
+
+Usage:
+    python -m clarity_user_test.propagation --server dev --role Editor --repeat 5 --headless
+    python -m clarity_user_test.propagation --server staging --role Editor --action add --api-only
+"""
+import argparse
+import threading
+import time
+
+from .roles import change_role, has_role
+from .timing import StepTimer
+
+DEFAULT_TIMEOUT = 120     # Seconds to wait for a change to show before giving up
+BACKOFF_INITIAL = 0.25    # Seconds before the second poll
+BACKOFF_FACTOR = 1.6
+BACKOFF_MAX = 5.0         # Longest gap between polls
+PROPAGATION_ACTIONS = ("toggle", "add", "remove")
+
+
+def poll_with_backoff(check, since, timeout=DEFAULT_TIMEOUT, initial=BACKOFF_INITIAL,
+                      factor=BACKOFF_FACTOR, max_interval=BACKOFF_MAX):
+    """
+    Call check() with exponentially growing gaps until it returns True or the timeout expires.
+
+    Args:
+        check: Callable returning True once the change is visible (exceptions count as not yet)
+        since: time.monotonic() the delay is measured from
+        timeout: Seconds after `since` to give up
+
+    Returns:
+        dict: met, seconds (from `since` to the poll that saw the change), polls, error
+    """
+    interval = initial
+    polls = 0
+    error = ""
+    while True:
+        polls += 1
+        try:
+            if check():
+                return {"met": True, "seconds": round(time.monotonic() - since, 3), "polls": polls, "error": ""}
+        except Exception as e:
+            error = str(e)[:80]
+        remaining = since + timeout - time.monotonic()
+        if remaining <= 0:
+            return {"met": False, "seconds": round(time.monotonic() - since, 3), "polls": polls, "error": error}
+        time.sleep(min(interval, remaining))
+        interval = min(max_interval, interval * factor)
+
+
+def api_check(lims, user, role_obj, expect_role):
+    """Check function: a fresh GET of the researcher shows the expected role state."""
+    def check():
+        researcher = lims.researchers.get(user.uri)
+        researcher.refresh()
+        return has_role(researcher, role_obj) == expect_role
+    return check
+
+
+def ui_check(driver, users_url, form_fields, role_name, expect_role):
+    """Check function: the reloaded user list shows the expected role state in the user's row."""
+    from .grid_search import find_user_in_grid
+    from .ui_waits import wait_for, url_contains
+
+    def check():
+        driver.get(users_url)
+        wait_for(driver, url_contains("user-management"), "Propagation: reload users", timeout=15)
+        result = find_user_in_grid(driver, form_fields)
+        if not result["found"]:
+            return False
+        search_name = f"{form_fields['firstName']} {form_fields['lastName']}"
+        row = result["grid"].row_for(search_name, form_fields.get("username", ""))
+        if row is None:
+            return False
+        shown = [r.strip() for r in row["role"].split(",")] if row["role"] else row["cells"]
+        return (role_name in shown) == expect_role
+    return check
+
+
+def measure_propagation(context, role_name, form_fields, action="toggle", timeout=DEFAULT_TIMEOUT, ui=True):
+    """
+    Commit one role change and measure how long the API and the UI take to show it.
+
+    Args:
+        context: ClarityContext for the server
+        role_name: Role to add or remove
+        form_fields: Test user (see runner.parse_user)
+        action: 'add', 'remove' or 'toggle' (flip whatever the user has now)
+        timeout: Seconds to wait for each side to show the change
+        ui: Also poll the UI (needs a browser)
+
+    Returns:
+        dict: test_results-style result with found (both sides showed the change in time),
+              details, api and ui poll results and timings
+    """
+    timer = StepTimer()
+    cache = context.lookup_cache
+    user = cache.query_researchers(**{
+        'firstname': [form_fields["firstName"]],
+        'lastname': form_fields["lastName"]
+    })[0]
+    role_obj = cache.get_role(role_name)
+    if role_obj is None:
+        raise LookupError(f"Unknown role '{role_name}'")
+    form_fields = dict(form_fields, username=user.username)
+
+    user.refresh()
+    present = has_role(user, role_obj)
+    if action == "toggle":
+        action = "remove" if present else "add"
+    elif (action == "add") == present:
+        raise ValueError(f"{user.username} {'already has' if present else 'does not have'} {role_name}; "
+                         f"use --action toggle or the opposite action")
+    expect_role = action == "add"
+
+    check_ui = None
+    if ui:
+        from .timeout_policy import use_timeout_policy
+        from .ui_steps import fallback_urls, login, open_user_management, wait_for_user_list
+        from .ui_waits import element_wait
+
+        # Get the browser onto the user list before the commit, so polling starts at once
+        username, password = context.credentials
+        driver = context.driver
+        with use_timeout_policy(context.timeout_policy), timer.span("ui_ready"):
+            login(driver, context.base_url, username, password, context.reuse_session)
+            open_user_management(driver, element_wait(driver), context.base_url, context.strategy_stats)
+            wait_for_user_list(driver)
+        check_ui = ui_check(driver, fallback_urls(context.base_url)["user_management"], form_fields,
+                            role_name, expect_role)
+
+    print(f"\n⏳ Committing: {action} {role_name} for {user.username}")
+    with timer.span("role_commit"):
+        change_role(action, user, role_obj, user.username, role_name, cache)
+    committed = time.monotonic()
+
+    # Poll the API on a thread while the UI is polled here (the browser is not thread safe)
+    api_result = {}
+    api_thread = threading.Thread(
+        target=lambda: api_result.update(poll_with_backoff(api_check(context.lims, user, role_obj, expect_role),
+                                                           committed, timeout)),
+        daemon=True,
+    )
+    api_thread.start()
+    ui_result = poll_with_backoff(check_ui, committed, timeout) if check_ui else None
+    api_thread.join()
+
+    timer.add("propagation_api", committed, api_result["seconds"], api_result["met"])
+    if ui_result:
+        timer.add("propagation_ui", committed, ui_result["seconds"], ui_result["met"])
+
+    def describe(name, result):
+        if result["met"]:
+            return f"{name} after {result['seconds']:.2f}s ({result['polls']} polls)"
+        return f"{name} not visible after {result['seconds']:.0f}s{': ' + result['error'] if result['error'] else ''}"
+
+    details = [describe("API", api_result)] + ([describe("UI", ui_result)] if ui_result else [])
+    return {
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "search_name": f"{form_fields['firstName']} {form_fields['lastName']}",
+        "role": role_name,
+        "action": action,
+        "had_role": present,
+        "found": api_result["met"] and (ui_result is None or ui_result["met"]),
+        "details": f"{action} {role_name}: " + "; ".join(details),
+        "verify_mode": "propagation",
+        "mismatches": [],
+        "api": api_result,
+        "ui": ui_result,
+        "timings": timer.as_list(),
+    }
+
+
+def print_propagation(results):
+    """Print each measurement and the spread of the delays."""
+    print("\n" + "="*70)
+    print("ROLE PROPAGATION")
+    print("="*70)
+    for r in results:
+        print(f"  {'✓' if r['found'] else '✗'} {r['details']}")
+    for side in ("api", "ui"):
+        delays = sorted(r[side]["seconds"] for r in results if r.get(side) and r[side]["met"])
+        if delays:
+            print(f"  {side.upper()}: min {delays[0]:.2f}s, median {delays[len(delays) // 2]:.2f}s, "
+                  f"max {delays[-1]:.2f}s over {len(delays)} changes")
+    print("="*70)
+
+
+if __name__ == "__main__":
+    from .config import CLARITY_SERVERS
+    from .context import ClarityContext
+    from .runner import parse_user
+
+    parser = argparse.ArgumentParser(description="Measure how long a role change takes to show in the API and UI")
+    parser.add_argument("--server", default="dev", choices=sorted(CLARITY_SERVERS))
+    parser.add_argument("--role", default="Editor")
+    parser.add_argument("--user", default="Emil Test", help="Test user as 'First Last'")
+    parser.add_argument("--action", default="toggle", choices=PROPAGATION_ACTIONS)
+    parser.add_argument("--repeat", type=int, default=1, help="Measurements to take (toggle flips the role each time)")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="Seconds to wait for each change")
+    parser.add_argument("--api-only", action="store_true", help="Only poll the API")
+    parser.add_argument("--headless", action="store_true", help="Run the browser headless")
+    parser.add_argument("--restore", action="store_true", help="Put the user's role back as it was afterwards")
+    args = parser.parse_args()
+
+    results = []
+    with ClarityContext(args.server, headless=args.headless) as context:
+        for i in range(args.repeat):
+            try:
+                result = measure_propagation(context, args.role, parse_user(args.user), args.action,
+                                             args.timeout, ui=not args.api_only)
+            except Exception as e:
+                print(f"  ✗ Measurement {i + 1} failed: {e}")
+                break
+            print(f"  {'✓' if result['found'] else '✗'} {result['details']}")
+            results.append(result)
+            try:
+                context.results_store.add_run(result, args.server)
+            except Exception as e:
+                print(f"  ⚠ Could not save the measurement to the results history: {str(e)[:50]}")
+
+        if args.restore and results and (not results[-1]["had_role"]) != results[0]["had_role"]:
+            # Each measurement flipped the role; undo the net change
+            restore_action = "add" if results[0]["had_role"] else "remove"
+            form_fields = parse_user(args.user)
+            user = context.lookup_cache.query_researchers(**{
+                'firstname': [form_fields["firstName"]],
+                'lastname': form_fields["lastName"]
+            })[0]
+            change_role(restore_action, user, context.lookup_cache.get_role(args.role), user.username,
+                        args.role, context.lookup_cache)
+
+    print_propagation(results)
+    exit(0 if results and all(r["found"] for r in results) else 1)
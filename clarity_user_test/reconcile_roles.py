@@ -0,0 +1,343 @@
+"""
+Desired-state role reconciliation for Clarity researchers.
+
+Reads a file saying which roles each researcher should have, fetches the
+current state in bulk, and commits only the researchers whose roles
+differ, with the minimal add/remove changes:
+
+    - all roles are listed in one request
+    - researchers named by username are looked up 100 per query, then
+      their current roles are fetched concurrently
+    - researchers that already match are left alone, so a re-run makes
+      no commits at all
+
+Desired-state file, JSON or YAML (needs PyYAML):
+
+    {
+      "managed_roles": ["Editor", "Collaborator"],
+      "users": [
+        {"username": "etest", "roles": ["Editor"]},
+        {"firstname": "Matrix", "lastname": "Collab", "roles": ["Collaborator", "Editor"]}
+      ]
+    }
+
+or CSV with columns username, firstname, lastname, roles (roles separated
+by ';'). managed_roles is optional: when given, roles outside it are never
+removed; without it each user ends up with exactly the listed roles.
+
+Usage:
+    python -m clarity_user_test.reconcile_roles desired_roles.json --server dev --dry-run
+    python -m clarity_user_test.reconcile_roles desired_roles.csv --server dev --workers 8
+    python -m clarity_user_test.reconcile_roles --standin --users 500   # timed run against the local stand-in
+"""
+import argparse
+import csv
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .bulk_roles import RateLimiter, with_retry
+
+QUERY_CHUNK = 100  # Usernames per researcher query (keeps the URL short)
+
+
+def load_desired_state(path):
+    """
+    Load a desired-state file.
+
+    Returns:
+        dict: users (username, firstname, lastname, roles) and managed_roles (list or None)
+
+    Raises:
+        ValueError: If a user has no username or name, or appears twice
+    """
+    if path.lower().endswith(".csv"):
+        with open(path, newline="") as f:
+            document = {"users": [
+                dict(row, roles=[r.strip() for r in (row.get("roles") or "").split(";") if r.strip()])
+                for row in csv.DictReader(f)
+            ]}
+    else:
+        with open(path) as f:
+            text = f.read()
+        if path.lower().endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise RuntimeError("PyYAML is needed for YAML files (pip install pyyaml); or use JSON/CSV")
+            document = yaml.safe_load(text)
+        else:
+            document = json.loads(text)
+
+    users = []
+    seen = set()
+    for line, entry in enumerate(document.get("users", []), start=1):
+        user = {key: str(entry.get(key) or "").strip() for key in ("username", "firstname", "lastname")}
+        user["roles"] = sorted({str(r).strip() for r in entry.get("roles") or [] if str(r).strip()})
+        if not user["username"] and not (user["firstname"] and user["lastname"]):
+            raise ValueError(f"User {line}: need a username or firstname and lastname")
+        key = user_key(user)
+        if key in seen:
+            raise ValueError(f"User {line}: '{key}' is listed twice")
+        seen.add(key)
+        users.append(user)
+    return {"users": users, "managed_roles": document.get("managed_roles")}
+
+
+def user_key(user):
+    return user["username"] or f"{user['firstname']} {user['lastname']}"
+
+
+def fetch_roles(lims):
+    """All roles, name -> role object, from one list request."""
+    return {role.name: role for role in lims.roles.all(prefetch=False)}
+
+
+def fetch_researchers(lims, users, limiter, max_workers=8, retries=3, backoff=0.5):
+    """
+    Find and fully load the researchers for the desired-state users.
+
+    Usernames are queried QUERY_CHUNK at a time; users given by name are
+    queried one by one. The full researcher records (with their roles)
+    are then fetched concurrently. Every request goes through the rate
+    limiter and retries; a lookup or load that still fails becomes an
+    error for its users (a failed plan entry) instead of stopping the run.
+
+    Returns:
+        tuple: (user key -> researcher, user key -> lookup error)
+    """
+    researchers = {}
+    errors = {}
+    load_errors = {}   # researcher uri -> error
+
+    def load(researcher):
+        try:
+            with_retry(researcher.refresh, limiter, retries, backoff)
+            return researcher
+        except Exception as e:
+            load_errors[researcher.uri] = f"Could not load researcher: {str(e)[:60]}"
+            return None
+
+    def query_names(user):
+        try:
+            matches = with_retry(
+                lambda: lims.researchers.query(prefetch=False, firstname=[user["firstname"]], lastname=user["lastname"]),
+                limiter, retries, backoff)[0]
+            return user, matches, ""
+        except Exception as e:
+            return user, [], f"Lookup failed: {str(e)[:60]}"
+
+    usernames = [u["username"] for u in users if u["username"]]
+    by_name = [u for u in users if not u["username"]]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        # Lookups: a few list requests for all usernames, one per name-only user
+        found = []
+        for i in range(0, len(usernames), QUERY_CHUNK):
+            chunk = usernames[i:i + QUERY_CHUNK]
+            try:
+                found += with_retry(lambda: lims.researchers.query(prefetch=False, username=chunk),
+                                    limiter, retries, backoff)[0]
+            except Exception as e:
+                for username in chunk:
+                    errors[username] = f"Lookup failed: {str(e)[:60]}"
+        for user, matches, error in pool.map(query_names, by_name):
+            if error:
+                errors[user_key(user)] = error
+            elif len(matches) == 1:
+                found.append(matches[0])
+                researchers[user_key(user)] = matches[0]
+            else:
+                errors[user_key(user)] = f"{len(matches)} researchers match '{user_key(user)}'"
+
+        # Current state: every matched researcher, fetched concurrently
+        loaded = [r for r in pool.map(load, {r.uri: r for r in found}.values()) if r is not None]
+
+    for key, researcher in list(researchers.items()):
+        if researcher.uri in load_errors:
+            errors[key] = load_errors[researcher.uri]
+            del researchers[key]
+    by_username = {r.username: r for r in loaded}
+    for username in usernames:
+        if username in by_username:
+            researchers[username] = by_username[username]
+        elif username in errors:
+            continue
+        elif load_errors:
+            # Failed loads have no username yet, so any of them may have been this user
+            errors[username] = (f"Not matched; {len(load_errors)} researcher(s) failed to load "
+                                f"({next(iter(load_errors.values()))})")
+        else:
+            errors[username] = f"No researcher with username '{username}'"
+    return researchers, errors
+
+
+def plan_changes(users, researchers, errors, roles, managed_roles=None):
+    """
+    Compute the minimal role changes per user.
+
+    Args:
+        users: Desired-state users
+        researchers: user key -> loaded researcher
+        errors: user key -> lookup error
+        roles: role name -> role object
+        managed_roles: Role names that may be removed (None: any role)
+
+    Returns:
+        list: One plan entry per user with add, remove, status and error
+    """
+    uri_to_name = {role.uri: name for name, role in roles.items()}
+    plan = []
+    for user in users:
+        key = user_key(user)
+        entry = {"user": key, "researcher": None, "add": [], "remove": [], "status": "unchanged", "error": ""}
+        unknown = [name for name in user["roles"] if name not in roles]
+        if key in errors or unknown:
+            entry["status"] = "failed"
+            entry["error"] = errors.get(key) or f"Unknown role(s): {', '.join(unknown)}"
+            plan.append(entry)
+            continue
+
+        researcher = researchers[key]
+        current = {uri_to_name.get(r.uri, r.name) for r in researcher.roles}
+        desired = set(user["roles"])
+        removable = current if managed_roles is None else current & set(managed_roles)
+        entry.update(
+            researcher=researcher,
+            add=sorted(desired - current),
+            remove=sorted(removable - desired),
+        )
+        if entry["add"] or entry["remove"]:
+            entry["status"] = "pending"
+        plan.append(entry)
+    return plan
+
+
+def apply_plan(plan, roles, limiter, max_workers=8, retries=3, backoff=0.5, cache=None):
+    """
+    Commit the planned changes, one commit per changed researcher.
+
+    Updates each pending plan entry's status to 'changed' or 'failed'.
+    """
+    def apply(entry):
+        start = time.monotonic()
+        researcher = entry["researcher"]
+        try:
+            for name in entry["add"]:
+                researcher.add_role(roles[name])
+            for name in entry["remove"]:
+                researcher.remove_role(roles[name])
+            with_retry(researcher.commit, limiter, retries, backoff)
+            if cache:
+                cache.invalidate_researcher(researcher)
+            entry["status"] = "changed"
+        except Exception as e:
+            entry["status"] = "failed"
+            entry["error"] = str(e)[:80]
+        entry["seconds"] = round(time.monotonic() - start, 2)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        list(pool.map(apply, [e for e in plan if e["status"] == "pending"]))
+    return plan
+
+
+def reconcile(lims, desired, dry_run=False, max_workers=8, rate_limit=10.0, retries=3, backoff=0.5, cache=None):
+    """
+    Bring researchers' roles to the desired state.
+
+    Args:
+        lims: s4.clarity.LIMS instance
+        desired: Result of load_desired_state
+        dry_run: Only compute and return the plan
+        max_workers: Concurrent lookups/commits
+        rate_limit: Maximum API calls started per second (0 disables the limit)
+        retries: Retries per request after the first attempt
+        backoff: Initial retry delay in seconds, doubled on every retry
+        cache: Optional LookupCache to invalidate for researchers that change
+
+    Returns:
+        list: Plan entries (user, add, remove, status, error)
+    """
+    limiter = RateLimiter(rate_limit, burst=max_workers)
+    roles = fetch_roles(lims)
+    researchers, errors = fetch_researchers(lims, desired["users"], limiter, max_workers, retries, backoff)
+    plan = plan_changes(desired["users"], researchers, errors, roles, desired.get("managed_roles"))
+    if not dry_run:
+        apply_plan(plan, roles, limiter, max_workers, retries, backoff, cache)
+    return plan
+
+
+def print_plan(plan, dry_run=False):
+    """Print the changes per user and a summary line."""
+    print("\n" + "="*70)
+    print("ROLE RECONCILIATION " + ("PLAN (dry run)" if dry_run else "RESULTS"))
+    print("="*70)
+    for entry in plan:
+        if entry["status"] == "unchanged":
+            continue
+        changes = ", ".join([f"+{r}" for r in entry["add"]] + [f"-{r}" for r in entry["remove"]])
+        symbol = {"pending": "→", "changed": "✓", "failed": "✗"}[entry["status"]]
+        print(f"  {symbol} {entry['user'][:30]:<30} {changes or entry['error']}")
+        if entry["status"] == "failed" and changes:
+            print(f"      {entry['error']}")
+    counts = {}
+    for entry in plan:
+        counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+    print("-"*70)
+    print("  " + ", ".join(f"{count} {status}" for status, count in sorted(counts.items())))
+    print("="*70)
+
+
+def benchmark_standin(user_count=500, latency=0.05, max_concurrent=8, workers=8):
+    """Reconcile every stand-in researcher to the Editor role twice: the second run should commit nothing."""
+    import s4.clarity
+    from .standin import start_standin
+
+    server = start_standin(user_count=user_count, latency=latency, max_concurrent=max_concurrent)
+    try:
+        desired = {"users": [
+            {"username": f"tuser{i:05d}", "firstname": "", "lastname": "", "roles": ["Editor"]}
+            for i in range(1, user_count)
+        ], "managed_roles": None}
+        for run in (1, 2):
+            lims = s4.clarity.LIMS(server.api_url, "standin", "standin")
+            start = time.monotonic()
+            plan = reconcile(lims, desired, max_workers=workers, rate_limit=0)
+            changed = sum(1 for e in plan if e["status"] == "changed")
+            print(f"  Run {run}: {time.monotonic() - start:6.2f}s, {changed} researchers committed, "
+                  f"{sum(1 for e in plan if e['status'] == 'failed')} failed")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bring Clarity researchers' roles to a desired state")
+    parser.add_argument("desired", nargs="?", help="JSON, YAML or CSV desired-state file")
+    parser.add_argument("--server", default="dev", help="Clarity server: prod, staging or dev")
+    parser.add_argument("--dry-run", action="store_true", help="Print the changes without committing")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=10.0, help="Maximum API calls per second (0 = unlimited)")
+    parser.add_argument("--standin", action="store_true", help="Time two reconciliations against a local stand-in")
+    parser.add_argument("--users", type=int, default=500, help="Researchers seeded in the stand-in")
+    args = parser.parse_args()
+
+    if args.standin:
+        benchmark_standin(args.users, workers=args.workers)
+        exit(0)
+    if not args.desired:
+        parser.error("a desired-state file is required unless --standin is given")
+
+    import s4.clarity
+    from .config import CLARITY_SERVERS, get_credentials
+
+    username, password = get_credentials()
+    lims = s4.clarity.LIMS(CLARITY_SERVERS[args.server], username, password)
+
+    desired = load_desired_state(args.desired)
+    print(f"Reconciling roles for {len(desired['users'])} researchers on {args.server}"
+          f"{' (dry run)' if args.dry_run else ''}...")
+    start = time.monotonic()
+    plan = reconcile(lims, desired, args.dry_run, args.workers, args.rate)
+    print_plan(plan, args.dry_run)
+    print(f"Finished in {time.monotonic() - start:.1f}s")
+    exit(0 if all(e["status"] != "failed" for e in plan) else 1)
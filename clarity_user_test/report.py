@@ -0,0 +1,353 @@
+from html import escape
+import json
+import os
+import time
+
+REPORT_DIR = "test_reports"
+REPORT_FONT = "Helvetica"  # Core font (what "Arial" was substituted with), no font file or warning per call
+OVERVIEW_ROWS_PER_PAGE = 40
+
+
+def new_report_pdf():
+    """Create an FPDF document with the shared report page and font setup."""
+    # Imported here so JSON/HTML reports and the report worker's callers don't load fpdf
+    from fpdf import FPDF
+    pdf = FPDF()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.set_font(REPORT_FONT, size=10)
+    return pdf
+
+
+def report_path(prefix, extension):
+    """Timestamped path for a new report in test_reports/."""
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    stem = os.path.join(REPORT_DIR, f"{prefix}_{time.strftime('%Y%m%d_%H%M%S')}")
+    # Several runs in one process can finish within the same second
+    path, n = f"{stem}.{extension}", 1
+    while os.path.exists(path):
+        path, n = f"{stem}_{n}.{extension}", n + 1
+    return path
+
+
+def total_seconds(results):
+    """Run time from the timing spans (or the role matrix 'seconds' field), or None."""
+    timings = results.get("timings")
+    if timings:
+        return max(t["start"] + t["seconds"] for t in timings)
+    return results.get("seconds")
+
+
+def add_timing_section(pdf, timings):
+    """
+    Add a step timing table with a waterfall bar per step.
+    
+    Args:
+        pdf: FPDF document to draw into
+        timings: List of spans with step, start (seconds from run start), seconds and ok
+    """
+    total = max((t["start"] + t["seconds"] for t in timings), default=0) or 1
+    
+    pdf.set_font(REPORT_FONT, "B", 12)
+    pdf.cell(0, 8, "Step Timings:", new_x="LMARGIN", new_y="NEXT")
+    
+    # Header
+    pdf.set_font(REPORT_FONT, "B", 9)
+    pdf.cell(40, 6, "Step", border="B")
+    pdf.cell(20, 6, "Start", border="B", align="R")
+    pdf.cell(20, 6, "Duration", border="B", align="R")
+    pdf.cell(0, 6, "  Waterfall", border="B", new_x="LMARGIN", new_y="NEXT")
+    
+    pdf.set_font(REPORT_FONT, size=9)
+    bar_x = pdf.l_margin + 85
+    bar_width = pdf.w - pdf.r_margin - bar_x
+    for t in timings:
+        if pdf.will_page_break(6):
+            pdf.add_page()
+        y = pdf.get_y()
+        pdf.cell(40, 6, t["step"][:24])
+        pdf.cell(20, 6, f"+{t['start']:.2f}s", align="R")
+        pdf.cell(20, 6, f"{t['seconds']:.2f}s", align="R")
+        
+        # Bar positioned by start offset, sized by duration
+        if t["ok"]:
+            pdf.set_fill_color(70, 130, 180)  # Blue
+        else:
+            pdf.set_fill_color(255, 0, 0)  # Red
+        x = bar_x + bar_width * t["start"] / total
+        width = max(0.5, bar_width * t["seconds"] / total)
+        pdf.rect(x, y + 1.5, width, 3, style="F")
+        pdf.ln(6)
+    
+    pdf.set_font(REPORT_FONT, "B", 9)
+    pdf.cell(60, 6, "Total", border="T")
+    pdf.cell(20, 6, f"{total:.2f}s", border="T", align="R")
+    pdf.cell(0, 6, "", border="T", new_x="LMARGIN", new_y="NEXT")
+
+
+def generate_pdf_report(results):
+    """
+    Generate a simple PDF report from test results.
+    
+    Args:
+        results: Dictionary containing test results
+            - timestamp: When the test ran
+            - search_name: Name that was searched for
+            - role: Role assigned
+            - found: Boolean - whether user was found
+            - details: Additional details about the search
+            - verify_mode: Optional - 'ui', 'api' or 'hybrid'
+            - mismatches: Optional - API/UI disagreements found by the cross-check
+            - timings: Optional - list of timing spans (step, start, seconds, ok)
+    
+    Returns:
+        str: Path to the generated PDF file
+    """
+    # Create PDF
+    pdf = new_report_pdf()
+    pdf.add_page()
+    
+    # Title
+    pdf.set_font(REPORT_FONT, "B", 20)
+    pdf.cell(0, 15, "User Test Report", new_x="LMARGIN", new_y="NEXT", align="C")
+    pdf.ln(5)
+    
+    # Timestamp
+    pdf.set_font(REPORT_FONT, size=10)
+    pdf.cell(0, 8, f"Test Date: {results['timestamp']}", new_x="LMARGIN", new_y="NEXT")
+    pdf.ln(5)
+    
+    # Main Result - Big and Clear
+    pdf.set_font(REPORT_FONT, "B", 16)
+    if results["found"]:
+        pdf.set_text_color(0, 128, 0)  # Green
+        pdf.cell(0, 12, f"[FOUND] {results['search_name']}", new_x="LMARGIN", new_y="NEXT", align="C")
+    else:
+        pdf.set_text_color(255, 0, 0)  # Red
+        pdf.cell(0, 12, f"[NOT FOUND] {results['search_name']}", new_x="LMARGIN", new_y="NEXT", align="C")
+    
+    pdf.set_text_color(0, 0, 0)  # Back to black
+    pdf.ln(5)
+    
+    # User Details Section
+    pdf.set_font(REPORT_FONT, "B", 12)
+    pdf.cell(0, 8, "User Information:", new_x="LMARGIN", new_y="NEXT")
+    
+    pdf.set_font(REPORT_FONT, size=10)
+    pdf.cell(0, 7, f"  - Name: {results['search_name']}", new_x="LMARGIN", new_y="NEXT")
+    pdf.cell(0, 7, f"  - Role: {results['role']}", new_x="LMARGIN", new_y="NEXT")
+    pdf.ln(3)
+    
+    # Search Details Section
+    pdf.set_font(REPORT_FONT, "B", 12)
+    pdf.cell(0, 8, "Search Details:", new_x="LMARGIN", new_y="NEXT")
+    
+    pdf.set_font(REPORT_FONT, size=10)
+    pdf.multi_cell(0, 7, f"  {results['details']}", new_x="LMARGIN", new_y="NEXT")
+    if results.get("verify_mode"):
+        pdf.cell(0, 7, f"  - Verification: {results['verify_mode']}", new_x="LMARGIN", new_y="NEXT")
+    
+    # API / UI Cross-check Section
+    if results.get("mismatches"):
+        pdf.ln(3)
+        pdf.set_font(REPORT_FONT, "B", 12)
+        pdf.set_text_color(255, 0, 0)  # Red
+        pdf.cell(0, 8, "API / UI Mismatches:", new_x="LMARGIN", new_y="NEXT")
+        pdf.set_text_color(0, 0, 0)
+        pdf.set_font(REPORT_FONT, size=10)
+        for mismatch in results["mismatches"]:
+            pdf.multi_cell(0, 7, f"  - {mismatch}", new_x="LMARGIN", new_y="NEXT")
+    
+    # Step Timings Section
+    if results.get("timings"):
+        pdf.ln(3)
+        add_timing_section(pdf, results["timings"])
+    
+    # Footer
+    pdf.ln(10)
+    pdf.set_font(REPORT_FONT, "I", 8)
+    pdf.cell(0, 5, "Generated by User Tester Automation Script", new_x="LMARGIN", new_y="NEXT", align="C")
+    
+    # Save PDF
+    file_path = report_path("user_test", "pdf")
+    pdf.output(file_path)
+    
+    return file_path
+
+
+# ------------------------
+# Multi-run summary reports
+# ------------------------
+
+def normalize_result(results):
+    """Map a user test or role matrix result onto the fields the summary report uses."""
+    return {
+        "timestamp": results.get("timestamp", ""),
+        "search_name": results.get("search_name") or results.get("user", ""),
+        "role": str(results.get("role", "")),
+        "found": bool(results.get("found")),
+        "details": results.get("error") or results.get("details", ""),
+        "mismatches": results.get("mismatches") or [],
+        "timings": results.get("timings") or [],
+        "seconds": total_seconds(results),
+    }
+
+
+def overview_row(index, run):
+    """Compact per-run row kept for the overview table (the full result is not kept)."""
+    seconds = f"{run['seconds']:.2f}s" if run["seconds"] is not None else ""
+    return (index, run["search_name"][:28], run["role"][:24], run["found"], len(run["mismatches"]), seconds)
+
+
+def add_run_section(pdf, index, run):
+    """Add one run of a summary report: result line, details, mismatches and timings."""
+    pdf.set_font(REPORT_FONT, "B", 11)
+    status = "FOUND" if run["found"] else "NOT FOUND"
+    if run["found"]:
+        pdf.set_text_color(0, 128, 0)  # Green
+    else:
+        pdf.set_text_color(255, 0, 0)  # Red
+    pdf.cell(0, 8, f"#{index} [{status}] {run['search_name']} - {run['role']}", new_x="LMARGIN", new_y="NEXT")
+    pdf.set_text_color(0, 0, 0)
+    
+    pdf.set_font(REPORT_FONT, size=9)
+    if run["timestamp"]:
+        pdf.cell(0, 5, f"  Test Date: {run['timestamp']}", new_x="LMARGIN", new_y="NEXT")
+    if run["details"]:
+        pdf.multi_cell(0, 5, f"  {run['details']}", new_x="LMARGIN", new_y="NEXT")
+    for mismatch in run["mismatches"]:
+        pdf.set_text_color(255, 0, 0)
+        pdf.multi_cell(0, 5, f"  Mismatch: {mismatch}", new_x="LMARGIN", new_y="NEXT")
+        pdf.set_text_color(0, 0, 0)
+    if run["timings"]:
+        add_timing_section(pdf, run["timings"])
+    pdf.ln(4)
+
+
+def write_summary_pdf(results, file_path, title):
+    """
+    Stream results into one PDF: overview table first, then a section per run.
+    
+    The overview is reserved as a placeholder and drawn when the document is
+    written, so only a compact row per run is kept while streaming.
+    """
+    overview = []
+    
+    def render_overview(pdf, outline):
+        passed = sum(1 for row in overview if row[3])
+        pdf.set_font(REPORT_FONT, "B", 20)
+        pdf.cell(0, 15, title, new_x="LMARGIN", new_y="NEXT", align="C")
+        pdf.set_font(REPORT_FONT, size=10)
+        pdf.cell(0, 7, f"Generated: {time.strftime('%Y-%m-%d %H:%M:%S')}", new_x="LMARGIN", new_y="NEXT")
+        pdf.cell(0, 7, f"Runs: {len(overview)}   Passed: {passed}   Failed: {len(overview) - passed}", new_x="LMARGIN", new_y="NEXT")
+        pdf.ln(4)
+        
+        widths = (12, 60, 55, 25, 18, 20)
+        headers = ("#", "Name", "Role", "Result", "Mism.", "Time")
+        pdf.set_font(REPORT_FONT, "B", 9)
+        for width, header in zip(widths, headers):
+            pdf.cell(width, 6, header, border="B")
+        pdf.ln(6)
+        pdf.set_font(REPORT_FONT, size=9)
+        for index, name, role, found, mismatches, seconds in overview:
+            pdf.cell(widths[0], 5, str(index))
+            pdf.cell(widths[1], 5, name)
+            pdf.cell(widths[2], 5, role)
+            pdf.set_text_color(*((0, 128, 0) if found else (255, 0, 0)))
+            pdf.cell(widths[3], 5, "FOUND" if found else "NOT FOUND")
+            pdf.set_text_color(0, 0, 0)
+            pdf.cell(widths[4], 5, str(mismatches) if mismatches else "")
+            pdf.cell(widths[5], 5, seconds, new_x="LMARGIN", new_y="NEXT")
+    
+    pdf = new_report_pdf()
+    pdf.add_page()
+    pdf.insert_toc_placeholder(render_overview, pages=1, allow_extra_pages=True)
+    
+    pdf.add_page()
+    pdf.set_font(REPORT_FONT, "B", 14)
+    pdf.cell(0, 10, "Runs", new_x="LMARGIN", new_y="NEXT")
+    for index, results_item in enumerate(results, start=1):
+        run = normalize_result(results_item)
+        overview.append(overview_row(index, run))
+        add_run_section(pdf, index, run)
+    
+    pdf.ln(6)
+    pdf.set_font(REPORT_FONT, "I", 8)
+    pdf.cell(0, 5, "Generated by User Tester Automation Script", new_x="LMARGIN", new_y="NEXT", align="C")
+    pdf.output(file_path)
+    return overview
+
+
+def write_summary_json(results, file_path, title):
+    """Stream results into one JSON document (runs first, totals at the end)."""
+    overview = []
+    with open(file_path, "w") as f:
+        f.write(f'{{"title": {json.dumps(title)}, "generated": {json.dumps(time.strftime("%Y-%m-%d %H:%M:%S"))}, "runs": [\n')
+        for index, results_item in enumerate(results, start=1):
+            run = normalize_result(results_item)
+            overview.append(overview_row(index, run))
+            f.write((",\n" if index > 1 else "") + json.dumps(run, default=str))
+        passed = sum(1 for row in overview if row[3])
+        f.write(f'\n], "summary": {json.dumps({"runs": len(overview), "passed": passed, "failed": len(overview) - passed})}}}\n')
+    return overview
+
+
+def write_summary_html(results, file_path, title):
+    """Stream results into one HTML page with a row per run and totals at the end."""
+    overview = []
+    with open(file_path, "w") as f:
+        f.write(
+            f"<!DOCTYPE html>\n<html><head><meta charset='utf-8'><title>{escape(title)}</title>"
+            "<style>body{font-family:Arial,sans-serif;font-size:13px} table{border-collapse:collapse}"
+            "td,th{border-bottom:1px solid #ccc;padding:3px 8px;text-align:left;vertical-align:top}"
+            ".found{color:#008000}.missing{color:#ff0000}</style></head><body>\n"
+            f"<h1>{escape(title)}</h1>\n<p>Generated: {time.strftime('%Y-%m-%d %H:%M:%S')}</p>\n"
+            "<table><tr><th>#</th><th>Name</th><th>Role</th><th>Result</th><th>Time</th>"
+            "<th>Details</th><th>Step timings</th></tr>\n"
+        )
+        for index, results_item in enumerate(results, start=1):
+            run = normalize_result(results_item)
+            row = overview_row(index, run)
+            overview.append(row)
+            details = escape(run["details"]) + "".join(
+                f"<br><span class='missing'>Mismatch: {escape(m)}</span>" for m in run["mismatches"]
+            )
+            timings = "<br>".join(f"{escape(t['step'])} {t['seconds']:.2f}s" for t in run["timings"])
+            status = "<span class='found'>FOUND</span>" if run["found"] else "<span class='missing'>NOT FOUND</span>"
+            f.write(
+                f"<tr><td>{index}</td><td>{escape(run['search_name'])}</td><td>{escape(run['role'])}</td>"
+                f"<td>{status}</td><td>{row[5]}</td><td>{details}</td><td>{timings}</td></tr>\n"
+            )
+        passed = sum(1 for row in overview if row[3])
+        f.write(f"</table>\n<p>Runs: {len(overview)} &nbsp; Passed: {passed} &nbsp; Failed: {len(overview) - passed}</p>\n")
+        f.write("</body></html>\n")
+    return overview
+
+
+SUMMARY_WRITERS = {
+    "pdf": write_summary_pdf,
+    "json": write_summary_json,
+    "html": write_summary_html,
+}
+
+
+def generate_summary_report(results, output_format="pdf", file_path=None, title="User Test Summary Report"):
+    """
+    Write many test results into one summary report.
+    
+    Results are consumed one at a time, so a generator of thousands of runs
+    only keeps a compact overview row per run in memory.
+    
+    Args:
+        results: Iterable of result dicts (user test or role matrix results)
+        output_format: 'pdf', 'json' or 'html'
+        file_path: Output path (defaults to a timestamped file in test_reports/)
+        title: Report title
+    
+    Returns:
+        str: Path to the generated report
+    """
+    if output_format not in SUMMARY_WRITERS:
+        raise ValueError(f"output_format must be one of {sorted(SUMMARY_WRITERS)}, got '{output_format}'")
+    file_path = file_path or report_path("user_test_summary", output_format)
+    SUMMARY_WRITERS[output_format](results, file_path, title)
+    return file_path
\ No newline at end of file
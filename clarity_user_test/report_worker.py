@@ -0,0 +1,113 @@
+"""
+Background report rendering.
+
+Rendering a PDF (and importing fpdf) does not need the browser, so the test
+flow hands its results to a ReportWorker and carries on; the worker thread
+renders reports from a queue. flush() waits for the queue to drain, and
+close() is registered with atexit so queued reports are still written when
+the script exits.
+
+If rendering fails, the error is printed and the results are written to a
+JSON file in test_reports/ instead, so a failed report never loses a run.
+"""
+import atexit
+import json
+import queue
+import threading
+import time
+
+from .report import report_path
+
+
+def render_pdf_report(results):
+    """Default renderer: the one-page PDF report (imports fpdf on the worker thread)."""
+    from .report import generate_pdf_report
+    return generate_pdf_report(results)
+
+
+def save_results_json(results):
+    """Write results to a timestamped JSON file in test_reports/ and return its path."""
+    file_path = report_path("user_test_results", "json")
+    with open(file_path, "w") as f:
+        json.dump(results, f, indent=2, default=str)
+    return file_path
+
+
+class ReportWorker:
+    """
+    Render reports on a background thread.
+
+    Args:
+        render: Callable taking a results dict and returning the report path
+        timer: Optional StepTimer; each render is recorded as a "report" span
+    """
+
+    def __init__(self, render=render_pdf_report, timer=None):
+        self.render = render
+        self.timer = timer
+        self.jobs = queue.Queue()
+        self.completed = []
+        self.failed = []
+        self.closed = False
+        self.thread = threading.Thread(target=self.run, name="report-worker", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def submit(self, results, render=None, timer=None, done=None):
+        """
+        Queue results for rendering.
+
+        Args:
+            results: Results dict to render
+            render: Renderer for this job (defaults to the worker's)
+            timer: StepTimer for this job's "report" span (defaults to the worker's)
+            done: Called with the results on the worker thread once the span is recorded
+        """
+        if self.closed:
+            raise RuntimeError("ReportWorker is closed")
+        self.jobs.put((results, render or self.render, timer or self.timer, done))
+
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            try:
+                if job is None:
+                    return
+                self.render_job(*job)
+            finally:
+                self.jobs.task_done()
+
+    def render_job(self, results, render, timer, done=None):
+        start = time.monotonic()
+        ok = False
+        try:
+            path = render(results)
+            ok = True
+            self.completed.append((results, path))
+            print(f"  ✓ Report generated in {time.monotonic() - start:.2f}s: {path}")
+        except Exception as e:
+            self.failed.append((results, str(e)))
+            print(f"  ✗ Could not generate report: {str(e)[:100]}")
+            try:
+                print(f"  Test results saved to {save_results_json(results)}")
+            except Exception as save_error:
+                print(f"  ✗ Could not save results either ({str(save_error)[:50]}); results: {results}")
+        if timer:
+            timer.add("report", start, time.monotonic() - start, ok)
+        if done:
+            try:
+                done(results)
+            except Exception as e:
+                print(f"  ⚠ Report callback failed: {str(e)[:50]}")
+
+    def flush(self):
+        """Wait until every queued report has been rendered (or has failed)."""
+        self.jobs.join()
+
+    def close(self):
+        """Flush the queue and stop the worker thread. Safe to call more than once."""
+        if self.closed:
+            return
+        self.closed = True
+        self.jobs.put(None)
+        self.thread.join()
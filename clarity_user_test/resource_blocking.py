@@ -0,0 +1,195 @@
+"""
+Block resources the test never looks at while Clarity pages load.
+
+The Configuration and User Management pages pull in images, fonts, media
+and analytics scripts, and every navigation waits for them. A
+ResourceBlocker turns on Chrome's network domain through the DevTools
+Protocol and hands it a list of URL patterns (Network.setBlockedURLs);
+matching requests fail inside the browser before they reach the network.
+Resource types (image, font, media, analytics) are blocked through the
+URL patterns listed for them in RESOURCE_TYPE_PATTERNS.
+
+Savings are read from Chrome's performance log after each step: the
+requests the browser blocked, and their bytes as last seen when the same
+URL did load (sizes are remembered per server in resource_sizes.json).
+Run once with measure_only to learn the sizes and see what blocking would
+save without changing anything.
+
+Usage:
+    python -m clarity_user_test --server prod --role Editor --block-resources
+    python -m clarity_user_test --server prod --role Editor --block-resources --block-types image,font
+    python -m clarity_user_test --server prod --role Editor --block-resources measure
+"""
+import fnmatch
+import json
+import os
+import threading
+
+DEFAULT_SIZES_PATH = os.path.join(os.path.expanduser("~"), ".clarity_user_test", "resource_sizes.json")
+
+RESOURCE_TYPE_EXTENSIONS = {
+    "image": ["png", "jpg", "jpeg", "gif", "webp", "ico", "bmp"],
+    "font": ["woff", "woff2", "ttf", "otf", "eot"],
+    "media": ["mp4", "webm", "mp3", "wav", "ogg"],
+}
+
+# Patterns match the whole URL, so each extension also needs a form followed by a query string
+RESOURCE_TYPE_PATTERNS = {
+    **{kind: [p for ext in extensions for p in (f"*.{ext}", f"*.{ext}?*")]
+       for kind, extensions in RESOURCE_TYPE_EXTENSIONS.items()},
+    "analytics": [
+        "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+        "*hotjar.com*", "*segment.io*", "*newrelic.com*", "*nr-data.net*",
+    ],
+}
+DEFAULT_BLOCKED_TYPES = ("image", "font", "media", "analytics")
+
+# Chrome performance-log capability; the driver must be started with it to report savings
+PERFORMANCE_LOG_CAPABILITY = ("goog:loggingPrefs", {"performance": "ALL"})
+
+
+def blocked_patterns(types=DEFAULT_BLOCKED_TYPES, extra_patterns=()):
+    """
+    URL patterns for the resource types plus any extra patterns.
+
+    Raises:
+        ValueError: If a type is not in RESOURCE_TYPE_PATTERNS
+    """
+    unknown = [t for t in types if t not in RESOURCE_TYPE_PATTERNS]
+    if unknown:
+        raise ValueError(f"Unknown resource type(s) {unknown}, expected some of {sorted(RESOURCE_TYPE_PATTERNS)}")
+    patterns = [p for t in types for p in RESOURCE_TYPE_PATTERNS[t]] + list(extra_patterns)
+    return [p for i, p in enumerate(patterns) if p not in patterns[:i]]
+
+
+def url_key(url):
+    """URL without query string or fragment, so cache-busting parameters share one size."""
+    return url.split("#", 1)[0].split("?", 1)[0]
+
+
+class ResourceBlocker:
+    """
+    Blocks URL patterns in Chrome and reports requests and bytes saved per step.
+
+    Args:
+        server: Server key, the Clarity base URL (sizes are remembered per server)
+        patterns: URL patterns to block ('*' matches anything)
+        measure_only: Do not block; report what the patterns would have saved
+        path: JSON file of learned resource sizes (shared by all servers)
+    """
+
+    def __init__(self, server, patterns, measure_only=False, path=DEFAULT_SIZES_PATH):
+        self.server = server
+        self.patterns = list(patterns)
+        self.measure_only = measure_only
+        self.path = path
+        self.lock = threading.Lock()
+        self.requests = {}   # CDP requestId -> url, until the request finishes or fails
+        self.steps = {}      # step -> counters, in the order the steps ran
+        self.sizes = {}
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    self.sizes = json.load(f)
+            except (OSError, ValueError):
+                print(f"  ⚠ Could not read resource sizes from {path}, starting fresh")
+
+    def enable(self, driver):
+        """Start blocking in the driver's browser (a no-op in measure_only mode)."""
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+            if not self.measure_only:
+                driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": self.patterns})
+            mode = "measuring" if self.measure_only else "blocking"
+            print(f"  ✓ Resource {mode} on ({len(self.patterns)} URL patterns)")
+        except Exception as e:
+            print(f"  ⚠ Could not enable resource blocking: {str(e)[:60]}")
+
+    def matches(self, url):
+        return any(fnmatch.fnmatchcase(url, pattern) for pattern in self.patterns)
+
+    def known_size(self, url):
+        return self.sizes.get(self.server, {}).get(url_key(url))
+
+    def step_counters(self, step):
+        return self.steps.setdefault(step, {
+            "loaded": 0, "loaded_bytes": 0,
+            "saved": 0, "saved_bytes": 0, "saved_unknown": 0,
+        })
+
+    def collect(self, driver, step):
+        """Charge the network activity since the last collect to step."""
+        try:
+            entries = driver.get_log("performance")
+        except Exception:
+            return
+        with self.lock:
+            counters = self.step_counters(step)
+            for entry in entries:
+                self.handle_event(json.loads(entry["message"])["message"], counters)
+
+    def handle_event(self, message, counters):
+        """Update the counters from one Network.* DevTools event."""
+        method = message.get("method", "")
+        params = message.get("params", {})
+        if method == "Network.requestWillBeSent":
+            self.requests[params["requestId"]] = params["request"]["url"]
+        elif method == "Network.loadingFinished":
+            url = self.requests.pop(params.get("requestId"), None)
+            if url is None:
+                return
+            size = int(params.get("encodedDataLength", 0))
+            self.sizes.setdefault(self.server, {})[url_key(url)] = size
+            if self.measure_only and self.matches(url):
+                counters["saved"] += 1
+                counters["saved_bytes"] += size
+            else:
+                counters["loaded"] += 1
+                counters["loaded_bytes"] += size
+        elif method == "Network.loadingFailed":
+            url = self.requests.pop(params.get("requestId"), None)
+            if url is None or not params.get("blockedReason"):
+                return
+            counters["saved"] += 1
+            size = self.known_size(url)
+            if size is None:
+                counters["saved_unknown"] += 1
+            else:
+                counters["saved_bytes"] += size
+
+    def save(self):
+        """Write the learned sizes back, merging with sizes other processes saved meanwhile."""
+        with self.lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            on_disk = {}
+            if os.path.exists(self.path):
+                try:
+                    with open(self.path) as f:
+                        on_disk = json.load(f)
+                except (OSError, ValueError):
+                    pass
+            on_disk[self.server] = dict(on_disk.get(self.server, {}), **self.sizes.get(self.server, {}))
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(on_disk, f)
+            os.replace(tmp_path, self.path)
+
+    def rows(self):
+        """Per step: requests and bytes loaded and saved."""
+        with self.lock:
+            return [dict(counters, step=step) for step, counters in self.steps.items()]
+
+    def print_summary(self):
+        rows = self.rows()
+        if not rows:
+            return
+        verb = "Blockable" if self.measure_only else "Saved"
+        print(f"\n  Resource blocking ({'measure only' if self.measure_only else 'on'}):")
+        print(f"    {'Step':<20} {'Loaded':>7} {'KB':>9} {verb:>9} {'KB':>9}")
+        for r in rows + [{
+            "step": "Total",
+            **{key: sum(r[key] for r in rows) for key in ("loaded", "loaded_bytes", "saved", "saved_bytes", "saved_unknown")},
+        }]:
+            unknown = f"  (+{r['saved_unknown']} of unknown size)" if r["saved_unknown"] else ""
+            print(f"    {r['step'][:20]:<20} {r['loaded']:>7} {r['loaded_bytes'] / 1024:>9.1f} "
+                  f"{r['saved']:>9} {r['saved_bytes'] / 1024:>9.1f}{unknown}")
@@ -0,0 +1,451 @@
+"""
+Indexed history of test results, with trend queries.
+
+Every run's test_results (and its timing spans) is appended to a local
+SQLite database indexed on server, role, user and timestamp, so questions
+like "how has grid load time changed this month on staging?" are a query
+instead of opening PDFs by hand. Existing one-page PDF reports in
+test_reports/ can be backfilled.
+
+Usage:
+    python -m clarity_user_test.results_store backfill --dir test_reports --server dev
+    python -m clarity_user_test.results_store pass-rate --server staging --since 30d --by day
+    python -m clarity_user_test.results_store latency --step grid_load --server staging --since 30d --by week
+    python -m clarity_user_test.results_store runs --limit 20
+    python -m clarity_user_test.results_store histogram --step propagation_ui --by-server --since 30d
+"""
+import argparse
+import bisect
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+
+DEFAULT_STORE_PATH = os.path.join(os.path.expanduser("~"), ".clarity_user_test", "results.sqlite")
+DEFAULT_PERCENTILES = (50, 90, 99)
+DEFAULT_HISTOGRAM_EDGES = (0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    server TEXT NOT NULL,
+    role TEXT NOT NULL,
+    user TEXT NOT NULL,
+    found INTEGER NOT NULL,
+    verify_mode TEXT,
+    details TEXT,
+    mismatches INTEGER NOT NULL DEFAULT 0,
+    total_seconds REAL,
+    source TEXT UNIQUE
+);
+CREATE INDEX IF NOT EXISTS runs_server_timestamp ON runs (server, timestamp);
+CREATE INDEX IF NOT EXISTS runs_role_timestamp ON runs (role, timestamp);
+CREATE INDEX IF NOT EXISTS runs_user_timestamp ON runs (user, timestamp);
+CREATE INDEX IF NOT EXISTS runs_timestamp ON runs (timestamp);
+
+CREATE TABLE IF NOT EXISTS timings (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    step TEXT NOT NULL,
+    start REAL,
+    seconds REAL NOT NULL,
+    ok INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS timings_step_run ON timings (step, run_id);
+"""
+
+# Time buckets for --by
+GROUPINGS = {
+    "day": "substr(r.timestamp, 1, 10)",
+    "week": "strftime('%Y-W%W', r.timestamp)",
+    "month": "substr(r.timestamp, 1, 7)",
+}
+
+SINCE_RE = re.compile(r"^(\d+)([hdw])$")
+SINCE_UNITS = {"h": 3600, "d": 86400, "w": 7 * 86400}
+
+
+def parse_since(text):
+    """Turn '30d', '12h', '2w' or a date/timestamp into a timestamp string."""
+    if not text:
+        return None
+    match = SINCE_RE.match(text.strip())
+    if match:
+        seconds = int(match.group(1)) * SINCE_UNITS[match.group(2)]
+        return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(time.time() - seconds))
+    return text.strip()
+
+
+def percentile(sorted_values, p):
+    """Linearly interpolated percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * p / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def timings_from_steps(steps):
+    """Turn a role matrix {step: seconds} dict into sequential timing spans."""
+    spans, start = [], 0.0
+    for step, seconds in steps.items():
+        spans.append({"step": step, "start": round(start, 3), "seconds": seconds, "ok": True})
+        start += seconds
+    return spans
+
+
+class ResultsStore:
+    """
+    SQLite store of test runs and their step timings.
+
+    Args:
+        path: SQLite file (created if missing)
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA foreign_keys = ON")
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def add_run(self, results, server, source=None):
+        """
+        Append one run.
+
+        Args:
+            results: test_results dict (or a role matrix result)
+            server: Server name, e.g. 'dev' or 'staging'
+            source: Unique origin of the run (e.g. a backfilled PDF); duplicates are skipped
+
+        Returns:
+            int: Row id of the run, or None if it was already stored
+        """
+        timings = results.get("timings") or timings_from_steps(results.get("steps") or {})
+        total = max((t["start"] + t["seconds"] for t in timings), default=None) if timings else results.get("seconds")
+        row = (
+            results.get("timestamp") or time.strftime("%Y-%m-%d %H:%M:%S"),
+            server,
+            str(results.get("role", "")),
+            results.get("search_name") or results.get("user", ""),
+            1 if results.get("found") else 0,
+            results.get("verify_mode"),
+            results.get("error") or results.get("details", ""),
+            len(results.get("mismatches") or []),
+            total,
+            source,
+        )
+        with self.lock, self.db:
+            cursor = self.db.execute(
+                "INSERT OR IGNORE INTO runs (timestamp, server, role, user, found, verify_mode, details, "
+                "mismatches, total_seconds, source) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                row,
+            )
+            if not cursor.rowcount:
+                return None
+            run_id = cursor.lastrowid
+            self.db.executemany(
+                "INSERT INTO timings (run_id, step, start, seconds, ok) VALUES (?, ?, ?, ?, ?)",
+                [(run_id, t["step"], t.get("start"), t["seconds"], 1 if t.get("ok", True) else 0) for t in timings],
+            )
+        return run_id
+
+    def where(self, server=None, role=None, user=None, since=None, until=None):
+        """SQL filter clause and parameters for the common run filters."""
+        clauses, params = [], []
+        for column, value in (("r.server", server), ("r.role", role), ("r.user", user)):
+            if value:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since:
+            clauses.append("r.timestamp >= ?")
+            params.append(parse_since(since))
+        if until:
+            clauses.append("r.timestamp < ?")
+            params.append(parse_since(until))
+        return ("WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def pass_rate(self, group_by=None, **filters):
+        """
+        Pass rate of runs matching the filters, optionally per time bucket.
+
+        Args:
+            group_by: None, 'day', 'week' or 'month'
+            **filters: server, role, user, since, until
+
+        Returns:
+            list: dicts with period, runs, passed and pass_rate
+        """
+        where, params = self.where(**filters)
+        period = GROUPINGS[group_by] if group_by else "'all'"
+        rows = self.db.execute(
+            f"SELECT {period} AS period, COUNT(*), SUM(r.found) FROM runs r {where} "
+            f"GROUP BY period ORDER BY period",
+            params,
+        ).fetchall()
+        return [
+            {"period": p, "runs": runs, "passed": passed, "pass_rate": round(passed / runs, 3) if runs else None}
+            for p, runs, passed in rows
+        ]
+
+    def step_percentiles(self, step, percentiles=DEFAULT_PERCENTILES, group_by=None, **filters):
+        """
+        Latency percentiles of one step (or 'total' for the whole run), optionally per time bucket.
+
+        Returns:
+            list: dicts with period, count and one pN key per percentile
+        """
+        where, params = self.where(**filters)
+        period = GROUPINGS[group_by] if group_by else "'all'"
+        if step == "total":
+            query = (f"SELECT {period} AS period, r.total_seconds FROM runs r {where} "
+                     f"{'AND' if where else 'WHERE'} r.total_seconds IS NOT NULL")
+        else:
+            query = (f"SELECT {period} AS period, t.seconds FROM timings t JOIN runs r ON r.id = t.run_id "
+                     f"{where} {'AND' if where else 'WHERE'} t.step = ?")
+            params = params + [step]
+
+        buckets = {}
+        for p, seconds in self.db.execute(query, params):
+            buckets.setdefault(p, []).append(seconds)
+
+        results = []
+        for p in sorted(buckets):
+            values = sorted(buckets[p])
+            entry = {"period": p, "count": len(values)}
+            for pct in percentiles:
+                entry[f"p{pct}"] = round(percentile(values, pct), 3)
+            results.append(entry)
+        return results
+
+    def step_histogram(self, step, edges=DEFAULT_HISTOGRAM_EDGES, by_server=False, **filters):
+        """
+        Histogram of one step's durations (or 'total'), optionally per server.
+
+        Args:
+            step: Step name, e.g. 'propagation_ui'
+            edges: Bucket upper bounds in seconds; longer durations go in a last open bucket
+            by_server: One histogram per server instead of one overall
+            **filters: server, role, user, since, until
+
+        Returns:
+            dict: group ('all' or server) -> list of counts, one per bucket (len(edges) + 1)
+        """
+        where, params = self.where(**filters)
+        group = "r.server" if by_server else "'all'"
+        if step == "total":
+            query = (f"SELECT {group}, r.total_seconds FROM runs r {where} "
+                     f"{'AND' if where else 'WHERE'} r.total_seconds IS NOT NULL")
+        else:
+            query = (f"SELECT {group}, t.seconds FROM timings t JOIN runs r ON r.id = t.run_id "
+                     f"{where} {'AND' if where else 'WHERE'} t.step = ?")
+            params = params + [step]
+        histograms = {}
+        for key, seconds in self.db.execute(query, params):
+            counts = histograms.setdefault(key, [0] * (len(edges) + 1))
+            counts[bisect.bisect_left(edges, seconds)] += 1
+        return histograms
+
+    def recent_runs(self, limit=20, **filters):
+        """Most recent runs matching the filters."""
+        where, params = self.where(**filters)
+        rows = self.db.execute(
+            f"SELECT r.timestamp, r.server, r.role, r.user, r.found, r.total_seconds, r.details "
+            f"FROM runs r {where} ORDER BY r.timestamp DESC LIMIT ?",
+            params + [limit],
+        ).fetchall()
+        keys = ("timestamp", "server", "role", "user", "found", "total_seconds", "details")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def backfill(self, report_dir="test_reports", server="unknown"):
+        """
+        Import existing one-page PDF reports.
+
+        Args:
+            report_dir: Directory holding user_test_*.pdf reports
+            server: Server name to record (old reports don't include it)
+
+        Returns:
+            tuple: (imported, skipped) counts
+        """
+        imported = skipped = 0
+        for name in sorted(os.listdir(report_dir)):
+            if not (name.startswith("user_test_") and name.endswith(".pdf")):
+                continue
+            path = os.path.join(report_dir, name)
+            try:
+                results = parse_pdf_report(path)
+            except Exception as e:
+                print(f"  ⚠ Could not read {name}: {str(e)[:50]}")
+                results = None
+            if not results or self.add_run(results, server, source=os.path.abspath(path)) is None:
+                skipped += 1
+            else:
+                imported += 1
+        return imported, skipped
+
+
+# ------------------------
+# PDF backfill
+# ------------------------
+
+STREAM_RE = re.compile(rb"/Filter\s*/FlateDecode[^>]*>>\s*stream\r?\n(.*?)\r?\nendstream", re.S)
+TEXT_RE = re.compile(rb"\(((?:\\.|[^\\)])*)\)\s*Tj")
+ESCAPES = {b"n": b"\n", b"r": b"\r", b"t": b"\t", b"b": b"\b", b"f": b"\f", b"(": b"(", b")": b")", b"\\": b"\\"}
+ESCAPE_RE = re.compile(rb"\\([0-7]{1,3}|.)", re.S)
+# Older reports printed the s4 Role object, e.g. "[Role 7 (Editor)]"
+ROLE_REPR_RE = re.compile(r"^\[Role \S+ \((.*)\)\]$")
+
+
+def pdf_text_lines(path):
+    """Text shown by each Tj operator in the PDF's FlateDecode content streams, in order."""
+    with open(path, "rb") as f:
+        data = f.read()
+    lines = []
+    for match in STREAM_RE.finditer(data):
+        try:
+            content = zlib.decompress(match.group(1))
+        except zlib.error:
+            continue
+        for text in TEXT_RE.findall(content):
+            raw = ESCAPE_RE.sub(
+                lambda m: bytes([int(m.group(1), 8)]) if m.group(1)[:1].isdigit() else ESCAPES.get(m.group(1), m.group(1)),
+                text,
+            )
+            lines.append(raw.decode("latin-1"))
+    return lines
+
+
+def parse_pdf_report(path):
+    """
+    Rebuild test_results from a one-page report written by generate_pdf_report.
+
+    Returns:
+        dict: test_results fields (timestamp, search_name, role, found, details,
+              verify_mode, mismatches, timings), or None if the file is not such a report
+    """
+    lines = pdf_text_lines(path)
+    if not lines or lines[0] != "User Test Report":
+        return None
+
+    results = {"timestamp": "", "search_name": "", "role": "", "found": False, "details": "",
+               "mismatches": [], "timings": []}
+    section = None
+    cells = []
+    for line in lines[1:]:
+        stripped = line.strip()
+        if stripped.startswith("Test Date:"):
+            results["timestamp"] = stripped.split(":", 1)[1].strip()
+        elif stripped.startswith("[FOUND] ") or stripped.startswith("[NOT FOUND] "):
+            results["found"] = stripped.startswith("[FOUND]")
+            results["search_name"] = stripped.split("] ", 1)[1]
+        elif stripped in ("User Information:", "Search Details:", "API / UI Mismatches:", "Step Timings:"):
+            section = stripped
+        elif stripped == "Generated by User Tester Automation Script":
+            section = None
+        elif section == "User Information:" and stripped.startswith("- Role:"):
+            role = stripped.split(":", 1)[1].strip()
+            match = ROLE_REPR_RE.match(role)
+            results["role"] = match.group(1) if match else role
+        elif section == "Search Details:":
+            if stripped.startswith("- Verification:"):
+                results["verify_mode"] = stripped.split(":", 1)[1].strip()
+            else:
+                results["details"] = f"{results['details']} {stripped}".strip()
+        elif section == "API / UI Mismatches:" and stripped.startswith("- "):
+            results["mismatches"].append(stripped[2:])
+        elif section == "Step Timings:":
+            cells.append(stripped)
+
+    # Timing table cells come as: header (4 cells), then step, +start, duration per row, then Total
+    rows = cells[4:]
+    for i in range(0, len(rows) - 2, 3):
+        step, start, seconds = rows[i:i + 3]
+        if step == "Total" or not start.startswith("+"):
+            break
+        results["timings"].append({
+            "step": step,
+            "start": float(start.strip("+s")),
+            "seconds": float(seconds.rstrip("s")),
+            "ok": True,
+        })
+    return results
+
+
+def print_histograms(histograms, edges=DEFAULT_HISTOGRAM_EDGES, width=40):
+    """Print each histogram as labelled text bars."""
+    if not histograms:
+        print("  No matching runs")
+        return
+    labels = [f"<= {e:g}s" for e in edges] + [f"> {edges[-1]:g}s"]
+    for key, counts in sorted(histograms.items()):
+        total = sum(counts)
+        print(f"\n  {key} ({total} samples)")
+        for label, count in zip(labels, counts):
+            bar = "#" * round(width * count / max(counts)) if count else ""
+            print(f"    {label:>9} {count:>5}  {bar}")
+
+
+def print_rows(rows):
+    if not rows:
+        print("  No matching runs")
+        return
+    keys = list(rows[0])
+    print("  " + "  ".join(f"{k:>12}" for k in keys))
+    for row in rows:
+        print("  " + "  ".join(f"{str(row[k] if row[k] is not None else '')[:12]:>12}" for k in keys))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the test results history")
+    parser.add_argument("--path", default=DEFAULT_STORE_PATH)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    backfill_parser = commands.add_parser("backfill", help="Import existing PDF reports")
+    backfill_parser.add_argument("--dir", default="test_reports")
+    backfill_parser.add_argument("--server", default="unknown", help="Server the reports came from")
+
+    for command in ("pass-rate", "latency", "runs", "histogram"):
+        sub = commands.add_parser(command)
+        sub.add_argument("--server")
+        sub.add_argument("--role")
+        sub.add_argument("--user")
+        sub.add_argument("--since", help="e.g. 30d, 12h, 2w or 2025-10-01")
+        sub.add_argument("--until")
+        if command == "runs":
+            sub.add_argument("--limit", type=int, default=20)
+        elif command == "histogram":
+            sub.add_argument("--by-server", action="store_true", help="One histogram per server")
+        else:
+            sub.add_argument("--by", choices=sorted(GROUPINGS), help="Group into time buckets")
+        if command in ("latency", "histogram"):
+            sub.add_argument("--step", default="total", help="Step name (e.g. grid_load) or 'total'")
+        if command == "latency":
+            sub.add_argument("--percentiles", default="50,90,99")
+
+    args = parser.parse_args()
+    store = ResultsStore(args.path)
+
+    if args.command == "backfill":
+        imported, skipped = store.backfill(args.dir, args.server)
+        print(f"Imported {imported} reports ({skipped} skipped or already stored)")
+    else:
+        filters = {"server": args.server, "role": args.role, "user": args.user,
+                   "since": args.since, "until": args.until}
+        if args.command == "pass-rate":
+            print_rows(store.pass_rate(args.by, **filters))
+        elif args.command == "latency":
+            percentiles = [int(p) for p in args.percentiles.split(",")]
+            print_rows(store.step_percentiles(args.step, percentiles, args.by, **filters))
+        elif args.command == "histogram":
+            print_histograms(store.step_histogram(args.step, by_server=args.by_server, **filters))
+        else:
+            print_rows(store.recent_runs(args.limit, **filters))
+    store.close()
@@ -0,0 +1,258 @@
+"""
+Parallel multi-role UI test matrix.
+
+Runs the user test (role assignment, login, navigation, user search) for
+every role/user combination at once, using a bounded pool of headless
+Chrome drivers, and prints one aggregated result table.
+
+Scenarios that share a test user are serialized, because assigning a role
+to a researcher while another scenario checks that researcher would mix
+up their results. Give each role its own test user (--users with --pair)
+to run everything in parallel.
+
+Usage:
+    python -m clarity_user_test.role_matrix --roles "Editor,Collaborator,Administrative Lab"
+    python -m clarity_user_test.role_matrix --roles "Editor,Collaborator" --users "Matrix Editor,Matrix Collab" --pair
+    python -m clarity_user_test.role_matrix --roles "Editor,Collaborator" --report pdf
+"""
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .config import CLARITY_SERVERS, base_url_for, get_credentials
+from .driver_pool import DriverPool
+from .lookup_cache import LookupCache
+from .strategy_stats import StrategyStats
+from .timeout_policy import TimeoutPolicy, use_timeout_policy
+from .runner import parse_user
+from .ui_steps import login, open_user_management, wait_for_user_list, search_user
+from .ui_waits import element_wait
+
+DEFAULT_ROLES = ["Administrative Lab", "Collaborator", "Editor"]
+DEFAULT_USERS = ["Emil Test"]
+
+
+def build_matrix(roles, users, pair=False):
+    """
+    Build the list of scenarios to run.
+
+    Args:
+        roles: Role names
+        users: Form field dicts (see parse_user)
+        pair: Pair roles and users one-to-one instead of the full cross product
+
+    Returns:
+        list: Scenario dicts with role and user
+    """
+    if pair:
+        if len(roles) != len(users):
+            raise ValueError(f"--pair needs as many users as roles ({len(users)} users, {len(roles)} roles)")
+        return [{"role": r, "user": u} for r, u in zip(roles, users)]
+    return [{"role": r, "user": u} for u in users for r in roles]
+
+
+def assign_role(cache, scenario):
+    """
+    Make sure the scenario's test user has the scenario's role.
+
+    Returns:
+        tuple: (researcher, changed) where changed is True if a commit was made
+    """
+    user = scenario["user"]
+    matches = cache.query_researchers(**{
+        'firstname': [user["firstName"]],
+        'lastname': user["lastName"]
+    })
+    if not matches:
+        raise LookupError(f"No researcher named {user['firstName']} {user['lastName']}")
+    researcher = matches[0]
+
+    role_obj = cache.get_role(scenario["role"])
+    if role_obj is None:
+        raise LookupError(f"Unknown role '{scenario['role']}'")
+
+    if any(r.uri == role_obj.uri for r in researcher.roles):
+        return researcher, False
+    researcher.add_role(role_obj)
+    researcher.commit()
+    cache.invalidate_researcher(researcher)
+    return researcher, True
+
+
+def run_scenario(scenario, pool, cache, base_url, username, password, user_lock, reuse_session=False,
+                 stats=None, timeouts=None):
+    """
+    Run one role/user scenario and time each step.
+
+    Returns:
+        dict: Scenario result with per-step timings
+    """
+    user = scenario["user"]
+    result = {
+        "role": scenario["role"],
+        "user": f"{user['firstName']} {user['lastName']}",
+        "found": False,
+        "details": "",
+        "error": "",
+        "steps": {},
+        "seconds": 0.0,
+    }
+    start = time.monotonic()
+
+    def step(name, func, *args):
+        step_start = time.monotonic()
+        try:
+            return func(*args)
+        finally:
+            result["steps"][name] = round(time.monotonic() - step_start, 2)
+
+    with user_lock:
+        try:
+            researcher, changed = step("role_commit", assign_role, cache, scenario)
+            form_fields = dict(user, username=researcher.username)
+
+            with pool.driver() as driver, use_timeout_policy(timeouts):
+                wait = element_wait(driver)
+                step("login", login, driver, base_url, username, password, reuse_session)
+                step("navigation", open_user_management, driver, wait, base_url, stats)
+                step("grid_load", wait_for_user_list, driver)
+                found, details = step("search", search_user, driver, form_fields)
+            result["found"] = found
+            result["details"] = details if found is not False else f"User '{result['user']}' not found"
+        except Exception as e:
+            result["error"] = str(e)[:100]
+
+    result["seconds"] = round(time.monotonic() - start, 2)
+    return result
+
+
+def run_matrix(scenarios, lims, server_url, base_url, username, password, pool_size=4, reuse_session=False):
+    """
+    Run all scenarios in parallel on a bounded headless driver pool.
+
+    Args:
+        scenarios: Scenario dicts from build_matrix
+        lims: s4.clarity.LIMS instance used for role assignment
+        server_url: API URL, used as the lookup cache key
+        base_url: Clarity web UI base URL
+        username: Clarity username for the UI login
+        password: Clarity password for the UI login
+        pool_size: Maximum number of browsers running at once
+        reuse_session: Share one saved login session between the browsers
+
+    Returns:
+        list: One result dict per scenario, in scenario order
+    """
+    cache = LookupCache(lims, server_url)
+    user_locks = {}
+    per_user = {}
+    for scenario in scenarios:
+        key = (scenario["user"]["firstName"], scenario["user"]["lastName"])
+        user_locks.setdefault(key, threading.Lock())
+        per_user[key] = per_user.get(key, 0) + 1
+
+    shared = {" ".join(key): count for key, count in per_user.items() if count > 1}
+    if shared:
+        users = ", ".join(f"{name} ({count} scenarios)" for name, count in shared.items())
+        print(f"  ⚠ Scenarios sharing a test user run one after another: {users}")
+        print("    Give each role its own test user (--users with --pair) to run them in parallel")
+
+    stats = StrategyStats(base_url)
+    timeouts = TimeoutPolicy(base_url)
+    pool = DriverPool(pool_size)
+    try:
+        with ThreadPoolExecutor(max_workers=pool_size) as executor:
+            futures = [
+                executor.submit(
+                    run_scenario, scenario, pool, cache, base_url, username, password,
+                    user_locks[(scenario["user"]["firstName"], scenario["user"]["lastName"])],
+                    reuse_session, stats, timeouts
+                )
+                for scenario in scenarios
+            ]
+            return [future.result() for future in futures]
+    finally:
+        pool.close()
+        stats.save()
+        timeouts.save()
+
+
+def print_matrix(results, wall_clock):
+    """Print the aggregated scenario results."""
+    print("\n" + "="*70)
+    print("ROLE MATRIX RESULTS")
+    print("="*70)
+    for r in results:
+        status = "✓ FOUND" if r["found"] else ("✗ ERROR" if r["error"] else "✗ NOT FOUND")
+        steps = ", ".join(f"{name} {secs}s" for name, secs in r["steps"].items())
+        print(f"  {r['role']:<24} {r['user']:<20} {status:<12} {r['seconds']:>6}s  ({steps})")
+        if r["error"]:
+            print(f"      Error: {r['error']}")
+
+    passed = sum(1 for r in results if r["found"])
+    slowest = max((r["seconds"] for r in results), default=0)
+    print("-"*70)
+    print(f"  {passed}/{len(results)} scenarios passed")
+    print(f"  Wall clock: {wall_clock:.1f}s (slowest scenario: {slowest:.1f}s)")
+    print("="*70)
+
+
+if __name__ == "__main__":
+    import s4.clarity
+
+    parser = argparse.ArgumentParser(description="Run the user test for several roles in parallel")
+    parser.add_argument("--server", default="dev", choices=sorted(CLARITY_SERVERS))
+    parser.add_argument("--roles", default=",".join(DEFAULT_ROLES), help="Comma separated role names")
+    parser.add_argument("--users", default=",".join(DEFAULT_USERS), help="Comma separated 'First Last' test users")
+    parser.add_argument("--pair", action="store_true", help="Give each role its own user instead of the cross product")
+    parser.add_argument("--workers", type=int, default=4, help="Number of headless browsers")
+    parser.add_argument("--json", help="Also write the aggregated results to this JSON file")
+    parser.add_argument("--reuse-session", action="store_true", help="Reuse a saved login session across browsers")
+    parser.add_argument("--report", choices=["pdf", "json", "html"], help="Write one summary report for all scenarios")
+    args = parser.parse_args()
+
+    username, password = get_credentials()
+    if not username or not password:
+        print("Credentials not found. Please run store_creds.py first.")
+        exit(1)
+
+    roles = [r.strip() for r in args.roles.split(",") if r.strip()]
+    users = [parse_user(u) for u in args.users.split(",") if u.strip()]
+    scenarios = build_matrix(roles, users, args.pair)
+
+    lims = s4.clarity.LIMS(CLARITY_SERVERS[args.server], username, password)
+    print(f"Running {len(scenarios)} scenarios on {args.server} with {args.workers} browsers...")
+
+    start = time.monotonic()
+    results = run_matrix(
+        scenarios, lims, CLARITY_SERVERS[args.server], base_url_for(args.server),
+        username, password, args.workers, args.reuse_session
+    )
+    print_matrix(results, time.monotonic() - start)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+
+    try:
+        from .results_store import ResultsStore
+        store = ResultsStore()
+        for r in results:
+            store.add_run(r, args.server)
+        store.close()
+    except Exception as e:
+        print(f"  ⚠ Could not save results to the history: {str(e)[:50]}")
+
+    if args.report:
+        from .report import generate_summary_report
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
+        report = generate_summary_report(
+            (dict(r, timestamp=timestamp) for r in results), args.report,
+            title=f"Role Matrix Report ({args.server})"
+        )
+        print(f"Summary report written to {report}")
+
+    exit(0 if all(r["found"] for r in results) else 1)
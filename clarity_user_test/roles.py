@@ -0,0 +1,53 @@
+"""
+Role changes on a Clarity researcher.
+"""
+
+ROLE_ACTIONS = ("add", "remove")
+
+
+def has_role(user, role_obj):
+    return any(r.uri == role_obj.uri for r in user.roles)
+
+
+def add_role_to_user(user, role_obj, username, role_name, cache=None):
+    """Add a role to a user; returns False (and makes no commit) if the user already has it."""
+    if has_role(user, role_obj):
+        print(f"{username} already has the {role_name} role, nothing to commit")
+        return False
+    # Add the role
+    user.add_role(role_obj)
+    user.commit()
+    if cache:
+        cache.invalidate_researcher(user)
+    print(f"Added {role_name} role to {username}")
+    return True
+
+
+def remove_role_from_user(user, role_obj, username, role_name, cache=None):
+    """Remove a role from a user; returns False (and makes no commit) if the user does not have it."""
+    if not has_role(user, role_obj):
+        print(f"{username} does not have the {role_name} role, nothing to commit")
+        return False
+    # Remove the role
+    user.remove_role(role_obj)
+    user.commit()
+    if cache:
+        cache.invalidate_researcher(user)
+    print(f"Removed {role_name} role from {username}")
+    return True
+
+
+def change_role(action, user, role_obj, username, role_name, cache=None):
+    """Apply an 'add' or 'remove' role action; returns True if a commit was made."""
+    if action == "add":
+        return add_role_to_user(user, role_obj, username, role_name, cache)
+    elif action == "remove":
+        return remove_role_from_user(user, role_obj, username, role_name, cache)
+    else:
+        raise ValueError(f"action must be one of {ROLE_ACTIONS}, got '{action}'")
+
+
+def print_roles(user, username):
+    print(f"Current roles for {username}:")
+    for r in user.roles:
+        print(f"  - {r.name}")
@@ -0,0 +1,223 @@
+"""
+One user test run: role change, API verification and the UI check.
+
+run_user_test takes a ClarityContext, so repeated runs in one process
+reuse its LIMS client, lookup cache and browser.
+"""
+import sys
+import time
+
+from .api_verify import verify_via_api, UiCheckSchedule, should_run_ui_check, compare_api_ui
+from .roles import change_role, print_roles
+from .timing import StepTimer
+
+RUN_MODES = ("ui", "api", "hybrid", "role")
+DEFAULT_FORM_FIELDS = {"firstName": "Emil", "lastName": "Test"}
+
+
+def parse_user(text):
+    """Turn 'First Last' into the form fields used by search_user."""
+    first_name, _, last_name = text.strip().partition(" ")
+    return {"firstName": first_name, "lastName": last_name.strip()}
+
+
+def run_user_test(context, role_name, form_fields=None, mode="ui", action="add",
+                  ui_check_every_n_runs=10, ui_check_max_age_hours=24, keep_open=False):
+    """
+    Change a test user's role and check the result through the API and/or the UI.
+
+    Args:
+        context: ClarityContext for the server
+        role_name: Role to add or remove
+        form_fields: Dict with firstName and lastName of the test user (defaults to Emil Test)
+        mode: 'ui' (always check in the browser), 'api' (API only), 'hybrid' (API, plus UI
+              every ui_check_every_n_runs) or 'role' (role change only)
+        action: 'add', 'remove' or None to leave the role unchanged
+        ui_check_every_n_runs: Hybrid mode: run the browser check on every Nth run
+        ui_check_max_age_hours: Hybrid mode: run the browser check if the last one is older than this
+        keep_open: Wait for Enter before closing the browser (interactive runs)
+
+    Returns:
+        dict: test_results (timestamp, search_name, role, found, details, verify_mode,
+              mismatches, timings)
+    """
+    if mode not in RUN_MODES:
+        raise ValueError(f"mode must be one of {RUN_MODES}, got '{mode}'")
+    form_fields = dict(form_fields or DEFAULT_FORM_FIELDS)
+    search_name = f"{form_fields.get('firstName', '')} {form_fields.get('lastName', '')}"
+    timer = StepTimer()
+
+    # Connect to Clarity API
+    with timer.span("api_connect"):
+        context.lims
+    cache = context.lookup_cache
+
+    # Get current user
+    with timer.span("role_lookup"):
+        current_user = cache.query_researchers(**{
+            'firstname': [form_fields.get('firstName', '')],
+            'lastname': form_fields.get('lastName', '')
+        })
+        role = cache.get_role(role_name)
+    if not current_user:
+        raise LookupError(f"No researcher named {search_name}")
+    if role is None:
+        raise LookupError(f"Unknown role '{role_name}'")
+    user = current_user[0]
+    form_fields.setdefault("username", user.username)
+
+    print(f"Current user: {user.first_name} {user.last_name}")
+    print(f"Current user: {user.username}")
+    print_roles(user, user.username)
+
+    if action:
+        with timer.span("role_commit"):
+            change_role(action, user, role, user.username, role_name, cache)
+        print_roles(user, user.username)
+    print(cache.summary())
+
+    test_results = {
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "search_name": search_name,
+        "role": role_name,
+        "found": False,
+        "details": "",
+        "verify_mode": mode,
+        "mismatches": []
+    }
+
+    # After a remove the role should be gone; otherwise it should be there
+    expect_role = action != "remove"
+
+    if mode == "role":
+        test_results["found"] = expect_role == any(r.uri == role.uri for r in user.roles)
+        test_results["details"] = f"Role change only ({action or 'no change'})"
+        test_results["timings"] = timer.as_list()
+        timer.print_summary()
+        return test_results
+
+    # Fast API-side check of the researcher and role
+    print("\nVerifying via API...")
+    with timer.span("api_verify"):
+        api_result = verify_via_api(cache, form_fields, role_name)
+    api_ok = api_result["found"] and api_result["has_role"] == expect_role
+    print(f"  {'✓' if api_ok else '✗'} {api_result['details']} ({api_result['seconds']}s)")
+
+    ui_schedule = UiCheckSchedule(context.base_url, ui_check_every_n_runs, ui_check_max_age_hours)
+    run_ui_check, ui_check_reason = should_run_ui_check(mode, ui_schedule)
+
+    if not run_ui_check:
+        print(f"  Skipping the browser check: {ui_check_reason}")
+        ui_schedule.record_run(ui_checked=False)
+        test_results["found"] = api_ok
+        test_results["details"] = api_result["details"]
+        test_results["verify_mode"] = "api"
+    else:
+        print(f"  Running the browser check: {ui_check_reason}")
+        test_results.update(run_ui_check_steps(context, form_fields, api_result, role_name, timer, expect_role))
+        ui_schedule.record_run(ui_checked=True)
+
+    finish_run(context, test_results, timer)
+
+    if keep_open and context.started("driver") and sys.stdin.isatty():
+        # Keep browser open while the report renders (never under cron or a job runner)
+        input("\nPress Enter to close the browser...")
+        context.close_driver()
+    return test_results
+
+
+def run_ui_check_steps(context, form_fields, api_result, role_name, timer, expect_role=True):
+    """Log in, open User Management, search the grid and cross-check against the API."""
+    from .timeout_policy import use_timeout_policy
+    from .ui_steps import login, open_user_management, wait_for_user_list, search_user
+    from .ui_waits import element_wait, use_wait_report
+
+    search_name = f"{form_fields.get('firstName', '')} {form_fields.get('lastName', '')}"
+    username, password = context.credentials
+    print(f"Starting automation as {username}")
+
+    driver = context.driver
+    strategy_stats = context.strategy_stats
+    # Each context keeps its own wait report, so concurrent runs do not mix entries
+    wait_report = context.wait_report
+    wait_report.clear()
+
+    def collect_resources(step):
+        # Charge the page's network activity to the step (see resource_blocking)
+        if context.started("resource_blocker"):
+            context.resource_blocker.collect(driver, step)
+
+    # Waits use timeouts learned from this server's history (see timeout_policy)
+    with use_timeout_policy(context.timeout_policy), use_wait_report(wait_report):
+        wait = element_wait(driver)
+        try:
+            with timer.span("login"):
+                login(driver, context.base_url, username, password, context.reuse_session)
+            collect_resources("login")
+
+            with timer.span("navigation"):
+                open_user_management(driver, wait, context.base_url, strategy_stats)
+            collect_resources("navigation")
+
+            with timer.span("grid_load"):
+                wait_for_user_list(driver)
+            collect_resources("grid_load")
+
+            with timer.span("search"):
+                user_found, found_details, grid_row = search_user(driver, form_fields, return_row=True)
+            collect_resources("search")
+
+            wait_report.print_summary()
+            if context.started("resource_blocker"):
+                context.resource_blocker.print_summary()
+            strategy_stats.save()
+            context.timeout_policy.save()
+
+            # Cross-check what the UI shows against the API
+            mismatches = compare_api_ui(api_result, user_found, grid_row, role_name, expect_role)
+            if mismatches:
+                print("\n  ⚠ API and UI disagree:")
+                for mismatch in mismatches:
+                    print(f"    - {mismatch}")
+            else:
+                print("\n  ✓ API and UI agree")
+
+            print("\nAutomation completed successfully!")
+            return {
+                "found": user_found,
+                "details": found_details if user_found is not False else f"User '{search_name}' not found",
+                "mismatches": mismatches
+            }
+
+        except Exception as e:
+            print(f"\n Error during automation: {e}")
+            return {"found": False, "details": f"Error during automation: {str(e)[:100]}"}
+
+        finally:
+            # Log out so the next run in this process starts clean (unless the session is reused)
+            if not context.reuse_session:
+                try:
+                    driver.delete_all_cookies()
+                except Exception:
+                    context.close_driver()
+
+
+def finish_run(context, test_results, timer):
+    """
+    Queue the PDF report and add the run to the results history.
+
+    The report renders on the worker thread, so the PDF and the timing table
+    printed here show the spans up to this point. The run is saved to the
+    history once the report is done, with its "report" span included.
+    """
+    print("\nStep 5: Generate PDF Report (in the background)")
+    test_results["timings"] = timer.as_list()
+
+    def save_run(results):
+        try:
+            context.results_store.add_run(dict(results, timings=timer.as_list()), context.server)
+        except Exception as e:
+            print(f"  ⚠ Could not save run to the results history: {str(e)[:50]}")
+
+    context.report_worker.submit(dict(test_results), timer=timer, done=save_run)
+    timer.print_summary()
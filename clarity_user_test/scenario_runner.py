@@ -0,0 +1,526 @@
+"""
+Declarative test scenarios with dependency-aware step scheduling.
+
+A scenario file (YAML or JSON) describes scenarios as steps built on the
+UI steps (navigate_and_click, select_dropdown_option, the user list and
+user search) and the API role helpers, with explicit dependencies:
+
+    steps:                          # shared steps, run once for all scenarios
+      login: {action: login}
+      configuration: {action: navigate, element: configuration, needs: [login]}
+    scenarios:
+      - name: Editor can be found
+        role: Editor                # defaults for the scenario's steps
+        user: Emil Test
+        steps:
+          role: {action: change_role}
+          users_tab: {action: navigate, element: user_management, needs: [configuration]}
+          grid: {action: wait_user_list, needs: [users_tab]}
+          search: {action: search_user, needs: [grid, role]}
+
+Steps whose dependencies are met run concurrently: API steps (after an
+implicit api_connect step) run alongside the browser steps, so the role
+commit overlaps the login. Browser steps share one browser and take turns;
+once a scenario starts using the browser it keeps it until its browser
+steps are done, so another scenario cannot navigate away mid-scenario.
+A failed step skips everything that depends on it.
+
+Usage:
+    python -m clarity_user_test.scenario_runner clarity_user_test/scenarios/configuration.yaml --server dev
+    python -m clarity_user_test.scenario_runner my_scenarios.json --only "Editor can be found" --headless
+    python -m clarity_user_test.scenario_runner my_scenarios.yaml --plan   # print the steps, run nothing
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from .timing import StepTimer
+
+DEFAULT_SCENARIO_FILE = os.path.join(os.path.dirname(__file__), "scenarios", "configuration.yaml")
+API_CONNECT_STEP = "api_connect"
+
+
+# ------------------------
+# Step actions
+# ------------------------
+
+def form_fields_for(step):
+    from .runner import DEFAULT_FORM_FIELDS, parse_user
+
+    return parse_user(step["user"]) if step.get("user") else dict(DEFAULT_FORM_FIELDS)
+
+
+def find_researcher(context, step):
+    form_fields = form_fields_for(step)
+    matches = context.lookup_cache.query_researchers(**{
+        'firstname': [form_fields["firstName"]],
+        'lastname': form_fields["lastName"]
+    })
+    if not matches:
+        raise LookupError(f"No researcher named {form_fields['firstName']} {form_fields['lastName']}")
+    return matches[0]
+
+
+def run_api_connect(run, step):
+    run.context.lookup_cache
+    return True, f"Connected to {run.context.server}"
+
+
+def run_change_role(run, step):
+    from .roles import change_role
+
+    change = step.get("change", "add")
+    role_name = step["role"]
+    with run.user_lock(step.get("user", "")):
+        user = find_researcher(run.context, step)
+        role = run.context.lookup_cache.get_role(role_name)
+        if role is None:
+            raise LookupError(f"Unknown role '{role_name}'")
+        change_role(change, user, role, user.username, role_name, run.context.lookup_cache)
+    return True, f"{change} {role_name} for {user.username}"
+
+
+def run_verify_role(run, step):
+    from .api_verify import verify_via_api
+
+    result = verify_via_api(run.context.lookup_cache, form_fields_for(step), step["role"])
+    expected = step.get("expect", True)
+    return result["found"] and result["has_role"] == expected, result["details"]
+
+
+def run_login(run, step):
+    from .ui_steps import login
+
+    username, password = run.context.credentials
+    login(run.context.driver, run.context.base_url, username, password, run.context.reuse_session)
+    return "/login" not in run.context.driver.current_url, run.context.driver.current_url
+
+
+def run_navigate(run, step):
+    from .ui_steps import ELEMENT_STRATEGIES, fallback_urls, navigate_and_click
+    from .ui_waits import element_wait, url_contains
+
+    base_url = run.context.base_url
+    strategies = [tuple(s) for s in step.get("strategies", [])]
+    fallback_url = step.get("url")
+    if step.get("element"):
+        strategies += ELEMENT_STRATEGIES[step["element"]]
+        fallback_url = fallback_url or fallback_urls(base_url).get(step["element"])
+    if step.get("text"):
+        strategies.append(("XPATH", f"//*[contains(@class, 'tab-title') and contains(text(), '{step['text']}')]",
+                           f"tab text '{step['text']}'"))
+        strategies.append(("XPATH", f"//a[normalize-space()='{step['text']}']", f"link text '{step['text']}'"))
+    if fallback_url and fallback_url.startswith("/"):
+        fallback_url = base_url + fallback_url
+    until = url_contains(step["until_url"]) if step.get("until_url") else None
+
+    driver = run.context.driver
+    ok = navigate_and_click(
+        driver, element_wait(driver), step.get("label", step["id"]), strategies, fallback_url,
+        wait_after=0, until=until, stats=run.context.strategy_stats
+    )
+    return ok, driver.current_url
+
+
+def run_select_option(run, step):
+    from .ui_steps import select_dropdown_option
+    from .ui_waits import element_wait
+
+    driver = run.context.driver
+    ok = select_dropdown_option(driver, element_wait(driver), step["dropdown"], step["option"],
+                                stats=run.context.strategy_stats)
+    return ok, f"{step['dropdown']}: {step['option']}"
+
+
+def run_wait_user_list(run, step):
+    from .ui_steps import wait_for_user_list
+
+    return wait_for_user_list(run.context.driver, step.get("timeout", 60)), "User list loaded"
+
+
+def run_search_user(run, step):
+    from .ui_steps import search_user
+
+    found, details = search_user(run.context.driver, form_fields_for(step))
+    expected = step.get("expect", True)
+    return found == expected, details or f"User '{step.get('user', '')}' not found"
+
+
+def run_assert_element(run, step):
+    from selenium.webdriver.common.by import By
+
+    from .ui_waits import element_present, wait_for
+
+    by, value = (By.XPATH, step["xpath"]) if step.get("xpath") else (By.CSS_SELECTOR, step["css"])
+    ok = wait_for(run.context.driver, element_present(by, value), step.get("label", step["id"]),
+                  timeout=step.get("timeout", 15))
+    return ok, f"{'Found' if ok else 'Missing'}: {value}"
+
+
+# action name -> (function, resource); browser steps take turns on the one browser
+STEP_ACTIONS = {
+    "api_connect": (run_api_connect, "api"),
+    "change_role": (run_change_role, "api"),
+    "verify_role": (run_verify_role, "api"),
+    "login": (run_login, "browser"),
+    "navigate": (run_navigate, "browser"),
+    "select_option": (run_select_option, "browser"),
+    "wait_user_list": (run_wait_user_list, "browser"),
+    "search_user": (run_search_user, "browser"),
+    "assert_element": (run_assert_element, "browser"),
+}
+
+
+# ------------------------
+# Loading and planning
+# ------------------------
+
+def load_scenario_file(path):
+    """Read a YAML (needs PyYAML) or JSON scenario file."""
+    with open(path) as f:
+        text = f.read()
+    if path.lower().endswith((".yaml", ".yml")):
+        try:
+            import yaml
+        except ImportError:
+            raise RuntimeError("PyYAML is needed for YAML scenario files (pip install pyyaml); or use JSON")
+        return yaml.safe_load(text)
+    return json.loads(text)
+
+
+def step_items(steps):
+    """Steps as (id, spec) pairs; a file may give them as a mapping or as a list with ids."""
+    if isinstance(steps, dict):
+        return list(steps.items())
+    return [(spec["id"], spec) for spec in steps or []]
+
+
+def build_plan(document, only=None):
+    """
+    Turn a scenario document into a validated step graph.
+
+    Args:
+        document: Parsed scenario file
+        only: Optional scenario names to keep
+
+    Returns:
+        dict: steps (id -> step, in file order) and scenarios (name, role, user, step ids)
+    """
+    steps = {}
+
+    def add_step(step_id, spec, scenario, local_ids, defaults):
+        if "action" not in spec:
+            raise ValueError(f"Step '{step_id}' has no action")
+        if spec["action"] not in STEP_ACTIONS:
+            raise ValueError(f"Step '{step_id}': unknown action '{spec['action']}', expected one of {sorted(STEP_ACTIONS)}")
+        step = dict(defaults, **spec)
+        prefix = f"{scenario}/" if scenario else ""
+        step["id"] = prefix + step_id
+        step["scenario"] = scenario
+        step["resource"] = STEP_ACTIONS[spec["action"]][1]
+        step["needs"] = [prefix + n if n in local_ids else n for n in spec.get("needs", [])]
+        steps[step["id"]] = step
+
+    shared = step_items(document.get("steps"))
+    for step_id, spec in shared:
+        add_step(step_id, spec, None, set(), {})
+
+    scenarios = []
+    for scenario in document.get("scenarios", []):
+        name = scenario["name"]
+        if only and name not in only:
+            continue
+        local = step_items(scenario.get("steps"))
+        local_ids = {step_id for step_id, _ in local}
+        defaults = {key: scenario[key] for key in ("role", "user") if key in scenario}
+        for step_id, spec in local:
+            add_step(step_id, spec, name, local_ids, defaults)
+        scenarios.append({"name": name, "role": scenario.get("role", ""), "user": scenario.get("user", ""),
+                          "steps": [f"{name}/{step_id}" for step_id, _ in local]})
+    if only and len(scenarios) != len(only):
+        missing = set(only) - {s["name"] for s in scenarios}
+        raise ValueError(f"Unknown scenarios: {sorted(missing)}")
+
+    # Every API step waits for the connection, which runs alongside the login
+    if any(s["resource"] == "api" for s in steps.values()) and API_CONNECT_STEP not in steps:
+        steps = dict({API_CONNECT_STEP: {"id": API_CONNECT_STEP, "action": "api_connect", "scenario": None,
+                                         "resource": "api", "needs": []}}, **steps)
+    for step in steps.values():
+        if step["resource"] == "api" and step["id"] != API_CONNECT_STEP and API_CONNECT_STEP not in step["needs"]:
+            step["needs"].append(API_CONNECT_STEP)
+
+    for step in steps.values():
+        unknown = [n for n in step["needs"] if n not in steps]
+        if unknown:
+            raise ValueError(f"Step '{step['id']}' needs unknown steps {unknown}")
+
+    ancestors = {}
+
+    def ancestors_of(step_id, path=()):
+        if step_id in path:
+            raise ValueError(f"Dependency cycle: {' -> '.join(path + (step_id,))}")
+        if step_id not in ancestors:
+            found = set()
+            for need in steps[step_id]["needs"]:
+                found.add(need)
+                found |= ancestors_of(need, path + (step_id,))
+            ancestors[step_id] = found
+        return ancestors[step_id]
+
+    for step_id in steps:
+        steps[step_id]["ancestors"] = ancestors_of(step_id)
+
+    # Only keep the shared steps the selected scenarios use
+    used = set()
+    for scenario in scenarios:
+        for step_id in scenario["steps"]:
+            used |= {step_id} | steps[step_id]["ancestors"]
+    order = list(steps)
+    for scenario in scenarios:
+        scenario["all_steps"] = sorted(
+            {a for s in scenario["steps"] for a in steps[s]["ancestors"]} | set(scenario["steps"]),
+            key=order.index
+        )
+    return {"steps": {k: v for k, v in steps.items() if k in used}, "scenarios": scenarios}
+
+
+def print_plan(plan):
+    """Print the steps, their resource and dependencies."""
+    print(f"\n{len(plan['scenarios'])} scenarios, {len(plan['steps'])} steps:")
+    for step in plan["steps"].values():
+        needs = f" <- {', '.join(step['needs'])}" if step["needs"] else ""
+        print(f"  [{step['resource']:<7}] {step['id']} ({step['action']}){needs}")
+
+
+# ------------------------
+# Scheduling
+# ------------------------
+
+class ScenarioRun:
+    """
+    Runs a step plan on a ClarityContext with as much concurrency as the dependencies allow.
+
+    Args:
+        context: ClarityContext for the server
+        plan: Result of build_plan
+        max_workers: Steps running at once (only one of them uses the browser)
+    """
+
+    def __init__(self, context, plan, max_workers=4):
+        self.context = context
+        self.plan = plan
+        self.max_workers = max_workers
+        self.timer = StepTimer()
+        self.results = {}   # step id -> {status, details, seconds}
+        self.user_locks = {}
+        self.locks_lock = threading.Lock()
+
+    def user_lock(self, user):
+        """Role changes on the same researcher are made one at a time."""
+        with self.locks_lock:
+            return self.user_locks.setdefault(user, threading.Lock())
+
+    def run_step(self, step):
+        from .timeout_policy import use_timeout_policy
+
+        func = STEP_ACTIONS[step["action"]][0]
+        start = time.monotonic()
+        try:
+            if step["resource"] == "browser":
+                with use_timeout_policy(self.context.timeout_policy):
+                    ok, details = func(self, step)
+            else:
+                ok, details = func(self, step)
+        except Exception as e:
+            ok, details = False, f"{type(e).__name__}: {str(e)[:100]}"
+        seconds = time.monotonic() - start
+        self.timer.add(step["id"], start, seconds, ok)
+        return {"status": "ok" if ok else "failed", "details": details, "seconds": round(seconds, 2)}
+
+    def run(self):
+        """
+        Run every step once, as soon as its dependencies have passed.
+
+        Returns:
+            dict: step id -> {status ('ok', 'failed' or 'skipped'), details, seconds}
+        """
+        steps = self.plan["steps"]
+        order = list(steps)
+        pending = set(steps)
+        running = {}
+        browser_busy = False
+        browser_owner = None   # scenario currently holding the browser
+
+        def owner_needs(step_id):
+            """True if the owning scenario's remaining browser steps depend on step_id."""
+            return any(
+                steps[s]["scenario"] == browser_owner and step_id in steps[s]["ancestors"]
+                for s in pending
+            )
+
+        def owner_done():
+            return not any(steps[s]["scenario"] == browser_owner and steps[s]["resource"] == "browser" for s in pending)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                progress = True
+                while progress:
+                    progress = False
+                    for step_id in sorted(pending, key=order.index):
+                        step = steps[step_id]
+                        if any(self.results.get(n, {}).get("status") in ("failed", "skipped") for n in step["needs"]):
+                            failed = [n for n in step["needs"] if self.results.get(n, {}).get("status") in ("failed", "skipped")]
+                            self.results[step_id] = {"status": "skipped", "details": f"needs {', '.join(failed)}", "seconds": 0}
+                            pending.discard(step_id)
+                            progress = True
+                            continue
+                        if not all(self.results.get(n, {}).get("status") == "ok" for n in step["needs"]):
+                            continue
+                        if len(running) >= self.max_workers:
+                            break
+                        if step["resource"] == "browser":
+                            if browser_busy:
+                                continue
+                            if browser_owner and step["scenario"] != browser_owner and not owner_needs(step_id):
+                                continue
+                            browser_busy = True
+                            if step["scenario"]:
+                                browser_owner = step["scenario"]
+                        pending.discard(step_id)
+                        running[executor.submit(self.run_step, step)] = step_id
+                        progress = True
+                    if browser_owner and owner_done():
+                        browser_owner = None
+                        progress = True
+
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    step_id = running.pop(future)
+                    self.results[step_id] = future.result()
+                    if steps[step_id]["resource"] == "browser":
+                        browser_busy = False
+                    status = "✓" if self.results[step_id]["status"] == "ok" else "✗"
+                    print(f"  {status} {step_id} ({self.results[step_id]['seconds']}s)")
+                if browser_owner and owner_done():
+                    browser_owner = None
+
+        for step_id in pending:
+            self.results[step_id] = {"status": "skipped", "details": "not scheduled", "seconds": 0}
+        return self.results
+
+    def scenario_results(self):
+        """One result per scenario, in the shape role_matrix and the summary report use."""
+        timings = {t["step"]: t for t in self.timer.as_list()}
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
+        results = []
+        for scenario in self.plan["scenarios"]:
+            step_results = {s: self.results.get(s, {"status": "skipped", "details": "", "seconds": 0})
+                            for s in scenario["all_steps"]}
+            failed = [(s, r) for s, r in step_results.items() if r["status"] != "ok"]
+            if failed:
+                step_id, r = failed[0]
+                details = f"{step_id} {r['status']}: {r['details']}"
+            else:
+                details = f"All {len(step_results)} steps passed"
+            results.append({
+                "timestamp": timestamp,
+                "scenario": scenario["name"],
+                "role": scenario["role"] or scenario["name"],
+                "user": scenario["user"],
+                "found": not failed,
+                "details": details,
+                "error": "",
+                "steps": {s: r["seconds"] for s, r in step_results.items()},
+                "timings": [timings[s] for s in scenario["all_steps"] if s in timings],
+            })
+        return results
+
+
+def print_scenario_results(results, wall_clock, serial_seconds):
+    """Print one line per scenario and how much the concurrency saved."""
+    print("\n" + "="*70)
+    print("SCENARIO RESULTS")
+    print("="*70)
+    for r in results:
+        status = "✓ PASSED" if r["found"] else "✗ FAILED"
+        print(f"  {r['scenario'][:40]:<40} {status:<10} {len(r['steps'])} steps")
+        if not r["found"]:
+            print(f"      {r['details'][:90]}")
+    print("-"*70)
+    print(f"  {sum(1 for r in results if r['found'])}/{len(results)} scenarios passed")
+    print(f"  Wall clock: {wall_clock:.1f}s (steps one after another: {serial_seconds:.1f}s)")
+    print("="*70)
+
+
+def run_scenario_file(context, path, only=None, max_workers=4, report=None):
+    """
+    Load, schedule and run a scenario file; print and record the results.
+
+    Args:
+        context: ClarityContext for the server
+        path: YAML or JSON scenario file
+        only: Optional scenario names to run
+        max_workers: Steps running at once
+        report: Optional summary report format ('pdf', 'json' or 'html')
+
+    Returns:
+        list: One result dict per scenario
+    """
+    plan = build_plan(load_scenario_file(path), only)
+    print(f"Running {len(plan['scenarios'])} scenarios ({len(plan['steps'])} steps) from {path}...")
+    run = ScenarioRun(context, plan, max_workers)
+    start = time.monotonic()
+    step_results = run.run()
+    results = run.scenario_results()
+    run.timer.print_summary()
+    print_scenario_results(results, time.monotonic() - start, sum(r["seconds"] for r in step_results.values()))
+
+    try:
+        for r in results:
+            context.results_store.add_run(r, context.server)
+    except Exception as e:
+        print(f"  ⚠ Could not save results to the history: {str(e)[:50]}")
+    if report:
+        from .report import generate_summary_report
+        path = generate_summary_report(results, report, title=f"Scenario Report ({context.server})")
+        print(f"Summary report written to {path}")
+    return results
+
+
+if __name__ == "__main__":
+    from .config import CLARITY_SERVERS
+    from .context import ClarityContext
+
+    parser = argparse.ArgumentParser(description="Run declarative test scenarios")
+    parser.add_argument("file", nargs="?", default=DEFAULT_SCENARIO_FILE, help="YAML or JSON scenario file")
+    parser.add_argument("--server", default="dev", choices=sorted(CLARITY_SERVERS))
+    parser.add_argument("--only", help="Comma separated scenario names to run")
+    parser.add_argument("--workers", type=int, default=4, help="Steps running at once")
+    parser.add_argument("--headless", action="store_true", help="Run the browser headless")
+    parser.add_argument("--report", choices=["pdf", "json", "html"], help="Write one summary report for all scenarios")
+    parser.add_argument("--json", help="Also write the scenario results to this JSON file")
+    parser.add_argument("--plan", action="store_true", help="Print the step plan and exit")
+    args = parser.parse_args()
+
+    only = [s.strip() for s in args.only.split(",")] if args.only else None
+    if args.plan:
+        print_plan(build_plan(load_scenario_file(args.file), only))
+        exit(0)
+
+    with ClarityContext(args.server, headless=args.headless) as context:
+        try:
+            results = run_scenario_file(context, args.file, only, args.workers, args.report)
+        except (RuntimeError, ValueError) as e:
+            print(e)
+            exit(1)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+    exit(0 if all(r["found"] for r in results) else 1)
@@ -0,0 +1,99 @@
+"""
+Reuse authenticated Clarity browser sessions instead of logging in every run.
+
+After a successful login the session cookies are saved in keyring (the
+same store as the credentials), keyed by server and username. A new
+driver gets those cookies injected, one cheap request checks that the
+session is still valid, and only an expired session falls back to the
+full login form.
+"""
+import json
+import time
+
+import keyring
+import keyring.errors
+
+from .config import SERVICE_NAME
+
+# Page fetched to check a restored session; Clarity redirects to the login page when it has expired
+VALIDATION_PATH = "/clarity/configuration"
+
+# Same-origin page loaded before injecting cookies (cookies can only be set for the current domain)
+COOKIE_LANDING_PATH = "/clarity/favicon.ico"
+
+VALIDATE_SESSION_SCRIPT = """
+const done = arguments[arguments.length - 1];
+fetch(arguments[0], {credentials: "include", redirect: "manual"})
+    .then(r => done(r.type !== "opaqueredirect" && r.ok && !r.url.includes("/login")))
+    .catch(() => done(false));
+"""
+
+
+def session_key(base_url, username):
+    return f"session:{base_url}:{username}"
+
+
+def save_session(driver, base_url, username):
+    """Store the driver's cookies for this server and user in keyring."""
+    payload = {"saved_at": time.time(), "cookies": driver.get_cookies()}
+    keyring.set_password(SERVICE_NAME, session_key(base_url, username), json.dumps(payload))
+
+
+def load_session(base_url, username):
+    """Return the saved cookies for this server and user, or None."""
+    stored = keyring.get_password(SERVICE_NAME, session_key(base_url, username))
+    if not stored:
+        return None
+    try:
+        cookies = json.loads(stored)["cookies"]
+    except (ValueError, KeyError):
+        return None
+    now = time.time()
+    return [c for c in cookies if not c.get("expiry") or c["expiry"] > now] or None
+
+
+def clear_session(base_url, username):
+    """Forget the saved session for this server and user."""
+    try:
+        keyring.delete_password(SERVICE_NAME, session_key(base_url, username))
+    except keyring.errors.PasswordDeleteError:
+        pass
+
+
+def session_is_valid(driver, base_url):
+    """Check the current cookies with a single request from inside the browser."""
+    try:
+        return bool(driver.execute_async_script(VALIDATE_SESSION_SCRIPT, f"{base_url}{VALIDATION_PATH}"))
+    except Exception:
+        return False
+
+
+def restore_session(driver, base_url, username):
+    """
+    Inject a saved session into the driver and validate it.
+
+    Args:
+        driver: Selenium WebDriver instance
+        base_url: Clarity base URL, e.g. https://clarity-dev.btolims.com
+        username: Clarity username the session belongs to
+
+    Returns:
+        bool: True if the driver is now logged in, False if a full login is needed
+    """
+    cookies = load_session(base_url, username)
+    if not cookies:
+        return False
+
+    driver.get(f"{base_url}{COOKIE_LANDING_PATH}")
+    for cookie in cookies:
+        try:
+            driver.add_cookie(cookie)
+        except Exception:
+            pass
+
+    if session_is_valid(driver, base_url):
+        return True
+
+    driver.delete_all_cookies()
+    clear_session(base_url, username)
+    return False
@@ -0,0 +1,544 @@
+"""
+Local stand-in for the Clarity REST API and web UI.
+
+Serves just enough of the Clarity v2 API for s4.clarity.LIMS to look up
+researchers and roles and to commit role changes, so the bulk and
+benchmark tooling can be exercised without touching clarity-dev.
+
+It also serves minimal login, Configuration and User Management pages
+under /clarity, with the same ids, classes and URLs the UI steps rely
+on. The User Management grid is rendered client-side from the stand-in
+researchers (one .g-col-value per cell), after a spinner, like the real
+page; it can also be virtualized, with or without a filter box, to
+model the production user list.
+
+Artificial latency and a cap on concurrently served requests make it
+behave like a real (slow, rate limited) Clarity instance.
+
+Usage:
+    python -m clarity_user_test.standin --users 500 --latency 0.05 --ui-latency 0.2 --max-concurrent 8
+"""
+import argparse
+import json
+import secrets
+import threading
+import time
+from html import escape as html_escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from xml.etree import ElementTree as ET
+from xml.sax.saxutils import escape, quoteattr
+
+RESEARCHER_NS = "http://genologics.com/ri/researcher"
+ROLE_NS = "http://genologics.com/ri/role"
+VERSION_NS = "http://genologics.com/ri/version"
+
+DEFAULT_ROLES = [
+    "Administrative Lab",
+    "Collaborator",
+    "Editor",
+    "Facility Administrator",
+    "Researcher",
+    "System Administrator",
+]
+
+
+SESSION_COOKIE = "JSESSIONID"
+
+LOGIN_PAGE = """<!DOCTYPE html>
+<html><head><title>Clarity Login</title></head><body>
+<form method="post" action="/clarity/j_spring_security_check">
+  <input id="username" name="username" type="text">
+  <input id="password" name="password" type="password">
+  <button id="sign-in" type="submit">Sign In</button>
+</form>
+</body></html>"""
+
+NAVBAR = """<ul id="navbar-menu-ul">
+  <li><a href="/clarity/">Lab View</a></li>
+  <li><a href="/clarity/projects">Projects and Samples</a></li>
+  <li><a href="/clarity/reports">Reports</a></li>
+  <li><a href="/clarity/configuration">Configuration</a></li>
+</ul>"""
+
+HOME_PAGE = """<!DOCTYPE html>
+<html><head><title>Clarity</title></head><body>
+""" + NAVBAR + """
+<h1>Lab View</h1>
+</body></html>"""
+
+CONFIGURATION_PAGE = """<!DOCTYPE html>
+<html><head><title>Configuration</title></head><body>
+""" + NAVBAR + """
+<div id="configuration-app-container">
+  <div class="tab-panel-header">
+    <div class="tab-title" onclick="location.href='/clarity/configuration/workflows'">WORKFLOWS</div>
+    <div class="tab-title" onclick="location.href='/clarity/configuration/consumables'">CONSUMABLES</div>
+    <div class="tab-title" onclick="location.href='/clarity/configuration/custom-fields'">CUSTOM FIELDS</div>
+    <div class="tab-title" onclick="location.href='/clarity/configuration/user-management/users'">USER MANAGEMENT</div>
+  </div>
+</div>
+</body></html>"""
+
+# The grid is filled in by script after the data request returns, so the
+# page has a loading phase (spinner, then rows) like the real user list.
+# GRID_MODE picks how it renders: "full" puts every row in the DOM,
+# "virtual" only the rows scrolled into view, "filter" is virtual plus a
+# filter box that narrows the list as you type.
+USER_MANAGEMENT_PAGE = """<!DOCTYPE html>
+<html><head><title>User Management</title>
+<style>
+  #user-grid.virtual { height: 600px; overflow-y: auto; position: relative; }
+  #user-grid.virtual .g-col-grid-bar-lg { position: absolute; left: 0; right: 0; height: 30px; }
+  .g-col-grid-bar-lg { display: flex; }
+  .g-col-col { flex: 1; }
+</style>
+</head><body>
+""" + NAVBAR + """
+<div id="configuration-app-container">
+  <div class="tab-panel-header">
+    <div class="tab-title">USER MANAGEMENT</div>
+  </div>
+  <input id="user-filter" type="search" placeholder="Filter users" style="display: none">
+  <div class="g-col-header-row">
+    <div class="g-col-header">Name</div><div class="g-col-header">Username</div>
+    <div class="g-col-header">Email</div><div class="g-col-header">Roles</div>
+  </div>
+  <div id="user-grid" role="grid"><div class="loading">Loading...</div></div>
+</div>
+<script>
+const GRID_MODE = "__GRID_MODE__";
+const ROW_HEIGHT = 30;
+const grid = document.getElementById("user-grid");
+const filterInput = document.getElementById("user-filter");
+let users = [];
+let shown = [];
+
+function makeRow(user, index) {
+  const row = document.createElement("div");
+  row.className = "g-col-grid-bar-lg";
+  row.setAttribute("role", "row");
+  if (GRID_MODE !== "full") row.style.top = (index * ROW_HEIGHT) + "px";
+  for (const value of user) {
+    const col = document.createElement("div");
+    col.className = "g-col-col";
+    const span = document.createElement("span");
+    span.className = "g-col-value";
+    span.textContent = value;
+    col.appendChild(span);
+    row.appendChild(col);
+  }
+  return row;
+}
+
+function render() {
+  const fragment = document.createDocumentFragment();
+  if (GRID_MODE === "full") {
+    shown.forEach((user, index) => fragment.appendChild(makeRow(user, index)));
+  } else {
+    const spacer = document.createElement("div");
+    spacer.style.height = (shown.length * ROW_HEIGHT) + "px";
+    fragment.appendChild(spacer);
+    const first = Math.floor(grid.scrollTop / ROW_HEIGHT);
+    const last = Math.min(shown.length, first + Math.ceil(grid.clientHeight / ROW_HEIGHT) + 1);
+    for (let index = first; index < last; index++) fragment.appendChild(makeRow(shown[index], index));
+  }
+  grid.replaceChildren(fragment);
+}
+
+function applyFilter() {
+  const text = filterInput.value.trim().toLowerCase();
+  shown = text ? users.filter(user => user.some(value => value.toLowerCase().includes(text))) : users;
+  grid.scrollTop = 0;
+  render();
+}
+
+if (GRID_MODE !== "full") {
+  grid.classList.add("virtual");
+  grid.addEventListener("scroll", render);
+}
+if (GRID_MODE === "filter") {
+  filterInput.style.display = "";
+  let pending = null;
+  filterInput.addEventListener("input", () => {
+    clearTimeout(pending);
+    pending = setTimeout(applyFilter, 100);
+  });
+}
+
+fetch("/clarity/standin/users", {credentials: "include"})
+  .then(r => r.json())
+  .then(data => {
+    users = data;
+    shown = users;
+    render();
+  });
+</script>
+</body></html>"""
+
+GRID_MODES = ("full", "virtual", "filter")
+
+UI_PAGES = {
+    "": HOME_PAGE,
+    "configuration": CONFIGURATION_PAGE,
+    "configuration/user-management/users": USER_MANAGEMENT_PAGE,
+}
+
+
+class StandInData:
+    """In-memory researchers and roles shared by all request handlers."""
+
+    def __init__(self, user_count=10, roles=None):
+        self.lock = threading.Lock()
+        self.roles = {}
+        for i, name in enumerate(roles or DEFAULT_ROLES, start=1):
+            self.roles[str(i)] = name
+
+        self.researchers = {}
+        self.add_researcher("Emil", "Test", "etest")
+        for i in range(1, user_count):
+            self.add_researcher("Test", f"User{i:05d}", f"tuser{i:05d}")
+
+    def add_researcher(self, first_name, last_name, username, role_ids=None):
+        """Add a researcher and return its id."""
+        researcher_id = str(len(self.researchers) + 1)
+        self.researchers[researcher_id] = {
+            "first_name": first_name,
+            "last_name": last_name,
+            "username": username,
+            "email": f"{username}@example.com",
+            "roles": list(role_ids or []),
+        }
+        return researcher_id
+
+    def user_grid(self):
+        """Rows of the User Management grid: name, username, email, roles."""
+        with self.lock:
+            return [
+                [
+                    f"{r['first_name']} {r['last_name']}",
+                    r["username"],
+                    r["email"],
+                    ", ".join(self.roles[role_id] for role_id in r["roles"]),
+                ]
+                for r in self.researchers.values()
+            ]
+
+    def role_id_by_name(self, name):
+        for role_id, role_name in self.roles.items():
+            if role_name == name:
+                return role_id
+        return None
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Request handler serving the subset of Clarity endpoints used by s4."""
+
+    server_version = "ClarityStandIn/1.0"
+
+    def log_message(self, format, *args):
+        # Keep benchmark output readable
+        pass
+
+    # ------------------------
+    # Helpers
+    # ------------------------
+
+    @property
+    def data(self):
+        return self.server.data
+
+    def base_uri(self):
+        host = self.headers.get("Host") or f"{self.server.server_address[0]}:{self.server.server_address[1]}"
+        return f"http://{host}/api/v2"
+
+    def send_xml(self, body, status=200):
+        payload = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>' + body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/xml")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def send_body(self, payload, content_type, status=200, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def send_redirect(self, location, headers=None):
+        self.send_body(b"", "text/plain", status=302, headers=dict(headers or {}, Location=location))
+
+    def session_valid(self):
+        for cookie in (self.headers.get("Cookie") or "").split(";"):
+            name, _, value = cookie.strip().partition("=")
+            if name == SESSION_COOKIE and value in self.server.sessions:
+                return True
+        return False
+
+    def send_not_found(self):
+        self.send_xml(
+            '<exc:exception xmlns:exc="http://genologics.com/ri/exception">'
+            f"<message>Not found: {escape(self.path)}</message></exc:exception>",
+            status=404,
+        )
+
+    def researcher_xml(self, researcher_id, researcher):
+        base = self.base_uri()
+        roles = "".join(
+            f'<role uri="{base}/roles/{role_id}" name={quoteattr(self.data.roles[role_id])}/>'
+            for role_id in researcher["roles"]
+        )
+        return (
+            f'<res:researcher xmlns:res="{RESEARCHER_NS}" uri="{base}/researchers/{researcher_id}">'
+            f"<first-name>{escape(researcher['first_name'])}</first-name>"
+            f"<last-name>{escape(researcher['last_name'])}</last-name>"
+            f"<email>{escape(researcher['email'])}</email>"
+            f"<credentials><username>{escape(researcher['username'])}</username>"
+            f"<account-locked>false</account-locked>{roles}</credentials>"
+            f"</res:researcher>"
+        )
+
+    # ------------------------
+    # Routing
+    # ------------------------
+
+    def handle_request(self, method):
+        self.server.request_gate.acquire()
+        try:
+            parsed = urlparse(self.path)
+            parts = [p for p in parsed.path.split("/") if p]
+            query = parse_qs(parsed.query)
+            ui = parts[:1] == ["clarity"]
+
+            with self.server.stats_lock:
+                key = f"UI {method}" if ui else method
+                self.server.request_counts[key] = self.server.request_counts.get(key, 0) + 1
+            latency = self.server.ui_latency if ui else self.server.latency
+            if latency:
+                time.sleep(latency)
+
+            if ui:
+                return self.handle_ui(method, "/".join(parts[1:]))
+            if parts in (["api"], ["api", "v2"]) and method == "GET":
+                return self.get_versions()
+            if parts[:2] != ["api", "v2"] or len(parts) < 3:
+                return self.send_not_found()
+
+            resource, rest = parts[2], parts[3:]
+            if resource == "roles" and method == "GET":
+                return self.get_role(rest[0]) if rest else self.list_roles(query)
+            if resource == "researchers" and method == "GET":
+                return self.get_researcher(rest[0]) if rest else self.list_researchers(query)
+            if resource == "researchers" and method == "PUT" and rest:
+                return self.put_researcher(rest[0])
+            return self.send_not_found()
+        finally:
+            self.server.request_gate.release()
+
+    def do_GET(self):
+        self.handle_request("GET")
+
+    def do_PUT(self):
+        self.handle_request("PUT")
+
+    def do_POST(self):
+        self.handle_request("POST")
+
+    # ------------------------
+    # Web UI
+    # ------------------------
+
+    def handle_ui(self, method, path):
+        if path == "favicon.ico":
+            return self.send_body(b"", "image/x-icon", status=204)
+        if path == "login/auth":
+            return self.send_body(LOGIN_PAGE.encode("utf-8"), "text/html; charset=utf-8")
+        if path == "j_spring_security_check" and method == "POST":
+            return self.post_login()
+        if not self.session_valid():
+            return self.send_redirect("/clarity/login/auth?unauthenticated=1")
+        if path == "standin/users" and method == "GET":
+            payload = json.dumps(self.data.user_grid()).encode("utf-8")
+            return self.send_body(payload, "application/json")
+        page = UI_PAGES.get(path.rstrip("/"))
+        if page is None or method != "GET":
+            return self.send_body(
+                f"<html><body>Not found: {html_escape(path)}</body></html>".encode("utf-8"),
+                "text/html; charset=utf-8", status=404
+            )
+        page = page.replace("__GRID_MODE__", self.server.grid_mode)
+        self.send_body(page.encode("utf-8"), "text/html; charset=utf-8")
+
+    def post_login(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        form = parse_qs(self.rfile.read(length).decode("utf-8"))
+        if not form.get("username") or not form.get("password"):
+            return self.send_redirect("/clarity/login/auth?login_error=1")
+        token = secrets.token_hex(16)
+        with self.server.stats_lock:
+            self.server.sessions.add(token)
+        self.send_redirect("/clarity/", {"Set-Cookie": f"{SESSION_COOKIE}={token}; Path=/clarity; HttpOnly"})
+
+    # ------------------------
+    # Endpoints
+    # ------------------------
+
+    def get_versions(self):
+        base = self.base_uri()
+        self.send_xml(
+            f'<ver:versions xmlns:ver="{VERSION_NS}">'
+            f'<version uri="{base}" major="v2" minor="31"/></ver:versions>'
+        )
+
+    def list_roles(self, query):
+        names = query.get("name")
+        base = self.base_uri()
+        entries = "".join(
+            f'<role uri="{base}/roles/{role_id}" name={quoteattr(name)}/>'
+            for role_id, name in self.data.roles.items()
+            if not names or name in names
+        )
+        self.send_xml(f'<role:roles xmlns:role="{ROLE_NS}">{entries}</role:roles>')
+
+    def get_role(self, role_id):
+        name = self.data.roles.get(role_id)
+        if name is None:
+            return self.send_not_found()
+        self.send_xml(
+            f'<role:role xmlns:role="{ROLE_NS}" uri="{self.base_uri()}/roles/{role_id}">'
+            f"<name>{escape(name)}</name></role:role>"
+        )
+
+    def list_researchers(self, query):
+        base = self.base_uri()
+        filters = {
+            "first_name": query.get("firstname"),
+            "last_name": query.get("lastname"),
+            "username": query.get("username"),
+        }
+        with self.data.lock:
+            matches = [
+                (researcher_id, researcher)
+                for researcher_id, researcher in self.data.researchers.items()
+                if all(not wanted or researcher[field] in wanted for field, wanted in filters.items())
+            ]
+        entries = "".join(
+            f'<researcher uri="{base}/researchers/{researcher_id}">'
+            f"<first-name>{escape(r['first_name'])}</first-name>"
+            f"<last-name>{escape(r['last_name'])}</last-name></researcher>"
+            for researcher_id, r in matches
+        )
+        self.send_xml(f'<res:researchers xmlns:res="{RESEARCHER_NS}">{entries}</res:researchers>')
+
+    def get_researcher(self, researcher_id):
+        with self.data.lock:
+            researcher = self.data.researchers.get(researcher_id)
+            if researcher is None:
+                return self.send_not_found()
+            body = self.researcher_xml(researcher_id, researcher)
+        self.send_xml(body)
+
+    def put_researcher(self, researcher_id):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            root = ET.fromstring(self.rfile.read(length))
+        except ET.ParseError:
+            return self.send_xml(
+                '<exc:exception xmlns:exc="http://genologics.com/ri/exception">'
+                "<message>Malformed researcher XML</message></exc:exception>",
+                status=400,
+            )
+
+        role_ids = []
+        for role_node in root.iter("role"):
+            role_id = role_node.get("uri", "").rstrip("/").rsplit("/", 1)[-1]
+            if role_id not in self.data.roles:
+                role_id = self.data.role_id_by_name(role_node.get("name"))
+            if role_id and role_id not in role_ids:
+                role_ids.append(role_id)
+
+        with self.data.lock:
+            researcher = self.data.researchers.get(researcher_id)
+            if researcher is None:
+                return self.send_not_found()
+            researcher["roles"] = role_ids
+            body = self.researcher_xml(researcher_id, researcher)
+        self.send_xml(body)
+
+
+class StandInServer(ThreadingHTTPServer):
+    """Threaded HTTP server holding the stand-in data and request limits."""
+
+    daemon_threads = True
+
+    def __init__(self, address, data, latency=0.0, max_concurrent=8, ui_latency=0.0, grid_mode="full"):
+        if grid_mode not in GRID_MODES:
+            raise ValueError(f"grid_mode must be one of {GRID_MODES}, got '{grid_mode}'")
+        super().__init__(address, StandInHandler)
+        self.grid_mode = grid_mode
+        self.data = data
+        self.latency = latency
+        self.ui_latency = ui_latency
+        self.sessions = set()
+        self.request_gate = threading.BoundedSemaphore(max_concurrent)
+        self.stats_lock = threading.Lock()
+        self.request_counts = {}
+
+    @property
+    def api_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/api/v2"
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_standin(user_count=10, latency=0.0, max_concurrent=8, host="127.0.0.1", port=0, ui_latency=0.0,
+                  grid_mode="full"):
+    """
+    Start the stand-in API and web UI on a background thread.
+
+    Args:
+        user_count: Number of researchers to seed (including Emil Test); also the grid size
+        latency: Artificial delay in seconds added to every API request
+        max_concurrent: Requests served at once; extra requests queue
+        host: Interface to bind
+        port: Port to bind (0 picks a free port)
+        ui_latency: Artificial delay in seconds added to every web UI request
+        grid_mode: How the User Management grid renders: 'full' (every row in the DOM),
+                   'virtual' (only visible rows) or 'filter' (virtual, with a filter box)
+
+    Returns:
+        StandInServer: Running server; call shutdown() when done
+    """
+    server = StandInServer((host, port), StandInData(user_count), latency, max_concurrent, ui_latency, grid_mode)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local stand-in Clarity API")
+    parser.add_argument("--users", type=int, default=10, help="Number of researchers to seed")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds of delay per API request")
+    parser.add_argument("--ui-latency", type=float, default=0.2, help="Seconds of delay per web UI request")
+    parser.add_argument("--max-concurrent", type=int, default=8, help="Requests served at once")
+    parser.add_argument("--grid-mode", default="full", choices=GRID_MODES, help="How the user grid renders")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    server = start_standin(args.users, args.latency, args.max_concurrent, port=args.port, ui_latency=args.ui_latency,
+                           grid_mode=args.grid_mode)
+    print(f"Stand-in Clarity API running at {server.api_url}")
+    print(f"Stand-in Clarity UI running at {server.base_url}/clarity/login/auth")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,190 @@
+"""
+Per-server success history for the element-location strategies.
+
+navigate_and_click and select_dropdown_option try several strategies for
+each element. StrategyStats records which strategy succeeded for each
+element on each server and how long it took, so later runs try the
+historically fastest successful strategy first, with a short timeout per
+attempt instead of the full 60 s WebDriverWait.
+
+Usage:
+    python -m clarity_user_test.strategy_stats --server dev  # print the stats
+    python -m clarity_user_test.strategy_stats --server dev --export stats.csv
+
+Stats are keyed by the Clarity base URL, so stand-in and real servers
+never share a history. save() adds the attempts recorded since the last
+save to what is on disk, so several instances for one server (e.g. the
+daemon's browser slots) and other processes all keep their samples.
+"""
+import argparse
+import csv
+import json
+import os
+import threading
+import time
+
+DEFAULT_STATS_PATH = os.path.join(os.path.expanduser("~"), ".clarity_user_test", "strategy_stats.json")
+
+UNKNOWN_TIMEOUT = 10   # Seconds for a strategy with no history
+FAILED_TIMEOUT = 2     # Seconds for a strategy that has only ever failed
+MIN_TIMEOUT = 2
+TIMEOUT_FACTOR = 3     # Allow this many times the mean successful duration
+
+# Serializes the read-merge-write of the stats file between instances in this process
+SAVE_LOCK = threading.Lock()
+
+
+class StrategyStats:
+    """
+    Success history of element strategies for one server.
+
+    Args:
+        server: Server key, the Clarity base URL (e.g. https://clarity-dev.btolims.com)
+        path: JSON file the history is stored in (shared by all servers)
+    """
+
+    def __init__(self, server, path=DEFAULT_STATS_PATH):
+        self.server = server
+        self.path = path
+        self.lock = threading.Lock()
+        self.data = {}
+        self.pending = {}    # Attempts recorded since the last save, same shape as data
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    self.data = json.load(f)
+            except (OSError, ValueError):
+                print(f"  ⚠ Could not read strategy stats from {path}, starting fresh")
+
+    def entry(self, element, strategy, data=None):
+        elements = (self.data if data is None else data).setdefault(self.server, {}).setdefault(element, {})
+        return elements.setdefault(strategy, {"successes": 0, "failures": 0, "success_seconds": 0.0, "last_success": None})
+
+    def record(self, element, strategy, success, seconds):
+        """Record one attempt of a strategy for an element."""
+        with self.lock:
+            for entry in (self.entry(element, strategy), self.entry(element, strategy, self.pending)):
+                if success:
+                    entry["successes"] += 1
+                    entry["success_seconds"] += seconds
+                    entry["last_success"] = time.strftime("%Y-%m-%d %H:%M:%S")
+                else:
+                    entry["failures"] += 1
+
+    def mean_success(self, element, strategy):
+        entry = self.data.get(self.server, {}).get(element, {}).get(strategy)
+        if not entry or not entry["successes"]:
+            return None
+        return entry["success_seconds"] / entry["successes"]
+
+    def order(self, element, strategies, name=lambda s: s[2]):
+        """
+        Order strategies: fastest successful first, then untried, then only-failed ones.
+
+        Args:
+            element: Element key, e.g. the step name
+            strategies: Strategies in their default order
+            name: Function returning a strategy's name (defaults to the description of
+                  an ELEMENT_STRATEGIES tuple)
+
+        Returns:
+            list: The same strategies, reordered
+        """
+        known = self.data.get(self.server, {}).get(element, {})
+
+        def rank(indexed):
+            position, strategy = indexed
+            entry = known.get(name(strategy))
+            if entry and entry["successes"]:
+                return (0, entry["success_seconds"] / entry["successes"], position)
+            if entry and entry["failures"]:
+                return (2, 0, position)
+            return (1, 0, position)
+
+        return [s for _, s in sorted(enumerate(strategies), key=rank)]
+
+    def attempt_timeout(self, element, strategy, default=UNKNOWN_TIMEOUT):
+        """Seconds to wait for one strategy attempt, based on its history."""
+        mean = self.mean_success(element, strategy)
+        if mean is not None:
+            return min(default, max(MIN_TIMEOUT, mean * TIMEOUT_FACTOR))
+        entry = self.data.get(self.server, {}).get(element, {}).get(strategy)
+        if entry and entry["failures"]:
+            return min(default, FAILED_TIMEOUT)
+        return default
+
+    def save(self):
+        """Add the attempts recorded since the last save to the history on disk, and reload it."""
+        with SAVE_LOCK, self.lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            on_disk = {}
+            if os.path.exists(self.path):
+                try:
+                    with open(self.path) as f:
+                        on_disk = json.load(f)
+                except (OSError, ValueError):
+                    pass
+            for element, strategies in self.pending.get(self.server, {}).items():
+                for strategy, new in strategies.items():
+                    entry = self.entry(element, strategy, on_disk)
+                    for key in ("successes", "failures", "success_seconds"):
+                        entry[key] += new[key]
+                    entry["last_success"] = max(entry["last_success"] or "", new["last_success"] or "") or None
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(on_disk, f, indent=2)
+            os.replace(tmp_path, self.path)
+            # Pick up what other slots and processes saved meanwhile
+            self.data[self.server] = on_disk.get(self.server, {})
+            self.pending = {}
+
+    def rows(self):
+        """Flatten the stats for this server into export rows."""
+        rows = []
+        for element, strategies in sorted(self.data.get(self.server, {}).items()):
+            for strategy, entry in strategies.items():
+                attempts = entry["successes"] + entry["failures"]
+                mean = self.mean_success(element, strategy)
+                rows.append({
+                    "server": self.server,
+                    "element": element,
+                    "strategy": strategy,
+                    "successes": entry["successes"],
+                    "failures": entry["failures"],
+                    "success_rate": round(entry["successes"] / attempts, 3) if attempts else 0,
+                    "mean_success_seconds": round(mean, 3) if mean is not None else "",
+                    "last_success": entry["last_success"] or "",
+                })
+        return rows
+
+    def export(self, path):
+        """Export the stats for this server as CSV or JSON (by file extension)."""
+        rows = self.rows()
+        if path.lower().endswith(".json"):
+            with open(path, "w") as f:
+                json.dump(rows, f, indent=2)
+        else:
+            with open(path, "w", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else ["server"])
+                writer.writeheader()
+                writer.writerows(rows)
+        return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show or export element strategy stats")
+    parser.add_argument("--server", default="dev", help="Server name from CLARITY_SERVERS or a base URL")
+    parser.add_argument("--path", default=DEFAULT_STATS_PATH)
+    parser.add_argument("--export", help="Write the stats to a .csv or .json file")
+    args = parser.parse_args()
+
+    from .config import CLARITY_SERVERS, base_url_for
+
+    server = base_url_for(args.server) if args.server in CLARITY_SERVERS else args.server
+    stats = StrategyStats(server, args.path)
+    if args.export:
+        print(f"Exported strategy stats to {stats.export(args.export)}")
+    else:
+        for row in stats.rows():
+            print(f"  {row['element'][:40]:<40} {row['strategy'][:30]:<30} "
+                  f"{row['successes']:>4} ok {row['failures']:>4} failed  {row['mean_success_seconds']}s")
@@ -0,0 +1,252 @@
+"""
+Adaptive wait timeouts learned from observed step latencies.
+
+The UI waits used fixed timeouts (60 s for the user list and element
+waits, 15 s for dropdowns, 5 s for spinners). Those are far too long when
+a step has failed and sometimes too short when a server is slow.
+TimeoutPolicy keeps a latency histogram per server and step and sets each
+wait to a percentile of the observed durations times a margin, clamped
+between a floor and a ceiling:
+
+    timeout = clamp(p95 * 1.5 + 1 s, floor, ceiling)
+
+Until a step has MIN_SAMPLES successful observations its fixed default
+is used. A wait that times out only says the step took longer than its
+timeout, so it is counted separately and kept out of the percentile
+(recording it at its timeout would ratchet the timeout up on every
+failure). When a step times out more often than the percentile allows
+for, its timeout is multiplied by TIMEOUT_GROWTH, once: growth stays
+bounded relative to the successful percentile. Old samples are halved
+once a histogram is full, so the policy follows a server whose speed
+changes.
+
+The policy in effect is per thread (see use_timeout_policy), so runs
+against several servers at once each use their own server's history.
+save() adds the waits recorded since the last save to the histograms on
+disk, so several policies for one server (e.g. the daemon's browser
+slots) and other processes all keep their samples.
+
+Usage:
+    python -m clarity_user_test.timeout_policy --server dev   # print the learned timeouts
+"""
+import argparse
+import bisect
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+DEFAULT_POLICY_PATH = os.path.join(os.path.expanduser("~"), ".clarity_user_test", "timeout_policy.json")
+
+DEFAULT_PERCENTILE = 95
+DEFAULT_MARGIN = 1.5      # Multiplier on the percentile
+DEFAULT_EXTRA = 1.0       # Seconds added on top, for network jitter
+MIN_SAMPLES = 5           # Successful observations needed before the history is trusted
+MAX_SAMPLES = 500         # Histogram size at which old samples are halved
+DEFAULT_FLOOR = 2.0
+DEFAULT_CEILING = 120.0
+TIMEOUT_GROWTH = 2.0      # Multiplier for steps that time out more often than the percentile allows
+
+# Geometric bucket upper bounds from 50 ms to ~5 min
+BUCKETS = [round(0.05 * 1.25 ** i, 3) for i in range(40)]
+
+# Per-step (floor, ceiling) overrides, matched on the start of the step name
+STEP_LIMITS = {
+    "Step 1: Login": (3.0, 60.0),
+    "Step 4: User list": (5.0, 180.0),
+    "Loading indicators gone": (1.0, 30.0),
+    "Load ": (2.0, 30.0),
+    "Open ": (1.0, 15.0),
+    "Select '": (0.5, 10.0),
+}
+
+ACTIVE = threading.local()
+
+# Serializes the read-merge-write of the policy file between instances in this process
+SAVE_LOCK = threading.Lock()
+
+
+class TimeoutPolicy:
+    """
+    Latency histograms and derived timeouts for one server.
+
+    Args:
+        server: Server key, the Clarity base URL
+        path: JSON file the histograms are stored in (shared by all servers)
+        percentile: Percentile of observed durations the timeout is based on
+        margin: Multiplier applied to the percentile
+        extra: Seconds added after the margin
+    """
+
+    def __init__(self, server, path=DEFAULT_POLICY_PATH, percentile=DEFAULT_PERCENTILE,
+                 margin=DEFAULT_MARGIN, extra=DEFAULT_EXTRA):
+        self.server = server
+        self.path = path
+        self.percentile = percentile
+        self.margin = margin
+        self.extra = extra
+        self.lock = threading.Lock()
+        self.data = {}
+        self.pending = {}    # Waits recorded since the last save, same shape as data
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    self.data = json.load(f)
+            except (OSError, ValueError):
+                print(f"  ⚠ Could not read timeout history from {path}, starting fresh")
+
+    def histogram(self, step, data=None):
+        steps = (self.data if data is None else data).setdefault(self.server, {})
+        return steps.setdefault(step, {"counts": [0] * (len(BUCKETS) + 1), "timeouts": 0})
+
+    def record(self, step, seconds, met=True):
+        """Record how long a wait took; a timed-out wait is only counted, not added to the histogram."""
+        with self.lock:
+            for hist in (self.histogram(step), self.histogram(step, self.pending)):
+                if met:
+                    hist["counts"][bisect.bisect_left(BUCKETS, seconds)] += 1
+                else:
+                    hist["timeouts"] += 1
+            halve_if_full(self.histogram(step))
+
+    def observed(self, step, percentile=None):
+        """Percentile of the successful durations (bucket upper bound), or None with too few samples."""
+        hist = self.data.get(self.server, {}).get(step)
+        total = sum(hist["counts"]) if hist else 0
+        if total < MIN_SAMPLES:
+            return None
+        rank = total * (percentile or self.percentile) / 100
+        seen = 0
+        for bucket, count in enumerate(hist["counts"]):
+            seen += count
+            if seen >= rank:
+                return BUCKETS[min(bucket, len(BUCKETS) - 1)]
+        return BUCKETS[-1]
+
+    def timeout_share(self, step):
+        """Fraction of the step's recorded waits that timed out."""
+        hist = self.data.get(self.server, {}).get(step)
+        total = sum(hist["counts"]) + hist["timeouts"] if hist else 0
+        return hist["timeouts"] / total if total else 0.0
+
+    def limits(self, step):
+        for prefix, limits in STEP_LIMITS.items():
+            if step.startswith(prefix):
+                return limits
+        return DEFAULT_FLOOR, DEFAULT_CEILING
+
+    def timeout(self, step, default):
+        """
+        Seconds to wait for a step.
+
+        Args:
+            step: Step name (the same name the wait is recorded under)
+            default: Fixed timeout used until the step has enough history
+
+        Returns:
+            float: The learned timeout, or the default clamped to the step's ceiling
+        """
+        floor, ceiling = self.limits(step)
+        observed = self.observed(step)
+        if observed is None:
+            return min(default, ceiling)
+        timeout = observed * self.margin + self.extra
+        if self.timeout_share(step) > (100 - self.percentile) / 100:
+            timeout *= TIMEOUT_GROWTH
+        return round(min(ceiling, max(floor, timeout)), 2)
+
+    def save(self):
+        """Add the waits recorded since the last save to the histograms on disk, and reload them."""
+        with SAVE_LOCK, self.lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            on_disk = {}
+            if os.path.exists(self.path):
+                try:
+                    with open(self.path) as f:
+                        on_disk = json.load(f)
+                except (OSError, ValueError):
+                    pass
+            for step, new in self.pending.get(self.server, {}).items():
+                hist = self.histogram(step, on_disk)
+                hist["counts"] = [a + b for a, b in zip(hist["counts"], new["counts"])]
+                hist["timeouts"] += new["timeouts"]
+                halve_if_full(hist)
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(on_disk, f)
+            os.replace(tmp_path, self.path)
+            # Pick up what other slots and processes saved meanwhile
+            self.data[self.server] = on_disk.get(self.server, {})
+            self.pending = {}
+
+    def rows(self):
+        """Per step: samples, timeouts, p50, the policy percentile and the current timeout."""
+        rows = []
+        for step, hist in sorted(self.data.get(self.server, {}).items()):
+            rows.append({
+                "step": step,
+                "samples": sum(hist["counts"]),
+                "timeouts": hist["timeouts"],
+                "p50": self.observed(step, 50),
+                "percentile": self.observed(step),
+                "timeout": self.timeout(step, DEFAULT_CEILING) if self.observed(step) else None,
+            })
+        return rows
+
+
+def halve_if_full(hist):
+    """Halve a histogram's counts once it holds more than MAX_SAMPLES waits."""
+    if sum(hist["counts"]) + hist["timeouts"] > MAX_SAMPLES:
+        hist["counts"] = [c // 2 for c in hist["counts"]]
+        hist["timeouts"] //= 2
+
+
+def current_timeout_policy():
+    """The TimeoutPolicy active in this thread, or None."""
+    return getattr(ACTIVE, "policy", None)
+
+
+@contextmanager
+def use_timeout_policy(policy):
+    """Make policy the active timeout policy for the waits in this thread."""
+    previous = current_timeout_policy()
+    ACTIVE.policy = policy
+    try:
+        yield policy
+    finally:
+        ACTIVE.policy = previous
+
+
+def adaptive_timeout(step, default):
+    """The active policy's timeout for a step, or the default when no policy is active."""
+    policy = current_timeout_policy()
+    return policy.timeout(step, default) if policy else default
+
+
+def record_wait(step, seconds, met=True):
+    """Record a wait with the active policy, if any."""
+    policy = current_timeout_policy()
+    if policy:
+        policy.record(step, seconds, met)
+
+
+if __name__ == "__main__":
+    from .config import CLARITY_SERVERS, base_url_for
+
+    parser = argparse.ArgumentParser(description="Show the timeouts learned for a server")
+    parser.add_argument("--server", default="dev", help=f"One of {sorted(CLARITY_SERVERS)} or a base URL")
+    parser.add_argument("--percentile", type=float, default=DEFAULT_PERCENTILE)
+    args = parser.parse_args()
+
+    base_url = base_url_for(args.server) if args.server in CLARITY_SERVERS else args.server
+    policy = TimeoutPolicy(base_url, percentile=args.percentile)
+    rows = policy.rows()
+    if not rows:
+        print(f"No timing history for {base_url}")
+    else:
+        print(f"Learned timeouts for {base_url} (p{args.percentile:g} x {policy.margin} + {policy.extra}s):")
+        print(f"  {'Step':<40} {'Samples':>7} {'T/O':>4} {'p50':>7} {f'p{args.percentile:g}':>7} {'Timeout':>8}")
+        for r in rows:
+            fmt = lambda v: f"{v:.2f}" if v is not None else "-"
+            print(f"  {r['step'][:40]:<40} {r['samples']:>7} {r['timeouts']:>4} "
+                  f"{fmt(r['p50']):>7} {fmt(r['percentile']):>7} {fmt(r['timeout']):>8}")
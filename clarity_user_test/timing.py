@@ -0,0 +1,67 @@
+"""
+Monotonic timing spans for the phases of a test run.
+
+Each phase (API connect, role lookup, login, grid load, ...) is wrapped in
+a span. Spans record their start offset from the beginning of the run and
+their duration, so a report can show both a table and a waterfall of where
+the time went.
+
+Usage:
+    timer = StepTimer()
+    with timer.span("login"):
+        login(...)
+    test_results["timings"] = timer.as_list()
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StepTimer:
+    """Collects named timing spans relative to the start of a run."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.spans = []
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def span(self, step):
+        """Time the enclosed block as one step; failed steps are recorded with ok=False."""
+        start = time.monotonic()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self.add(step, start, time.monotonic() - start, ok)
+
+    def add(self, step, start, seconds, ok=True):
+        """Record a span measured elsewhere (start is a time.monotonic() value)."""
+        with self.lock:
+            self.spans.append({
+                "step": step,
+                "start": round(start - self.started, 3),
+                "seconds": round(seconds, 3),
+                "ok": ok,
+            })
+
+    def total(self):
+        """Seconds from the start of the run to the end of the last span."""
+        with self.lock:
+            return max((s["start"] + s["seconds"] for s in self.spans), default=0.0)
+
+    def as_list(self):
+        with self.lock:
+            return [dict(s) for s in self.spans]
+
+    def print_summary(self):
+        spans = self.as_list()
+        if not spans:
+            return
+        print("\n  Step timings:")
+        for s in spans:
+            status = "✓" if s["ok"] else "✗"
+            start = f"+{s['start']:.2f}s"
+            print(f"    {s['step'][:30]:<30} {start:>9} {s['seconds']:8.2f}s  {status}")
+        print(f"    {'Total':<30} {'':>9} {self.total():8.2f}s")
@@ -0,0 +1,485 @@
+"""
+Reusable Selenium steps for the Clarity user tests.
+
+Login, navigation to User Management, waiting for the user list and the
+user search strategies, shared by the user test runner and the role matrix runner.
+"""
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+import time
+
+from .grid_index import GridIndex
+from .grid_search import find_user_in_grid
+from .session_cache import restore_session, save_session, session_is_valid
+from .timeout_policy import adaptive_timeout, record_wait
+from .ui_waits import (
+    wait_for, page_settled, listbox_open, listbox_closed, url_contains, url_excludes,
+    element_present, any_of, spinner_gone, probe_user_list, element_wait, until_recorded,
+    ELEMENT_WAIT_STEP
+)
+
+
+def navigate_and_click(driver, wait, element_name, strategies, fallback_url=None, wait_after=2,
+                       until=None, wait_timeout=15, stats=None):
+    """
+    Try multiple strategies to find and click an element.
+    
+    Args:
+        driver: Selenium WebDriver instance
+        wait: WebDriverWait instance (see ui_waits.element_wait), used for the attempts without stats
+        element_name: Description of element for logging
+        strategies: List of tuples (selector_type, selector_value, description)
+        fallback_url: Optional URL to navigate to if all strategies fail
+        wait_after: Seconds the step used to sleep after the action (reported as its budget)
+        until: Condition that marks the step as complete (defaults to page_settled())
+        wait_timeout: Maximum seconds to wait for the condition
+        stats: Optional StrategyStats; tries the historically fastest strategy first
+               with a short per-attempt timeout and records every attempt. Each
+               attempt's timeout is also learned by the active TimeoutPolicy
+       
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    print(f"\n{element_name}:")
+
+    if stats:
+        # The direct URL competes with the click strategies once it has a history
+        if fallback_url:
+            strategies = list(strategies) + [("URL", fallback_url, "direct URL")]
+        strategies = stats.order(element_name, strategies)
+    
+    for selector_type, selector_value, description in strategies:
+        attempt_start = time.monotonic()
+        try:
+            print(f"  Trying: {description}...")
+            if stats:
+                attempt_step = f"{element_name} via {description}"
+                attempt_wait = element_wait(driver, attempt_step, stats.attempt_timeout(element_name, description))
+            else:
+                attempt_step, attempt_wait = ELEMENT_WAIT_STEP, wait
+
+            if selector_type == "URL":
+                driver.get(selector_value)
+                print("  ✓ Direct navigation completed!")
+                met = wait_for(driver, until or page_settled(), element_name, wait_timeout, wait_after)
+                stats.record(element_name, description, met, time.monotonic() - attempt_start)
+                return True
+            
+            if selector_type == "CSS":
+                locator = (By.CSS_SELECTOR, selector_value)
+            elif selector_type == "XPATH":
+                locator = (By.XPATH, selector_value)
+            elif selector_type == "ID":
+                locator = (By.ID, selector_value)
+            else:
+                continue
+            element = until_recorded(attempt_wait, EC.element_to_be_clickable(locator), attempt_step)
+            
+            # Try regular click first, then JavaScript click if needed
+            try:
+                element.click()
+                print("Selenium Click")
+            except:
+                driver.execute_script("arguments[0].click();", element)
+                print("Javascript Click")
+            
+            print(f"  ✓ Success using {description}!")
+            met = wait_for(driver, until or page_settled(), element_name, wait_timeout, wait_after)
+            if stats:
+                stats.record(element_name, description, met, time.monotonic() - attempt_start)
+            return True
+            
+        except Exception as e:
+            if stats:
+                stats.record(element_name, description, False, time.monotonic() - attempt_start)
+            print(f"  ✗ Failed: {str(e)[:50]}...")
+    
+    # If all strategies failed and we have a fallback URL
+    if fallback_url and not stats:
+        print("  → All methods failed. Navigating directly to URL...")
+        driver.get(fallback_url)
+        print("  ✓ Direct navigation completed!")
+        wait_for(driver, until or page_settled(), element_name, wait_timeout, wait_after)
+        return True
+    
+    print(f"  ✗ Could not complete action for {element_name}")
+    return False
+
+def select_dropdown_option(driver, wait, dropdown_id, option_text, wait_for_load=15, stats=None):
+    """
+    Select an option from a React dropdown/multiselect widget.
+    
+    Args:
+        driver: Selenium WebDriver instance
+        wait: WebDriverWait instance (see ui_waits.element_wait), used for the attempts without stats
+        dropdown_id: ID of the dropdown element
+        option_text: Text of the option to select
+        wait_for_load: Seconds to wait for dropdown to load (default 15; replaced by the
+                       learned timeout when a TimeoutPolicy is active)
+        stats: Optional StrategyStats; tries the historically fastest option strategy
+               first with a short per-attempt timeout and records every attempt. Each
+               attempt's timeout is also learned by the active TimeoutPolicy
+    
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    print(f"  Selecting '{option_text}' from {dropdown_id}...")
+    
+    try:
+        # Wait longer for dropdowns to fully load
+        load_step = f"Load {dropdown_id}"
+        long_wait = element_wait(driver, load_step, wait_for_load)
+        
+        # Find and click the main dropdown container to open it
+        dropdown = until_recorded(long_wait, EC.element_to_be_clickable((By.ID, dropdown_id)), load_step)
+        
+        # Scroll element into view
+        driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", dropdown)
+        
+        # Click to open dropdown - try regular click first, then JavaScript
+        try:
+            dropdown.click()
+        except:
+            driver.execute_script("arguments[0].click();", dropdown)
+        
+        # Wait for dropdown options to be visible
+        wait_for(driver, listbox_open(dropdown_id), f"Open {dropdown_id}", timeout=5, budget=1.5)
+
+        def click_located(locator):
+            def attempt(attempt_wait, attempt_step):
+                option = until_recorded(attempt_wait, EC.element_to_be_clickable(locator), attempt_step)
+                driver.execute_script("arguments[0].click();", option)
+            return attempt
+
+        def click_matching_option(attempt_wait, attempt_step):
+            # Iterate through all options looking for the text
+            all_options = driver.find_elements(By.CSS_SELECTOR, f"#{dropdown_id}__listbox li[role='option']")
+            for option in all_options:
+                if option_text.lower() in option.text.lower():
+                    driver.execute_script("arguments[0].click();", option)
+                    return
+            raise LookupError(f"No option containing '{option_text}'")
+
+        def click_by_position(attempt_wait, attempt_step):
+            # Last resort: click by option position if we know the exact text
+            if option_text not in OPTION_POSITIONS:
+                raise LookupError(f"No known position for '{option_text}'")
+            # Click the dropdown again to ensure it's open
+            dropdown.click()
+            wait_for(driver, listbox_open(dropdown_id), f"Reopen {dropdown_id}", timeout=5, budget=0.5)
+            option_element = driver.find_element(
+                By.CSS_SELECTOR, 
+                f"#{dropdown_id}__listbox__option__{OPTION_POSITIONS[option_text]}"
+            )
+            driver.execute_script("arguments[0].click();", option_element)
+
+        # Strategies to find and click the option, text-based ones first
+        strategies = [
+            # Strategy 1: Direct text match in listbox
+            ("listbox exact text", click_located((By.XPATH, f"//ul[@id='{dropdown_id}__listbox']//li[text()='{option_text}']"))),
+            # Strategy 2: Contains text (in case of extra whitespace)
+            ("listbox contains text", click_located((By.XPATH, f"//ul[@id='{dropdown_id}__listbox']//li[contains(text(), '{option_text}')]"))),
+            # Strategy 3: Any visible li with matching text
+            ("any option contains text", click_located((By.XPATH, f"//li[@role='option' and contains(text(), '{option_text}')]"))),
+            # Strategy 4: Iterate through all options
+            ("scan listbox options", click_matching_option),
+            # Strategy 5: Known option position
+            ("known option position", click_by_position),
+        ]
+
+        stats_key = f"{dropdown_id}: {option_text}"
+        if stats:
+            strategies = stats.order(stats_key, strategies, name=lambda s: s[0])
+        
+        option_clicked = False
+        for description, attempt in strategies:
+            attempt_start = time.monotonic()
+            try:
+                if stats:
+                    attempt_step = f"{stats_key} via {description}"
+                    attempt_wait = element_wait(driver, attempt_step, stats.attempt_timeout(stats_key, description))
+                else:
+                    attempt_step, attempt_wait = ELEMENT_WAIT_STEP, wait
+                attempt(attempt_wait, attempt_step)
+                option_clicked = True
+                print(f"    ✓ Selected '{option_text}' using {description}!")
+            except Exception:
+                pass
+            if stats:
+                stats.record(stats_key, description, option_clicked, time.monotonic() - attempt_start)
+            if option_clicked:
+                break
+        
+        # Wait for the listbox to close after selection
+        if option_clicked:
+            wait_for(driver, listbox_closed(dropdown_id), f"Select '{option_text}'", timeout=1, budget=1)
+        
+        if option_clicked:
+            return True
+        else:
+            print(f"    ✗ Could not select '{option_text}' from {dropdown_id}")
+            return False
+            
+    except Exception as e:
+        print(f"    ✗ Error selecting dropdown option: {str(e)[:100]}...")
+        return False
+
+
+# Timeout policy key of the user list wait
+USER_LIST_STEP = "Step 4: User list"
+
+# For known dropdown options, their position in the listbox
+OPTION_POSITIONS = {
+    "Administrative Lab": 0,
+    "Editor": 2,
+    "Collaborator": 1,
+    # Add more mappings as needed
+}
+
+# Element strategies definition
+ELEMENT_STRATEGIES = {
+    "configuration": [
+        ("CSS", "#navbar-menu-ul > li:nth-child(4) > a", "navbar CSS selector"),
+        ("XPATH", "//a[@href='/clarity/configuration']", "href XPath"),
+        ("XPATH", "//a[text()='Configuration']", "text XPath")
+    ],
+    "user_management": [
+        # ("CSS", "#configuration-app-container .tab-panel-header > div:nth-child(4)", "4th tab CSS"),
+        ("XPATH", "//div[contains(@class, 'tab-title') and contains(text(), 'USER MANAGEMENT')]", "text XPath"),
+        ("XPATH", "//div[contains(@class, 'tab') and contains(., 'USER')]", "partial text XPath")
+    ]
+}
+
+
+def fallback_urls(base_url):
+    """Direct URLs used when clicking through the navigation fails."""
+    return {
+        "configuration": f"{base_url}/clarity/configuration",
+        "user_management": f"{base_url}/clarity/configuration/user-management/users",
+    }
+
+
+def login(driver, base_url, username, password, reuse_session=False):
+    """
+    Log in through the Clarity login form.
+
+    Args:
+        driver: Selenium WebDriver instance
+        base_url: Clarity base URL, e.g. https://clarity-dev.btolims.com
+        username: Clarity username
+        password: Clarity password
+        reuse_session: Try a saved session first and save the session after a full login
+    """
+    print("\nStep 1: Login")
+    if reuse_session:
+        # A warm browser (see daemon) is often still logged in from the previous run
+        if driver.current_url.startswith(base_url) and session_is_valid(driver, base_url):
+            print("  ✓ Already logged in, skipping login form")
+            return
+        if restore_session(driver, base_url, username):
+            print("  ✓ Reused saved session, skipping login form")
+            return
+        print("  No valid saved session, logging in...")
+
+    driver.get(f"{base_url}/clarity/login/auth?unauthenticated=1")
+
+    driver.find_element(By.ID, "username").send_keys(username)
+    driver.find_element(By.ID, "password").send_keys(password)
+    driver.find_element(By.ID, "sign-in").click()
+
+    print("  ✓ Login submitted, waiting for page load...")
+    logged_in = wait_for(driver, url_excludes("/login"), "Step 1: Login", timeout=15, budget=3)
+
+    if reuse_session and logged_in:
+        save_session(driver, base_url, username)
+
+
+def open_user_management(driver, wait, base_url, stats=None):
+    """Navigate to Configuration and click the User Management tab (see navigate_and_click for stats)."""
+    urls = fallback_urls(base_url)
+    # Navigate to Configuration
+    navigate_and_click(
+        driver, wait,
+        "Step 2: Navigate to Configuration",
+        ELEMENT_STRATEGIES["configuration"],
+        urls["configuration"],
+        wait_after=3,
+        until=url_contains("/configuration"),
+        stats=stats
+    )
+
+    # Click User Management tab
+    navigate_and_click(
+        driver, wait,
+        "Step 3: Click User Management Tab",
+        ELEMENT_STRATEGIES["user_management"],
+        urls["user_management"],
+        wait_after=5,
+        until=any_of(url_contains("user-management"), element_present(By.CSS_SELECTOR, ".g-col-value")),
+        stats=stats
+    )
+
+
+def wait_for_user_list(driver, max_wait_time=60, stable_ms=300, poll=0.25):
+    """
+    Wait for the User Management user list to load.
+
+    Args:
+        driver: Selenium WebDriver instance
+        max_wait_time: Seconds to wait for the grid before proceeding anyway (replaced by
+                       the learned timeout when a TimeoutPolicy is active)
+        stable_ms: Milliseconds without DOM changes before the list counts as loaded
+        poll: Seconds between readiness probes
+
+    Returns:
+        bool: True if the user list was detected, False on timeout
+    """
+    print("\nStep 4: Wait for User List to Load")
+
+    # DON'T refresh - we just navigated here!
+    # driver.refresh()  # REMOVED - this was causing the problem
+
+    # Smart wait for user list to load
+    print("  Waiting for user list to load...")
+    start_time = time.time()
+    page_loaded = False
+    probe = None
+    last_status = 0
+    grid_reported = False
+
+    # One probe call per poll returns every indicator plus a "DOM stable" flag
+    max_wait_time = adaptive_timeout(USER_LIST_STEP, max_wait_time)
+    while not page_loaded and (time.time() - start_time) < max_wait_time:
+        try:
+            probe = probe_user_list(driver, stable_ms)
+            counts = probe["counts"]
+            elapsed = round(time.time() - start_time, 1)
+
+            # Check if we have the main indicators
+            if counts["value_elements"] and probe["stable"]:
+                page_loaded = True
+                print(f"  ✓ Page loaded successfully in {elapsed} seconds")
+                print(f"    - Found {counts['value_elements']} .g-col-value elements")
+            elif (counts["any_users"] or counts["user_rows"]) and probe["stable"]:
+                # Found users in a different format
+                page_loaded = True
+                print(f"  ✓ User list loaded (alternative format) in {elapsed} seconds")
+                if counts["user_rows"]:
+                    print(f"    - Found {counts['user_rows']} user rows")
+            else:
+                if counts["grid_container"] and counts["any_table_or_grid"] and not grid_reported:
+                    # Grid structure is there but might still be loading data
+                    print("  ⏳ Grid structure found, waiting for data...")
+                    grid_reported = True
+                elif elapsed - last_status >= 5:
+                    # Debug: Show what we're actually seeing
+                    last_status = elapsed
+                    print(f"  ⏳ Still waiting... ({elapsed}s elapsed, DOM stable for {probe['stable_ms']} ms)")
+                    print(f"    Debug - Found elements: {[k for k, v in counts.items() if v]}")
+                time.sleep(poll)
+
+        except Exception as e:
+            print(f"  ⚠ Error during wait: {str(e)[:50]}...")
+            time.sleep(poll)
+
+    record_wait(USER_LIST_STEP, time.time() - start_time, page_loaded)
+
+    # Check if we timed out
+    if not page_loaded:
+        elapsed = round(time.time() - start_time, 1)
+        print(f"  ⚠ Page load timeout after {elapsed} seconds. Proceeding anyway...")
+
+    # Additional smart wait: Wait for any loading spinners to disappear
+    if probe and probe["counts"]["spinners"] == 0:
+        print("  ✓ No loading indicators detected")
+    elif wait_for(driver, spinner_gone(), "Loading indicators gone", timeout=5, budget=1):
+        print("  ✓ No loading indicators detected")
+
+    return page_loaded
+
+
+def search_user(driver, form_fields, return_row=False):
+    """
+    Search the User Management grid for a user with multiple strategies.
+
+    Args:
+        driver: Selenium WebDriver instance
+        form_fields: Dict with firstName, lastName and optionally username/email
+        return_row: Also return the user's grid row (for comparing with the API)
+
+    Returns:
+        tuple: (user_found, found_details), plus the grid row dict or None if return_row.
+               user_found is None when the scan stopped before the end of the list
+               (found_details then says why)
+    """
+    print("\n" + "-"*50)
+    print("STARTING USER SEARCH")
+    print("-"*50)
+
+    # Dynamically construct the search name from form fields
+    search_name = f"{form_fields.get('firstName', '')} {form_fields.get('lastName', '')}"
+    print(f"  Search target: '{search_name}'")
+    print(f"  Current URL: {driver.current_url}")
+    print(f"  Page title: {driver.title}")
+
+    # Check if we're on the right page
+    if "user" not in driver.current_url.lower():
+        print("  ⚠ WARNING: URL doesn't contain 'user' - might not be on user management page")
+
+    # Filter, or scroll window by window, and stop at the first match
+    print("\n  Searching the grid...")
+    try:
+        result = find_user_in_grid(driver, form_fields)
+    except Exception as e:
+        print(f"  ⚠ Error reading grid: {str(e)[:100]}...")
+        result = {"found": False, "details": "", "strategy": None, "method": None,
+                  "grid": GridIndex({}), "windows": 0, "values": 0, "seconds": 0}
+    grid = result["grid"]
+    counts = grid.snapshot.get("counts", {})
+
+    print(f"  Grid containers: {counts.get('grid_containers', 0)}")
+    print(f"  Value elements: {len(grid)} in the last window "
+          f"({result['values']} read in {result['windows']} windows via {result['method']}, {result['seconds']}s)")
+
+    if result["values"] == 0:
+        print("  ⚠ No .g-col-value elements found. Checking alternative selectors...")
+        print(f"  Total span elements on page: {counts.get('spans', 0)}")
+        print(f"  Tables found: {counts.get('tables', 0)}")
+        print(f"  Divs with grid/table role: {counts.get('grid_roles', 0)}")
+
+    # Search for the user with multiple strategies
+    print("\n" + "-"*50)
+    print("EXECUTING SEARCH STRATEGIES")
+    print("-"*50)
+
+    # Show first few elements for debugging
+    for i, text in enumerate(grid.values.texts[:5]):
+        if text:  # Only show non-empty elements
+            print(f"    Element {i}: '{text[:50]}...' " if len(text) > 50 else f"    Element {i}: '{text}'")
+
+    user_found, found_details, strategy = result["found"], result["details"], result["strategy"]
+    if user_found:
+        print(f"  ✓ Strategy {strategy}: {found_details}")
+    elif result.get("inconclusive"):
+        user_found = None
+        print(f"  ⚠ No match in {result['values']} grid values, but the scan did not reach the end of the list")
+    else:
+        print(f"  ✗ No match in {result['values']} grid values across {result['windows']} windows")
+
+    # Print final result
+    print("\n" + "="*50)
+    if user_found:
+        print(f"✓ SUCCESS: User '{search_name}' FOUND in the user list!")
+        print(f"  Details: {found_details}")
+    elif user_found is None:
+        print(f"⚠ INCONCLUSIVE: User '{search_name}' was not found, but not the whole list was searched")
+        print(f"  Details: {found_details}")
+    else:
+        print(f"✗ NOT FOUND: User '{search_name}' was not found in the user list")
+        print(f"  Searched for: Name='{search_name}', Username='{form_fields.get('username', '')}', Email='{form_fields.get('email', '')}'")
+    print("="*50)
+
+    if return_row:
+        row = grid.row_for(search_name, form_fields.get('username', ''), form_fields.get('email', ''))
+        return user_found, found_details, row
+    return user_found, found_details
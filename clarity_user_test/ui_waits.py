@@ -0,0 +1,285 @@
+"""
+Condition-driven waits for the Clarity UI steps.
+
+Each step waits for a completion condition (URL change, element present,
+spinner gone, React listbox open, ...) with short polling and an overall
+timeout, instead of sleeping a fixed number of seconds. Every wait is
+recorded in a WaitReport so a run can show how long each step actually
+waited compared with the fixed sleep it replaced. The report in effect is
+per thread (see use_wait_report), so runs on several threads at once each
+keep their own.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+from selenium.common.exceptions import StaleElementReferenceException, TimeoutException, WebDriverException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+
+from .timeout_policy import adaptive_timeout, record_wait
+
+DEFAULT_POLL = 0.1
+ELEMENT_TIMEOUT = 60             # Default for element waits (clickable links, tabs, options)
+ELEMENT_WAIT_STEP = "Element wait"  # Timeout policy key of the shared element wait
+SPINNER_SELECTOR = ".loading, .spinner, .loader, [class*='loading'], [class*='spinner']"
+
+
+# ------------------------
+# Conditions
+# ------------------------
+
+def url_changes(old_url):
+    """The browser has navigated away from old_url."""
+    return lambda driver: driver.current_url != old_url
+
+
+def url_contains(fragment):
+    """The current URL contains fragment."""
+    return lambda driver: fragment in driver.current_url
+
+
+def url_excludes(fragment):
+    """The current URL no longer contains fragment (e.g. left the login page)."""
+    return lambda driver: fragment not in driver.current_url
+
+
+def element_present(by, value):
+    """At least one element matches the locator."""
+    return lambda driver: len(driver.find_elements(by, value)) > 0
+
+
+def spinner_gone(selector=SPINNER_SELECTOR):
+    """No loading indicator is present."""
+    return lambda driver: len(driver.find_elements(By.CSS_SELECTOR, selector)) == 0
+
+
+def document_ready():
+    """document.readyState is complete."""
+    return lambda driver: driver.execute_script("return document.readyState") == "complete"
+
+
+def page_settled(selector=SPINNER_SELECTOR):
+    """Document loaded and no loading indicator visible, checked in one script call."""
+    script = (
+        "return document.readyState === 'complete' && "
+        "document.querySelector(arguments[0]) === null;"
+    )
+    return lambda driver: driver.execute_script(script, selector)
+
+
+def listbox_open(dropdown_id):
+    """The React listbox for dropdown_id is rendered with at least one visible option."""
+    def condition(driver):
+        options = driver.find_elements(By.CSS_SELECTOR, f"#{dropdown_id}__listbox li[role='option']")
+        return any(option.is_displayed() for option in options)
+    return condition
+
+
+def listbox_closed(dropdown_id):
+    """The React listbox for dropdown_id is gone or hidden."""
+    is_open = listbox_open(dropdown_id)
+    return lambda driver: not is_open(driver)
+
+
+def any_of(*conditions):
+    """Any of the conditions holds."""
+    return lambda driver: any(condition(driver) for condition in conditions)
+
+
+def all_of(*conditions):
+    """All of the conditions hold."""
+    return lambda driver: all(condition(driver) for condition in conditions)
+
+
+# ------------------------
+# User list readiness probe
+# ------------------------
+
+# Counts every user-list indicator in one call. A MutationObserver installed
+# on the first call records when the DOM last changed, so the probe can also
+# report how long the page has been stable.
+USER_LIST_PROBE_SCRIPT = """
+const stableFor = arguments[0];
+if (!window.__userListProbe) {
+    window.__userListProbe = {lastMutation: performance.now()};
+    new MutationObserver(() => { window.__userListProbe.lastMutation = performance.now(); })
+        .observe(document.documentElement, {childList: true, subtree: true, characterData: true});
+}
+
+let emailNodes = 0;
+const walker = document.createTreeWalker(document.body || document.documentElement, NodeFilter.SHOW_TEXT);
+const seen = new Set();
+while (walker.nextNode()) {
+    const parent = walker.currentNode.parentElement;
+    if (parent && !seen.has(parent) && walker.currentNode.textContent.includes("@")) {
+        seen.add(parent);
+        emailNodes++;
+    }
+}
+const tabs = document.evaluate("//div[contains(text(), 'USER MANAGEMENT')]", document, null,
+                               XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null).snapshotLength;
+const stableMs = performance.now() - window.__userListProbe.lastMutation;
+
+return {
+    ready_state: document.readyState,
+    stable_ms: Math.round(stableMs),
+    stable: document.readyState === "complete" && stableMs >= stableFor,
+    counts: {
+        grid_container: document.getElementsByClassName("g-col-grid-bar-lg").length,
+        value_elements: document.querySelectorAll(".g-col-value").length,
+        user_management_tab: tabs,
+        any_table_or_grid: document.querySelectorAll("div[role='grid'], div[role='table'], table").length,
+        user_rows: document.querySelectorAll("tr, div[role='row']").length,
+        any_users: emailNodes,
+        spinners: document.querySelectorAll(arguments[1]).length
+    }
+};
+"""
+
+
+def probe_user_list(driver, stable_ms=300, spinner_selector=SPINNER_SELECTOR):
+    """
+    Read every user-list readiness indicator in one execute_script call.
+
+    Args:
+        driver: Selenium WebDriver instance
+        stable_ms: Milliseconds without DOM mutations before the page counts as stable
+        spinner_selector: CSS selector for loading indicators
+
+    Returns:
+        dict: ready_state, stable_ms, stable flag and per-indicator counts
+    """
+    return driver.execute_script(USER_LIST_PROBE_SCRIPT, stable_ms, spinner_selector)
+
+
+# ------------------------
+# Waiting and reporting
+# ------------------------
+
+class WaitReport:
+    """Collects how long each step waited versus its old fixed sleep budget."""
+
+    def __init__(self):
+        self.entries = []
+        self.lock = threading.Lock()
+
+    def record(self, step, waited, budget, met):
+        with self.lock:
+            self.entries.append({"step": step, "waited": waited, "budget": budget, "met": met})
+
+    def totals(self):
+        """Return (seconds waited, seconds of old fixed budget)."""
+        with self.lock:
+            return (
+                sum(e["waited"] for e in self.entries),
+                sum(e["budget"] for e in self.entries),
+            )
+
+    def print_summary(self):
+        with self.lock:
+            entries = list(self.entries)
+        if not entries:
+            return
+        print("\n  Wait summary (actual vs old fixed sleep):")
+        for e in entries:
+            status = "✓" if e["met"] else "⚠ timeout"
+            print(f"    {e['step'][:45]:<45} {e['waited']:6.2f}s / {e['budget']:4.1f}s  {status}")
+        waited, budget = self.totals()
+        print(f"    {'Total':<45} {waited:6.2f}s / {budget:4.1f}s  (saved {budget - waited:.1f}s)")
+
+    def clear(self):
+        with self.lock:
+            self.entries = []
+
+
+# Report used by waits outside use_wait_report
+WAIT_REPORT = WaitReport()
+
+ACTIVE_REPORT = threading.local()
+
+
+def current_wait_report():
+    """The WaitReport active in this thread, or WAIT_REPORT."""
+    return getattr(ACTIVE_REPORT, "report", None) or WAIT_REPORT
+
+
+@contextmanager
+def use_wait_report(report):
+    """Record the waits in this thread into report."""
+    previous = getattr(ACTIVE_REPORT, "report", None)
+    ACTIVE_REPORT.report = report
+    try:
+        yield report
+    finally:
+        ACTIVE_REPORT.report = previous
+
+
+def wait_for(driver, condition, step, timeout=10, budget=0, poll=DEFAULT_POLL, report=None):
+    """
+    Poll a condition until it holds or the timeout expires.
+
+    Args:
+        driver: Selenium WebDriver instance
+        condition: Callable taking the driver and returning a truthy value when done
+        step: Step name for the wait report
+        timeout: Maximum seconds to wait (replaced by the learned timeout when a
+                 TimeoutPolicy is active, see timeout_policy)
+        budget: Seconds the old fixed sleep used for this step (for reporting)
+        poll: Seconds between condition checks
+        report: WaitReport to record into (defaults to the thread's active report)
+
+    Returns:
+        bool: True if the condition was met, False on timeout
+    """
+    timeout = adaptive_timeout(step, timeout)
+    start = time.monotonic()
+    met = True
+    try:
+        WebDriverWait(
+            driver, timeout, poll_frequency=poll,
+            ignored_exceptions=(StaleElementReferenceException, WebDriverException)
+        ).until(condition)
+    except TimeoutException:
+        met = False
+    waited = time.monotonic() - start
+    record_wait(step, waited, met)
+    (report or current_wait_report()).record(step, round(waited, 2), budget, met)
+    return met
+
+
+def element_wait(driver, step=ELEMENT_WAIT_STEP, default=ELEMENT_TIMEOUT):
+    """
+    WebDriverWait with the timeout learned for step (see timeout_policy).
+
+    Args:
+        driver: Selenium WebDriver instance
+        step: Step name the timeout is learned under (record the wait with until_recorded)
+        default: Seconds to wait until the step has enough history, or without a policy
+    """
+    return WebDriverWait(driver, adaptive_timeout(step, default))
+
+
+def until_recorded(wait, condition, step):
+    """
+    wait.until(condition), recording how long it took (or that it timed out) with the active policy.
+
+    Args:
+        wait: WebDriverWait instance
+        condition: Expected condition passed to wait.until
+        step: Step name to record under (the one the wait's timeout came from)
+
+    Returns:
+        The condition's value
+
+    Raises:
+        TimeoutException: If the condition did not hold in time
+    """
+    start = time.monotonic()
+    try:
+        value = wait.until(condition)
+    except TimeoutException:
+        record_wait(step, time.monotonic() - start, met=False)
+        raise
+    record_wait(step, time.monotonic() - start)
+    return value
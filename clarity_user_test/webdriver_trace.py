@@ -0,0 +1,202 @@
+"""
+Opt-in tracing of WebDriver commands, with optional Python profiling.
+
+Every Selenium call (find_element, .text, execute_script, click, ...) is
+one HTTP round trip to chromedriver, and those add up where the code does
+not show them. WebDriverTrace wraps driver.execute so each command is
+counted and timed, and charged to the step that issued it: the innermost
+UI step function on the call stack (navigate_and_click, a wait_for loop,
+search_user, ...), labelled with its element, option or wait step name
+where it has one.
+
+With profiling on, cProfile runs alongside (on the thread that started
+it) and the summary ends with the Python functions ranked by cumulative
+time.
+
+Usage:
+    python -m clarity_user_test --server dev --role Editor --trace-webdriver
+    python -m clarity_user_test --server dev --role Editor --profile --profile-out run.prof
+
+    trace = WebDriverTrace()
+    trace.attach(driver)
+    ...
+    trace.print_summary()
+"""
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+
+PACKAGE = __name__.rsplit(".", 1)[0]
+
+# Step functions commands are charged to, and the argument that labels them
+STEP_FUNCTIONS = {
+    "login": None,
+    "restore_session": None,
+    "open_user_management": None,
+    "navigate_and_click": "element_name",
+    "select_dropdown_option": "option_text",
+    "wait_for": "step",
+    "wait_for_user_list": None,
+    "probe_user_list": None,
+    "search_user": None,
+    "find_user_in_grid": None,
+    "type_filter": None,
+    "read_window": "action",
+    "extract_grid": None,
+}
+
+MAX_STACK_DEPTH = 40    # Frames searched for a step function
+HOT_SPOTS = 15          # Rows in each ranked table
+
+
+def calling_step(frame):
+    """Label of the innermost step function in the package on the stack above frame, or 'other'."""
+    depth = 0
+    while frame is not None and depth < MAX_STACK_DEPTH:
+        name = frame.f_code.co_name
+        if name in STEP_FUNCTIONS and frame.f_globals.get("__name__", "").startswith(PACKAGE):
+            argument = STEP_FUNCTIONS[name]
+            label = frame.f_locals.get(argument) if argument else None
+            return f"{name}: {label}" if label else name
+        frame = frame.f_back
+        depth += 1
+    return "other"
+
+
+class WebDriverTrace:
+    """
+    Counts and times WebDriver commands per calling step.
+
+    Args:
+        profile: Also run cProfile from start_profile() until the summary
+    """
+
+    def __init__(self, profile=False):
+        self.lock = threading.Lock()
+        self.commands = {}    # (step, command) -> [calls, seconds, errors]
+        self.started = time.monotonic()
+        self.profiler = cProfile.Profile() if profile else None
+        self.profiling = False
+
+    def attach(self, driver):
+        """Wrap driver.execute so every command it sends is recorded; returns the driver."""
+        execute = driver.execute
+
+        def traced_execute(driver_command, params=None):
+            step = calling_step(sys._getframe(1))
+            start = time.perf_counter()
+            ok = False
+            try:
+                response = execute(driver_command, params)
+                ok = True
+                return response
+            finally:
+                self.record(step, driver_command, time.perf_counter() - start, ok)
+
+        driver.execute = traced_execute
+        return driver
+
+    def record(self, step, command, seconds, ok=True):
+        with self.lock:
+            entry = self.commands.setdefault((step, command), [0, 0.0, 0])
+            entry[0] += 1
+            entry[1] += seconds
+            if not ok:
+                entry[2] += 1
+
+    def start_profile(self):
+        if self.profiler and not self.profiling:
+            self.profiler.enable()
+            self.profiling = True
+
+    def stop_profile(self):
+        if self.profiling:
+            self.profiler.disable()
+            self.profiling = False
+
+    def by_step(self):
+        """Per step: calls, seconds, errors and the commands it sent, slowest step first."""
+        steps = {}
+        with self.lock:
+            for (step, command), (calls, seconds, errors) in self.commands.items():
+                row = steps.setdefault(step, {"step": step, "calls": 0, "seconds": 0.0, "errors": 0, "commands": {}})
+                row["calls"] += calls
+                row["seconds"] += seconds
+                row["errors"] += errors
+                row["commands"][command] = calls
+        return sorted(steps.values(), key=lambda r: r["seconds"], reverse=True)
+
+    def by_command(self):
+        """Per command name: calls and seconds, slowest first."""
+        commands = {}
+        with self.lock:
+            for (_, command), (calls, seconds, _errors) in self.commands.items():
+                row = commands.setdefault(command, {"command": command, "calls": 0, "seconds": 0.0})
+                row["calls"] += calls
+                row["seconds"] += seconds
+        return sorted(commands.values(), key=lambda r: r["seconds"], reverse=True)
+
+    def as_dict(self):
+        """Totals and per-step rows, e.g. for saving next to test results."""
+        steps = self.by_step()
+        return {
+            "calls": sum(r["calls"] for r in steps),
+            "seconds": round(sum(r["seconds"] for r in steps), 3),
+            "steps": [dict(r, seconds=round(r["seconds"], 3)) for r in steps],
+        }
+
+    def profile_hot_spots(self, top=HOT_SPOTS, sort="cumulative"):
+        """The profiler's top functions as printable text ('' without profiling)."""
+        if not self.profiler:
+            return ""
+        self.stop_profile()
+        out = io.StringIO()
+        try:
+            stats = pstats.Stats(self.profiler, stream=out)
+        except TypeError:   # Nothing was profiled
+            return ""
+        stats.strip_dirs().sort_stats(sort).print_stats(top)
+        return out.getvalue()
+
+    def dump_profile(self, path):
+        """Write the raw profile (for snakeviz, pstats, ...)."""
+        if self.profiler:
+            self.stop_profile()
+            self.profiler.dump_stats(path)
+            print(f"  ✓ Profile written to {os.path.abspath(path)}")
+
+    def print_summary(self, top=HOT_SPOTS):
+        """Print WebDriver round trips per step and per command, then the Python hot spots."""
+        steps = self.by_step()
+        total_calls = sum(r["calls"] for r in steps)
+        total_seconds = sum(r["seconds"] for r in steps)
+        print("\n" + "="*70)
+        print("WEBDRIVER COMMANDS")
+        print("="*70)
+        if not steps:
+            print("  No WebDriver commands were sent")
+        else:
+            print(f"  {total_calls} round trips, {total_seconds:.2f}s in the driver "
+                  f"over {time.monotonic() - self.started:.1f}s")
+            print(f"\n  {'Step':<44} {'Calls':>6} {'Seconds':>8} {'Share':>6}")
+            for r in steps[:top]:
+                share = r["seconds"] / total_seconds * 100 if total_seconds else 0
+                errors = f"  ✗ {r['errors']} failed" if r["errors"] else ""
+                print(f"  {r['step'][:44]:<44} {r['calls']:>6} {r['seconds']:>8.2f} {share:>5.0f}%{errors}")
+                busiest = sorted(r["commands"].items(), key=lambda c: c[1], reverse=True)[:4]
+                print(f"      → {', '.join(f'{name} x{calls}' for name, calls in busiest)}")
+            if len(steps) > top:
+                print(f"  ... {len(steps) - top} more steps")
+            print(f"\n  {'Command':<44} {'Calls':>6} {'Seconds':>8} {'Avg ms':>7}")
+            for r in self.by_command()[:top]:
+                print(f"  {r['command'][:44]:<44} {r['calls']:>6} {r['seconds']:>8.2f} "
+                      f"{r['seconds'] / r['calls'] * 1000:>7.1f}")
+        hot_spots = self.profile_hot_spots(top)
+        if hot_spots:
+            print("\n  Python hot spots (by cumulative time):")
+            print(hot_spots.rstrip())
+        print("="*70)
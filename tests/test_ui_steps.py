@@ -0,0 +1,50 @@
+"""wait_for_user_list against a fake driver (no browser needed)."""
+from clarity_user_test.timeout_policy import TimeoutPolicy, use_timeout_policy
+from clarity_user_test.ui_steps import USER_LIST_STEP, wait_for_user_list
+
+
+class FakeDriver:
+    """Answers the user list probe: loading for the first `loading` calls, then a stable grid."""
+
+    def __init__(self, loading=0, rows=3):
+        self.loading = loading
+        self.rows = rows
+        self.calls = 0
+
+    def execute_script(self, script, *args):
+        self.calls += 1
+        ready = self.calls > self.loading
+        return {
+            "ready_state": "complete" if ready else "loading",
+            "stable_ms": 500 if ready else 0,
+            "stable": ready,
+            "counts": {
+                "grid_container": 1,
+                "value_elements": self.rows if ready else 0,
+                "user_management_tab": 1,
+                "any_table_or_grid": 1,
+                "user_rows": self.rows if ready else 0,
+                "any_users": self.rows if ready else 0,
+                "spinners": 0,
+            },
+        }
+
+
+def test_wait_for_user_list_detects_loaded_grid():
+    driver = FakeDriver(loading=2)
+    assert wait_for_user_list(driver, max_wait_time=5, poll=0.01) is True
+    assert driver.calls == 3
+
+
+def test_wait_for_user_list_times_out_without_rows():
+    assert wait_for_user_list(FakeDriver(rows=0), max_wait_time=0.1, poll=0.01) is False
+
+
+def test_wait_for_user_list_records_with_active_policy(tmp_path):
+    policy = TimeoutPolicy("https://clarity.example", path=str(tmp_path / "timeouts.json"))
+    with use_timeout_policy(policy):
+        assert wait_for_user_list(FakeDriver(), max_wait_time=5, poll=0.01) is True
+        assert wait_for_user_list(FakeDriver(rows=0), max_wait_time=0.1, poll=0.01) is False
+    hist = policy.data[policy.server][USER_LIST_STEP]
+    assert sum(hist["counts"]) == 1
+    assert hist["timeouts"] == 1